@@ -33,6 +33,8 @@
 import os, sys
 import re
 
+import commandrunner  # Privately bundled file
+
 try:
     from PyQt5 import QtWidgets, QtGui, QtCore
 except:
@@ -140,8 +142,6 @@ Note that Boot Environments do not include /home.")
         
         self.window.show()
 
-        self.ext_process = QtCore.QProcess()
-
         self.refresh_list_with_bectl()
         self.timer = QtCore.QTimer()
         self.timer.setSingleShot(False)
@@ -153,75 +153,80 @@ Note that Boot Environments do not include /home.")
     def quit(self, event):
         sys.exit(0)
 
+    def run_bectl(self, arguments, failure_message):
+        # No timeout, sudo may be waiting for the password
+        result = commandrunner.run(["sudo", "-A", "-E", "bectl"] + arguments, timeout=None)
+        if result.returncode != 0:
+            error_string = "\n".join(result.stderr).replace("ERROR: ", "")
+            if error_string == "":
+                error_string = failure_message
+            QtWidgets.QMessageBox.critical(
+                self.window,
+                "Error",
+                error_string,
+                QtWidgets.QMessageBox.Cancel
+            )
+        return result.returncode == 0
+
     def refresh_list_with_bectl(self):
-        # self.ext_process.finished.connect(self.onProcessFinished)
-        self.ext_process.setProgram("bectl")
-        self.ext_process.setArguments(["list", "-H"])
-
-        try:
-            pid = self.ext_process.start()
-            print("bectl list started")
-        except:
-            print("bectl list cannot be launched.")
+        result = commandrunner.run(["bectl", "list", "-H"], timeout=10)
+        if result.returncode != 0:
+            print("bectl list failed: %s" % "\n".join(result.stderr))
             return  # Stop doing anything here
 
         i = 0
         self.boot_environments = []
-        while self.ext_process.waitForFinished(-1):
-
-            QtWidgets.QApplication.processEvents()  # Important trick so that the app stays responsive without the need for threading!
-
-            while self.ext_process.canReadLine():
-                if i == 0:
-                    self.be_model.clear()  # This removes the column headings as well
-                    self.be_model.setHorizontalHeaderLabels(
-                        ['', 'Boot Environment', 'Active', 'Mountpoint', 'Space', 'Created'])
-
-                i = i + 1
-                # This is a really crude attempt to read line-wise. TODO: Do more elegant, like in 'Mount Disk Image.app'
-                line = str(self.ext_process.readLine())
-                parts = line.split("\\t")
-                name = parts[0].replace("b'", "")
-                self.boot_environments.append(name)
-                active = parts[1]
-                is_active_on_reboot = False
-                if active == "NR":
-                    active = "Now and on reboot"
-                    is_active_on_reboot = True
-                if active == "N":
-                    active = "Now"
-                if active == "R":
-                    active = "On reboot"
-                    is_active_on_reboot = True
-                mountpoint = parts[2]
-                space = parts[3]
-                timestamp = parts[4].replace("\\n'", "")
-                # print(name)
-
-                # Create checkbox
-                checkbox_item = QtGui.QStandardItem(False)
-                checkbox_item.setCheckable(True)
-                checkbox_item.setTristate(False)
+        for line in result.stdout:
+            parts = line.split("\t")
+            if len(parts) < 5:
+                continue
+            if i == 0:
+                self.be_model.clear()  # This removes the column headings as well
+                self.be_model.setHorizontalHeaderLabels(
+                    ['', 'Boot Environment', 'Active', 'Mountpoint', 'Space', 'Created'])
+
+            i = i + 1
+            name = parts[0]
+            self.boot_environments.append(name)
+            active = parts[1]
+            is_active_on_reboot = False
+            if active == "NR":
+                active = "Now and on reboot"
+                is_active_on_reboot = True
+            if active == "N":
+                active = "Now"
+            if active == "R":
+                active = "On reboot"
+                is_active_on_reboot = True
+            mountpoint = parts[2]
+            space = parts[3]
+            timestamp = parts[4]
+            # print(name)
+
+            # Create checkbox
+            checkbox_item = QtGui.QStandardItem(False)
+            checkbox_item.setCheckable(True)
+            checkbox_item.setTristate(False)
+            if is_active_on_reboot:
+                checkbox_item.setCheckState(QtCore.Qt.Checked)
+            else:
+                checkbox_item.setCheckState(QtCore.Qt.Unchecked)
+
+            item = [checkbox_item, QtGui.QStandardItem(name), QtGui.QStandardItem(active),
+                    QtGui.QStandardItem(mountpoint), QtGui.QStandardItem(space), QtGui.QStandardItem(timestamp)]
+            rows_so_far = self.be_model.rowCount()
+            self.be_model.appendRow(item)
+            self.list_widget.horizontalHeader().setSectionResizeMode(
+                QtWidgets.QHeaderView.ResizeToContents)  # Auto width for columns depending on contents
+            # Set active row selected if no other one should be selected
+            if self.selection_index == -1:
                 if is_active_on_reboot:
-                    checkbox_item.setCheckState(QtCore.Qt.Checked)
-                else:
-                    checkbox_item.setCheckState(QtCore.Qt.Unchecked)
-
-                item = [checkbox_item, QtGui.QStandardItem(name), QtGui.QStandardItem(active),
-                        QtGui.QStandardItem(mountpoint), QtGui.QStandardItem(space), QtGui.QStandardItem(timestamp)]
-                rows_so_far = self.be_model.rowCount()
-                self.be_model.appendRow(item)
-                self.list_widget.horizontalHeader().setSectionResizeMode(
-                    QtWidgets.QHeaderView.ResizeToContents)  # Auto width for columns depending on contents
-                # Set active row selected if no other one should be selected
-                if self.selection_index == -1:
-                    if is_active_on_reboot:
-                        # print("is_active_on_reboot")
-                        self.list_widget.setCurrentIndex(self.be_model.index(rows_so_far, 0))
-                # Otherwise, restore previous selection
-                # which self.be_model.clear() may have cleared
-                elif self.selection_index == i - 1:
+                    # print("is_active_on_reboot")
                     self.list_widget.setCurrentIndex(self.be_model.index(rows_so_far, 0))
+            # Otherwise, restore previous selection
+            # which self.be_model.clear() may have cleared
+            elif self.selection_index == i - 1:
+                self.list_widget.setCurrentIndex(self.be_model.index(rows_so_far, 0))
 
         print("populate_list_with_bectl done")
 
@@ -285,39 +290,7 @@ Note that Boot Environments do not include /home.")
         boot_environment = self.boot_environments[row]
         print("Activating: %s" % boot_environment)
 
-        p = QtCore.QProcess()
-        p.setProgram("sudo")
-        p.setArguments(["-A", "-E", "bectl", "activate", boot_environment])
-
-        try:
-            pid = p.start()  # p.startDetached()
-            print("bectl activate started")
-        except:
-            error_string = "bectl activate cannot be launched"
-            print(error_string)
-            QtWidgets.QMessageBox.critical(
-                self.window,
-                "Error",
-                error_string,
-                QtWidgets.QMessageBox.Cancel
-            )
-            return  # Stop doing anything here
-
-        p.waitForFinished(-1)
-
-        if p.exitCode() != 0:
-            error_string = str(p.readAll().data(), encoding='utf-8').replace("ERROR: ", "")
-            # FIXME: Sometimes we don't get the error message. Possibly we need to use
-            # something more complicated, like a QEventLoop?
-            # https://forum.qt.io/topic/75454/qprocess-readall-and-qprocess-readallstandardoutput-both-return-an-empty-string-after-qprocess-write-is-run
-            if error_string == "":
-                error_string = "Could not activate Boot Environment"
-            QtWidgets.QMessageBox.critical(
-                self.window,
-                "Error",
-                error_string,
-                QtWidgets.QMessageBox.Cancel
-            )
+        self.run_bectl(["activate", boot_environment], "Could not activate Boot Environment")
 
         self.refresh_list_with_bectl()
         self.app.setOverrideCursor(
@@ -341,39 +314,7 @@ Note that Boot Environments do not include /home.")
                 QtGui.QCursor(QtCore.Qt.WaitCursor))
             self.timer.stop()
 
-            p2 = QtCore.QProcess()
-            p2.setProgram("sudo")
-            p2.setArguments(["-A", "-E", "bectl", "create", text])
-
-            try:
-                pid = p2.start()  # p.startDetached()
-                print("bectl create started")
-            except:
-                error_string = "bectl create cannot be launched"
-                print(error_string)
-                QtWidgets.QMessageBox.critical(
-                    self.window,
-                    "Error",
-                    error_string,
-                    QtWidgets.QMessageBox.Cancel
-                )
-                return  # Stop doing anything here
-
-            p2.waitForFinished(-1)
-
-            if p2.exitCode() != 0:
-                error_string = str(p2.readAll().data(), encoding='utf-8').replace("ERROR: ", "")
-                # FIXME: Sometimes we don't get the error message. Possibly we need to use
-                # something more complicated, like a QEventLoop?
-                # https://forum.qt.io/topic/75454/qprocess-readall-and-qprocess-readallstandardoutput-both-return-an-empty-string-after-qprocess-write-is-run
-                if error_string == "":
-                    error_string = "Could not create Boot Environment"
-                QtWidgets.QMessageBox.critical(
-                    self.window,
-                    "Error",
-                    error_string,
-                    QtWidgets.QMessageBox.Cancel
-                )
+            self.run_bectl(["create", text], "Could not create Boot Environment")
 
             self.refresh_list_with_bectl()
             self.app.setOverrideCursor(
@@ -403,39 +344,7 @@ Note that Boot Environments do not include /home.")
                 QtGui.QCursor(QtCore.Qt.WaitCursor))
             self.timer.stop()
 
-            p3 = QtCore.QProcess()
-            p3.setProgram("sudo")
-            p3.setArguments(["-A", "-E", "bectl", "destroy", "-Fo", boot_environment])
-
-            try:
-                pid = p3.start()  # p.startDetached()
-                print("bectl destroy started")
-            except:
-                error_string = "bectl destroy cannot be launched"
-                print(error_string)
-                QtWidgets.QMessageBox.critical(
-                    self.window,
-                    "Error",
-                    error_string,
-                    QtWidgets.QMessageBox.Cancel
-                )
-                return  # Stop doing anything here
-
-            p3.waitForFinished(-1)
-
-            if p3.exitCode() != 0:
-                error_string = str(p3.readAll().data(), encoding='utf-8').replace("ERROR: ", "")
-                # FIXME: Sometimes we don't get the error message. Possibly we need to use
-                # something more complicated, like a QEventLoop?
-                # https://forum.qt.io/topic/75454/qprocess-readall-and-qprocess-readallstandardoutput-both-return-an-empty-string-after-qprocess-write-is-run
-                if error_string == "":
-                    error_string = "Could not destroy Boot Environment"
-                QtWidgets.QMessageBox.critical(
-                    self.window,
-                    "Error",
-                    error_string,
-                    QtWidgets.QMessageBox.Cancel
-                )
+            self.run_bectl(["destroy", "-Fo", boot_environment], "Could not destroy Boot Environment")
 
             self.refresh_list_with_bectl()
             self.app.setOverrideCursor(
@@ -466,40 +375,7 @@ Note that Boot Environments do not include /home.")
             QtGui.QCursor(QtCore.Qt.WaitCursor))
         self.timer.stop()
 
-        p4 = QtCore.QProcess()
-        p4.setProgram("sudo")
-        p4.setArguments(["-A", "-E", "bectl", command, boot_environment])
-        print(p4.program() + " " + " " .join(p4.arguments()))
-
-        try:
-            pid = p4.start()  # p.startDetached()
-            print("bectl %s started" % command)
-        except:
-            error_string = "bectl %s cannot be launched" % command
-            print(error_string)
-            QtWidgets.QMessageBox.critical(
-                self.window,
-                "Error",
-                error_string,
-                QtWidgets.QMessageBox.Cancel
-            )
-            return  # Stop doing anything here
-
-        p4.waitForFinished(-1)
-
-        if p4.exitCode() != 0:
-            error_string = str(p4.readAll().data(), encoding='utf-8').replace("ERROR: ", "")
-            # FIXME: Sometimes we don't get the error message. Possibly we need to use
-            # something more complicated, like a QEventLoop?
-            # https://forum.qt.io/topic/75454/qprocess-readall-and-qprocess-readallstandardoutput-both-return-an-empty-string-after-qprocess-write-is-run
-            if error_string == "":
-                error_string = "Could not %s Boot Environment" % command
-            QtWidgets.QMessageBox.critical(
-                self.window,
-                "Error",
-                error_string,
-                QtWidgets.QMessageBox.Cancel
-            )
+        self.run_bectl([command, boot_environment], "Could not %s Boot Environment" % command)
 
         self.refresh_list_with_bectl()
 
@@ -42,6 +42,8 @@ from PyQt5 import QtWidgets, QtGui, QtCore, QtMultimedia # pkg install py37-qt5-
 # QtMultimedia is used for playing the success sound; using mpg123 for now instead
 
 import disks  # Privately bundled file
+import devicewatcher  # Privately bundled file
+import processtasks  # Privately bundled file
 
 import ssl
 
@@ -97,6 +99,8 @@ class InstallWizard(QtWidgets.QWizard, object):
 
         self.required_mib_on_disk = 0
         self.installer_script = "developer-install.sh"
+        # Runs the commands the pages need without blocking, each one only once
+        self.tasks = processtasks.TaskRunner(self)
         
         self.selected_vol = None
 
@@ -265,7 +269,9 @@ class LicensePage(QtWidgets.QWizardPage, object):
         license_label = QtWidgets.QLabel()
         license_label.setWordWrap(True)
         license_layout = QtWidgets.QVBoxLayout(self)
-        license_text = open('/COPYRIGHT', 'r').read()
+        license_text = ""
+        if os.path.exists('/COPYRIGHT'):  # Only FreeBSD has it
+            license_text = open('/COPYRIGHT', 'r').read()
         license_label.setText("\n".join(license_text.split("\n")[3:]))  # Skip the first 3 lines
 
         font = wizard.font()
@@ -296,8 +302,17 @@ class DiskPage(QtWidgets.QWizardPage, object):
         # NOTE: If the installer logic changes and the files are not copied from / but e.g., directly from an image
         # then the following line needs to be changed to reflect the changed logic accordingly
 
-        self.timer = QtCore.QTimer()  # Used to periodically check the available disks
+        self.disk_watch = devicewatcher.DiskWatch()  # Tells when disks come and go
+        self.disk_watch.changed.connect(self.onDisksChanged)
+        # Volumes are mounted a moment after their disk comes, automount creates their mount points in /media
+        self.media_watcher = QtCore.QFileSystemWatcher()
+        self.media_watcher.directoryChanged.connect(self.list_disks)
         self.old_vols = None  # The disks we have recognized so far
+        self.times_shown = 0
+        # Device: its item in the list, for the volume labels that come in later
+        self.items = {}
+        # The blkid tasks for the volume labels, run again when disks change
+        self.label_tasks = []
         self.setTitle(tr('Select Destination Disk'))
         self.setSubTitle(tr('Developer Tools will be installed on the selected disk.'))
         self.disk_listwidget = QtWidgets.QListWidget()
@@ -310,27 +325,13 @@ class DiskPage(QtWidgets.QWizardPage, object):
         self.label = QtWidgets.QLabel()
         disk_vlayout.addWidget(self.label)
 
-    def getMiBRequiredOnDisk(self):
+    def getMiBRequiredOnDisk(self, task):
         # _, space_used_on_root_mountpoint, _ = shutil.disk_usage("/")
         # return int(float(space_used_on_root_mountpoint * 1.3))
-        proc = QtCore.QProcess()
-        command = 'sudo'
-        args = ["-n", "-E", wizard.installer_script]  # -E to pass environment variables into the command ran with sudo
-        env = QtCore.QProcessEnvironment.systemEnvironment()
-        env.insert("INSTALLER_PRINT_MIB_NEEDED", "YES")
-        proc.setProcessEnvironment(env)
-        try:
-            print("Starting %s %s" % (command, args))
-            proc.start(command, args)
-        except:
-            return 0
-        proc.waitForFinished()
-        output_lines = proc.readAllStandardOutput().split("\n")
-
         mib = 0
-        for output_line in output_lines:
-            print(str(output_line))
-            if "INSTALLER_MIB_NEEDED=" in str(output_line):
+        for output_line in task.lines():
+            print(output_line)
+            if "INSTALLER_MIB_NEEDED=" in output_line:
                 mib = int(output_line.split("=")[1])
                 print("Response from the installer script: %i" % mib)
                 correction_factor = 1.5  # FIXME: Correction factor due to compression differences
@@ -342,14 +343,27 @@ class DiskPage(QtWidgets.QWizardPage, object):
     def initializePage(self):
         print("Displaying DiskPage")
 
-        wizard.required_mib_on_disk = self.getMiBRequiredOnDisk()
         self.disk_listwidget.clearSelection()  # If the user clicked back and forth, start with nothing selected
-        self.periodically_list_disks()
+
+        # Ask the installer script for the required disk space without blocking the window,
+        # only once however often the page is shown unless it failed
+        env = {"INSTALLER_PRINT_MIB_NEEDED": "YES"}
+        args = ["-n", "-E", wizard.installer_script]  # -E to pass environment variables into the command ran with sudo
+        self.times_shown += 1
+        wizard.tasks.run('sudo', args, env).then(
+            lambda task, times_shown=self.times_shown: self.onRequiredMiBReported(task, times_shown))
+
+    def onRequiredMiBReported(self, task, times_shown):
+        if wizard.currentPage() is not self or times_shown != self.times_shown:
+            # The user has gone back in the meantime
+            return
+        wizard.required_mib_on_disk = self.getMiBRequiredOnDisk(task)
+        self.watch_disks()
         
         self.disk_listwidget.itemSelectionChanged.connect(self.completeChanged)
 
         if wizard.required_mib_on_disk < 5:
-            self.timer.stop()
+            self.stop_watching_disks()
             wizard.showErrorPage(tr("The installer script did not report the required disk space. Are you running the installer on a supported system? Can you run the installer script with sudo without needing a password?"))
             self.disk_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
             return
@@ -366,12 +380,17 @@ class DiskPage(QtWidgets.QWizardPage, object):
     def cleanupPage(self):
         print("Leaving DiskPage")
 
-    def periodically_list_disks(self):
-        print("periodically_list_disks called")
+    def watch_disks(self):
+        print("watch_disks called")
         self.list_disks()
-        self.timer.setInterval(3000)
-        self.timer.timeout.connect(self.list_disks)
-        self.timer.start()
+        self.disk_watch.start()
+        if os.path.isdir("/media") and "/media" not in self.media_watcher.directories():
+            self.media_watcher.addPath("/media")
+
+    def stop_watching_disks(self):
+        self.disk_watch.stop()
+        if self.media_watcher.directories():
+            self.media_watcher.removePaths(self.media_watcher.directories())
 
 
     def list_disks(self):
@@ -381,6 +400,7 @@ class DiskPage(QtWidgets.QWizardPage, object):
         # because it de-selects the selection
         if vols != self.old_vols:
             self.disk_listwidget.clear()
+            self.items = {}
             for vol in vols:
                 # print(vol.device().data().decode().replace("/dev/", ""))
                 # print(vol.bytesTotal())
@@ -437,6 +457,7 @@ class DiskPage(QtWidgets.QWizardPage, object):
                     item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-harddisk'), title)
 
                 setattr(item, "vol", vol)
+                setattr(item, "title", title)
 
                 self.disk_listwidget.addItem(item)
 
@@ -458,15 +479,10 @@ class DiskPage(QtWidgets.QWizardPage, object):
                     item.setToolTip(tr("Volume does not contain an operating system"))
 
                 # Get and display the disk name ("volume label")
-                # and show it instead of the geom if possible
-                result = subprocess.run(["blkid", "-s", "LABEL", "-o" ,"value", vol.device().data().decode()], capture_output=True)
-                if result.returncode == 0:
-                    vol_label = str(result.stdout.decode()).strip()
-                    if vol_label != "":
-                        print("Volume label: '%s'" % vol_label)
-                        item.setText(tr("%s on %s") % (vol_label, title))
-                else:
-                    print("Could not determine volume label for %s" % title)
+                # and show it instead of the geom if possible. blkid runs for all volumes at the same time.
+                device = vol.device().data().decode()
+                self.items[device] = item
+                self.lookUpVolumeLabel(device, title)
                     
                 print("Done looking at %s" % vol.device().data().decode())
                     
@@ -475,6 +491,38 @@ class DiskPage(QtWidgets.QWizardPage, object):
             print("Done with all")
 
 
+    def onDisksChanged(self):
+        # A stick can be swapped for another one or relabeled under the same device name,
+        # so blkid has to run again rather than tell what it told before
+        for task in self.label_tasks:
+            wizard.tasks.forget(task)
+        self.label_tasks = []
+        if QtCore.QStorageInfo.mountedVolumes() == self.old_vols:
+            # The list stays as it is, only the labels are looked up again
+            for device, item in self.items.items():
+                self.lookUpVolumeLabel(device, getattr(item, "title"))
+        else:
+            self.list_disks()
+
+    def lookUpVolumeLabel(self, device, title):
+        task = wizard.tasks.run("blkid", ["-s", "LABEL", "-o", "value", device])
+        self.label_tasks.append(task)
+        task.then(lambda task, device=device, title=title: self.showVolumeLabel(device, title, task))
+
+    def showVolumeLabel(self, device, title, task):
+        item = self.items.get(device)
+        if item is None or task not in self.label_tasks:
+            # The list or the labels have been refreshed in the meantime
+            return
+        vol_label = task.stdout.strip() if task.exit_code == 0 else ""
+        if vol_label != "":
+            print("Volume label: '%s'" % vol_label)
+            item.setText(tr("%s on %s") % (vol_label, title))
+        else:
+            if task.exit_code != 0:
+                print("Could not determine volume label for %s" % title)
+            item.setText(title)
+
     def isComplete(self):
         print("isComplete called to check whether we can proceed")
         # This needs
@@ -530,7 +578,7 @@ class InstallationPage(QtWidgets.QWizardPage, object):
         print("self.mib_already_on_disk_before_install: %i" % self.mib_already_on_disk_before_install)
         print("wizard.required_mib_on_disk: %i" % wizard.required_mib_on_disk)
 
-        wizard.progress.setRange(0, self.mib_already_on_disk_before_install + wizard.required_mib_on_disk)
+        wizard.progress.setRange(0, int(self.mib_already_on_disk_before_install + wizard.required_mib_on_disk))
         wizard.progress.setValue(0)
 
         # Sanity check that we really have a device
@@ -598,7 +646,7 @@ class InstallationPage(QtWidgets.QWizardPage, object):
             # The target disk is filled more than we thought we would need
             wizard.progress.setRange(0, 0) # Indeterminate
         else:
-            wizard.progress.setRange(self.mib_already_on_disk_before_install, wizard.required_mib_on_disk + self.mib_already_on_disk_before_install)
+            wizard.progress.setRange(self.mib_already_on_disk_before_install, int(wizard.required_mib_on_disk + self.mib_already_on_disk_before_install))
             wizard.progress.setValue(mib_used_on_target_disk)
         
 #############################################################################
@@ -0,0 +1,121 @@
+# Privately bundled in every installer wizard that runs commands while its pages are shown.
+# Keep all the copies of this file identical.
+
+from PyQt5.QtCore import QObject, QProcess, QProcessEnvironment, pyqtSignal
+
+
+class Task(QObject):
+    """
+    A command that runs in a QProcess without blocking the GUI, and what it wrote once it has finished
+    """
+    # The task, once it has finished or could not be started
+    finished = pyqtSignal(object)
+
+    def __init__(self, command, args=(), env=None, parent=None):
+        super().__init__(parent)
+        self.command = command
+        self.args = list(args)
+        self.stdout = ""
+        self.stderr = ""
+        # 127 if the command could not be started, like in a shell, and -1 if it crashed
+        self.exit_code = None
+        self.done = False
+        self.process = QProcess(self)
+        if env:
+            environment = QProcessEnvironment.systemEnvironment()
+            for name, value in env.items():
+                environment.insert(name, value)
+            self.process.setProcessEnvironment(environment)
+        self.process.finished.connect(self._finished)
+        self.process.errorOccurred.connect(self._error)
+
+    def __repr__(self):
+        return "<Task %s %s: %s>" % (self.command, " ".join(self.args), self.exit_code)
+
+    def start(self):
+        print("Starting %s %s" % (self.command, self.args))
+        self.process.start(self.command, self.args)
+
+    def then(self, callback):
+        """
+        Call callback with this task once it has finished, at once if it already has
+        """
+        if self.done:
+            callback(self)
+        else:
+            self.finished.connect(callback)
+
+    def lines(self):
+        return self.stdout.splitlines()
+
+    def _finished(self, exit_code, exit_status):
+        self.stdout = bytes(self.process.readAllStandardOutput()).decode("utf-8", "replace")
+        self.stderr = bytes(self.process.readAllStandardError()).decode("utf-8", "replace")
+        self.exit_code = exit_code if exit_status == QProcess.NormalExit else -1
+        self._done()
+
+    def _error(self, error):
+        # Commands that did start report their errors when they finish
+        if error == QProcess.FailedToStart:
+            self.stderr = "%s: %s" % (self.command, self.process.errorString())
+            self.exit_code = 127
+            self._done()
+
+    def _done(self):
+        if self.done:
+            return
+        self.done = True
+        print("%s exited with %s" % (self.command, self.exit_code))
+        self.finished.emit(self)
+
+
+class TaskRunner(QObject):
+    """
+    Runs commands as Tasks, all at the same time, and keeps every task for as long as the runner lives,
+    so that asking for the same command again gets the same task rather than running it again.
+    A task that failed is run again, so that going back and forth in a wizard tries it again.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tasks = {}
+
+    def run(self, command, args=(), env=None):
+        """
+        The task for command with args and the environment variables in env on top of those of the system,
+        started unless it was before and did not fail
+        """
+        key = (command, tuple(args), tuple(sorted((env or {}).items())))
+        task = self.tasks.get(key)
+        if task is None or (task.done and task.exit_code != 0):
+            task = Task(command, args, env, self)
+            self.tasks[key] = task
+            task.start()
+        return task
+
+    def forget(self, task):
+        """
+        Run the command of task again the next time it is asked for
+        """
+        for key, known in list(self.tasks.items()):
+            if known is task:
+                del self.tasks[key]
+
+    def when_all(self, tasks, callback):
+        """
+        Call callback with the list of tasks once all of them have finished, at once if they already have
+        """
+        tasks = list(tasks)
+        remaining = [task for task in tasks if not task.done]
+        if not remaining:
+            callback(tasks)
+            return
+
+        def finished(task):
+            if task in remaining:
+                remaining.remove(task)
+                if not remaining:
+                    callback(tasks)
+
+        for task in remaining:
+            task.finished.connect(finished)
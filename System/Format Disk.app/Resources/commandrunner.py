@@ -0,0 +1,150 @@
+# Privately bundled in every application that runs geom, gpart, zpool, fstyp or bectl.
+# Keep all the copies of this file identical.
+
+import collections
+import os
+import selectors
+import subprocess
+import time
+
+# Seconds a command may take unless the caller says otherwise, None waits as long as it takes
+DEFAULT_TIMEOUT = 60
+READ_SIZE = 64 * 1024
+# (command, exit code, seconds) of the last commands, to find out where the time went
+history = collections.deque(maxlen=100)
+
+
+class CommandResult(object):
+
+    def __init__(self, command):
+        self.command = command
+        self.stdout = []
+        self.stderr = []
+        self.returncode = None
+        self.elapsed = 0.0
+        self.timed_out = False
+
+    def __repr__(self):
+        return "<CommandResult %s: %s in %.3f s>" % (" ".join(self.command), self.returncode, self.elapsed)
+
+
+class _LineReader(object):
+    """
+    Cuts what comes from one stream into lines, keeps them and hands them to a callback as they come
+    """
+
+    def __init__(self, lines, callback, keep):
+        self.lines = lines
+        self.callback = callback
+        self.keep = keep
+        self.partial = b""
+
+    def feed(self, data):
+        data = self.partial + data
+        end = data.rfind(b"\n") + 1
+        self.partial = data[end:]
+        if end:
+            for line in data[:end - 1].split(b"\n"):
+                self._line(line)
+
+    def finish(self):
+        if self.partial:
+            self._line(self.partial)
+            self.partial = b""
+
+    def _line(self, line):
+        line = line.rstrip(b"\r").decode("utf-8", "replace")
+        if self.keep:
+            self.lines.append(line)
+        if self.callback:
+            self.callback(line)
+
+
+def run(command, timeout=DEFAULT_TIMEOUT, stdin=None, on_stdout=None, on_stderr=None, keep_output=True, **kw):
+    """
+    Runs command and reads its stdout and stderr at the same time, so that a command
+    that writes a lot to one of them cannot block on a full pipe while we wait on the other.
+    Lines are passed to on_stdout and on_stderr as they come. The command is killed
+    when it takes longer than timeout seconds.
+
+    Returns a CommandResult. A command that cannot be started gets the exit code 127, like in a shell.
+    """
+    command = list(command)
+    result = CommandResult(command)
+    print("Running command: %s" % " ".join(command))
+    start = time.monotonic()
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=True,
+            **kw
+        )
+    except OSError as e:
+        result.stderr.append("%s: %s" % (command[0], e.strerror))
+        result.returncode = 127
+        _finished(result, start)
+        return result
+
+    selector = selectors.DefaultSelector()
+    readers = {
+        process.stdout: _LineReader(result.stdout, on_stdout, keep_output),
+        process.stderr: _LineReader(result.stderr, on_stderr, keep_output),
+    }
+    for stream, reader in readers.items():
+        os.set_blocking(stream.fileno(), False)
+        selector.register(stream, selectors.EVENT_READ, reader)
+    if stdin is not None:
+        pending = stdin.encode("utf-8") if isinstance(stdin, str) else bytes(stdin)
+        if pending:
+            os.set_blocking(process.stdin.fileno(), False)
+            selector.register(process.stdin, selectors.EVENT_WRITE)
+        else:
+            process.stdin.close()
+
+    deadline = start + timeout if timeout is not None else None
+    while selector.get_map():
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                process.kill()
+                result.timed_out = True
+                break
+        for key, events in selector.select(remaining):
+            if key.fileobj is process.stdin:
+                try:
+                    written = os.write(process.stdin.fileno(), pending[:READ_SIZE])
+                except BrokenPipeError:
+                    written = len(pending)
+                pending = pending[written:]
+                if not pending:
+                    selector.unregister(process.stdin)
+                    process.stdin.close()
+                continue
+            data = os.read(key.fileobj.fileno(), READ_SIZE)
+            if data:
+                key.data.feed(data)
+            else:
+                selector.unregister(key.fileobj)
+                key.data.finish()
+    selector.close()
+    for reader in readers.values():
+        reader.finish()
+    for stream in (process.stdin, process.stdout, process.stderr):
+        if stream is not None and not stream.closed:
+            stream.close()
+
+    result.returncode = process.wait()
+    if result.timed_out:
+        result.stderr.append("%s: timed out after %s seconds" % (command[0], timeout))
+    _finished(result, start)
+    return result
+
+
+def _finished(result, start):
+    result.elapsed = time.monotonic() - start
+    history.append((result.command, result.returncode, result.elapsed))
+    print("Command %s exited with %s after %.3f s" % (result.command[0], result.returncode, result.elapsed))
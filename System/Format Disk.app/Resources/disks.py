@@ -1,123 +1,372 @@
+# Privately bundled in every application that deals with disks.
+# Keep all the copies of this file identical.
+
 import re
-import subprocess
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ThreadPoolExecutor
+
+import commandrunner  # Privately bundled file
+
+# Everything GEOM knows about, as XML: a single sysctl instead of one geom command per disk
+GEOM_CONFXML_COMMAND = ['/sbin/sysctl', '-n', 'kern.geom.confxml']
+# What GEOM is asked otherwise, and the other queries
+GEOM_DISK_LIST_COMMAND = ['/sbin/geom', 'disk', 'list']
+GLABEL_STATUS_COMMAND = ['/sbin/glabel', 'status', '-s']
+ZPOOL_LIST_COMMAND = ['/sbin/zpool', 'list', '-Hp']
+# Followed by the name of the disk
+GPART_SHOW_COMMAND = ['/sbin/gpart', 'show', '-lp']
+
+# "1. Name: ada0", "   Mediasize: 500107862016 (466G)": the field name ends at the first colon
+GEOM_FIELD_REGEX = re.compile(r"\s*(?:\d+\.\s*)?([^:]+?):\s*(.*?)\s*$")
+# "500107862016 (466G)", "1.00": only the number is kept
+NUMBER_REGEX = re.compile(r"\d+(?:\.\d+)?")
+
+# GEOM label providers named after the file system label, unlike gpt/, gptid/, diskid/ and ufsid/
+FILESYSTEM_LABEL_PREFIXES = ('label/', 'msdosfs/', 'ufs/', 'iso9660/', 'ntfs/', 'ext2fs/')
+# fstyp processes run at the same time for the partitions GEOM knows no label of
+FSTYP_WORKERS = 4
+
+# '/dev/ada0': Disk, from the last enumeration
+_disks_cache = None
+# 'da0s1': volume label, from GEOM
+_labels_cache = None
+# 'da0s1': volume label or None, from fstyp
+_fstyp_labels = {}
 
 def call(command, **kw):
     """
-    Similar to ``subprocess.Popen`` with the following changes:
-    * returns stdout, stderr, and exit code (vs. just the exit code)
-    * logs the full contents of stderr and stdout (separately) to the file log
-    By default, no terminal output is given, not even the command that is going
-    to run.
-    Useful when system calls are needed to act on output, and that same output
-    shouldn't get displayed on the terminal.
-    Optionally, the command can be displayed on the terminal and the log file,
-    and log file output can be turned off. This is useful to prevent sensitive
-    output going to stderr/stdout and being captured on a log file.
-    :param terminal_verbose: Log command output to terminal, defaults to False, and
-                             it is forcefully set to True if a return code is non-zero
-    :param logfile_verbose: Log stderr/stdout output to log file. Defaults to True
-    :param verbose_on_failure: On a non-zero exit status, it will forcefully set logging ON for
-                               the terminal. Defaults to True
-    """
-    executable = command.pop(0)
-    command.insert(0, executable)
-    terminal_verbose = kw.pop('terminal_verbose', False)
-    logfile_verbose = kw.pop('logfile_verbose', True)
+    Runs command with commandrunner.run(), which reads stdout and stderr at the same time
+    and kills the command after a timeout.
+    Returns stdout and stderr as lists of lines, and the exit code.
+    :param timeout: Seconds the command may take, defaults to commandrunner.DEFAULT_TIMEOUT
+    :param stdin: Text to write to the standard input of the command
+    :param verbose_on_failure: On a non-zero exit status, print stderr. Defaults to True
+    """
+    kw.pop('terminal_verbose', False)
+    kw.pop('logfile_verbose', True)
+    kw.pop('show_command', False)
     verbose_on_failure = kw.pop('verbose_on_failure', True)
-    show_command = kw.pop('show_command', False)
-    command_msg = "Running command: %s" % ' '.join(command)
+    timeout = kw.pop('timeout', commandrunner.DEFAULT_TIMEOUT)
     stdin = kw.pop('stdin', None)
-    print(command_msg)
-
-    process = subprocess.Popen(
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        stdin=subprocess.PIPE,
-        close_fds=True,
-        **kw
-    )
-
-    if stdin:
-        stdout_stream, stderr_stream = process.communicate(as_bytes(stdin))
-    else:
-        stdout_stream = process.stdout.read()
-        stderr_stream = process.stderr.read()
-    returncode = process.wait()
-    if not isinstance(stdout_stream, str):
-        stdout_stream = stdout_stream.decode('utf-8')
-    if not isinstance(stderr_stream, str):
-        stderr_stream = stderr_stream.decode('utf-8')
-    stdout = stdout_stream.splitlines()
-    stderr = stderr_stream.splitlines()
-
-    if returncode != 0:
-        if verbose_on_failure:
-            terminal_verbose = True
-    return stdout, stderr, returncode
-
-
-def geom_disk_parser(block):
-    pairs = block.split(';')
-    parsed = {}
-    for pair in pairs:
-        if 'Providers' in pair:
+    result = commandrunner.run(command, timeout=timeout, stdin=stdin, **kw)
+    if result.returncode != 0 and verbose_on_failure:
+        for line in result.stderr:
+            print(line)
+    return result.stdout, result.stderr, result.returncode
+
+
+def _number(value):
+    """
+    The number value starts with, as an int or a float, None for values like '-' and ''
+    """
+    match = NUMBER_REGEX.match(value)
+    if match is None:
+        return None
+    number = match.group()
+    return float(number) if "." in number else int(number)
+
+
+def _size(value):
+    return _number(value) or 0
+
+
+def _repr(item):
+    return repr({name: getattr(item, name) for name in item.__slots__ if name != 'fields'})
+
+
+# Attribute, and how it is converted from the text geom gives, once when parsed
+DISK_FIELDS = (
+    ('geomname', str),
+    ('name', str),
+    ('descr', str),
+    ('ident', str),
+    ('lunid', str),
+    ('lunname', str),
+    ('mode', str),
+    ('rotationrate', str),
+    ('mediasize', _size),
+    ('sectorsize', _size),
+    ('stripesize', _size),
+    ('stripeoffset', _size),
+    ('fwheads', _size),
+    ('fwsectors', _size),
+)
+
+# The columns of 'zpool list -Hp'
+ZPOOL_COLUMNS = (
+    ('name', str),
+    ('size', _size),
+    ('alloc', _size),
+    ('free', _size),
+    ('ckpoint', _number),
+    ('expandsz', _number),
+    ('frag', _number),
+    ('cap', _number),
+    ('dedup', _number),
+    ('health', str),
+    ('altroot', str),
+)
+
+
+def geom_disk_list_parser(lines):
+    """
+    Parses the output of 'geom disk list' for all disks, one block per disk.
+
+    Returns a dictionary like get_disks().
+    """
+    disks = {}
+    fields = None
+    for line in lines:
+        match = GEOM_FIELD_REGEX.match(line)
+        if match is None:
             continue
-        try:
-            column, value = pair.split(':')
-        except ValueError:
+        column, value = match.groups()
+        column = column.replace(" ", "").lower()
+        if column == 'geomname':
+            if fields:
+                disk = Disk(fields)
+                disks[disk.path] = disk
+            fields = {}
+        if fields is not None and value:
+            fields[column] = value
+    if fields:
+        disk = Disk(fields)
+        disks[disk.path] = disk
+    return disks
+
+
+def _confxml_root(confxml):
+    if isinstance(confxml, str):
+        return ElementTree.fromstring(confxml)
+    return confxml
+
+
+def confxml_disks_parser(confxml):
+    """
+    Parses the DISK class of kern.geom.confxml, given as text or as parsed XML, in one pass.
+
+    Returns a dictionary like get_disks(), with the same fields as 'geom disk list'.
+    """
+    disks = {}
+    root = _confxml_root(confxml)
+    for geom_class in root.findall('class'):
+        if geom_class.findtext('name') != 'DISK':
             continue
-        # fixup
-        column = re.sub("\s+", "", column)
-        column= re.sub("^[0-9]+\.", "", column)
-        value = value.strip()
-        value = re.sub('\([0-9A-Z]+\)', '', value)
-        parsed[column.lower()] = value
-    return parsed
+        for geom in geom_class.findall('geom'):
+            fields = {'geomname': geom.findtext('name')}
+            for provider in geom.findall('provider'):
+                for field in provider:
+                    if field.tag == 'config':
+                        for config_field in field:
+                            fields[config_field.tag.lower()] = (config_field.text or '').strip()
+                    elif len(field) == 0 and field.get('ref') is None:
+                        fields[field.tag.lower()] = (field.text or '').strip()
+            for config_field in geom.findall('config/*'):
+                fields.setdefault(config_field.tag.lower(), (config_field.text or '').strip())
+            disk = Disk(fields)
+            disks[disk.path] = disk
+    return disks
 
-def get_disk(diskname):
+
+def confxml_labels_parser(confxml):
     """
-    Captures all available info from geom
+    Parses the LABEL class of kern.geom.confxml, given as text or as parsed XML.
+
+    Returns a dictionary of partition name: file system label, like 'da0s1': 'HELLO'.
+    """
+    labels = {}
+    root = _confxml_root(confxml)
+    for geom_class in root.findall('class'):
+        if geom_class.findtext('name') != 'LABEL':
+            continue
+        for geom in geom_class.findall('geom'):
+            for provider in geom.findall('provider'):
+                label = provider.findtext('name') or ''
+                if label.startswith(FILESYSTEM_LABEL_PREFIXES):
+                    labels[geom.findtext('name')] = label.split('/', 1)[1]
+    return labels
+
+
+def glabel_status_parser(lines):
+    """
+    Parses the output of 'glabel status -s', whose lines are like 'msdosfs/HELLO  N/A  da0s1'.
+
+    Returns a dictionary like confxml_labels_parser().
+    """
+    labels = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 3 and fields[0].startswith(FILESYSTEM_LABEL_PREFIXES):
+            labels[fields[-1]] = fields[0].split('/', 1)[1]
+    return labels
+
+
+def gpart_show_parser(lines):
+    """
+    Parses the output of 'gpart show -lp' for one disk, starting with the partitioning scheme.
+
+    Returns a list of Partition. Free space has the name None and the type 'free'.
+    """
+    partitions = []
+    for line in lines:
+        # Split rather than matched with a regex, which took several times as long. Only the label,
+        # between the name and the human readable size, may contain spaces
+        fields = line.replace("=>", "", 1).split(None, 3)
+        if len(fields) < 4 or not fields[1].isdigit():
+            continue
+        start, size, name, rest = fields
+        if name == "-":
+            if not rest.startswith("free -"):
+                continue
+            name = None
+            type_or_label = "free"
+            human_readable_size = rest[len("free -"):].strip()
+        else:
+            rest = rest.rsplit(None, 1)
+            if len(rest) < 2:
+                continue
+            type_or_label, human_readable_size = rest
+            if "(null)" in type_or_label:
+                type_or_label = type_or_label.replace("(null)", "Partition")
+        if not human_readable_size.startswith("(") or not start.isdigit():
+            continue
+        partitions.append(Partition(name, int(start), int(size), type_or_label, human_readable_size))
+    return partitions
+
+
+def zpool_list_parser(lines):
+    """
+    Parses the output of 'zpool list -Hp', whose columns are separated by tabs.
+
+    Returns a list of Zpool.
+    """
+    zpools = []
+    for line in lines:
+        fields = line.split('\t')
+        if len(fields) < len(ZPOOL_COLUMNS):
+            continue
+        zpools.append(Zpool(**{name: convert(value) for (name, convert), value in zip(ZPOOL_COLUMNS, fields)}))
+    return zpools
+
+
+def get_disks(cached=False):
+    """
+    Captures all available info from geom for all disks
     along with interesting metadata like sectors, size, vendor,
     solid/rotational, etc...
 
-    Returns a dictionary, with all the geom fields as keys.
+    Runs a single command whatever the number of disks, and keeps the result
+    for get_disk() and for get_disks(cached=True) until invalidate_disks() is called.
+
+    Returns a dictionary of '/dev/<disk>': Disk.
     """
+    global _disks_cache, _labels_cache
+    if cached and _disks_cache is not None:
+        return _disks_cache
+    out, err, rc = call(list(GEOM_CONFXML_COMMAND))
+    disks = None
+    if rc == 0:
+        try:
+            root = ElementTree.fromstring("\n".join(out))
+        except ElementTree.ParseError:
+            root = None
+        if root is not None:
+            disks = confxml_disks_parser(root)
+            # The labels come with the same query, get_volume_labels() needs no other
+            _labels_cache = confxml_labels_parser(root)
+    if disks is None:
+        out, err, rc = call(list(GEOM_DISK_LIST_COMMAND))
+        disks = geom_disk_list_parser(out)
+    _disks_cache = disks
+    return disks
 
-    command = ['/sbin/geom', 'disk', 'list', re.sub('/dev/', '', diskname)]
-    out, err, rc = call(command)
-    geom_block = ""
-    for line in out:
-        line.strip()
-        geom_block += ";" + line
-    disk = geom_disk_parser(geom_block)
+
+def invalidate_disks():
+    """
+    Forget the last enumeration and the volume labels, to be called when devices come and go
+    or media change
+    """
+    global _disks_cache, _labels_cache
+    _disks_cache = None
+    _labels_cache = None
+    _fstyp_labels.clear()
+
+
+def get_disk(diskname):
+    """
+    Captures all available info from geom for one disk,
+    from the last enumeration if the disk was part of it.
+
+    Returns a Disk, or None if there is no such disk.
+    """
+    path = '/dev/' + re.sub('/dev/', '', diskname)
+    disk = get_disks(cached=True).get(path)
+    if disk is None:
+        disk = get_disks().get(path)
     return disk
 
+def _geom_labels():
+    out, err, rc = call(list(GEOM_CONFXML_COMMAND))
+    if rc == 0:
+        try:
+            return confxml_labels_parser("\n".join(out))
+        except ElementTree.ParseError:
+            pass
+    out, err, rc = call(list(GLABEL_STATUS_COMMAND))
+    return glabel_status_parser(out)
+
+
+def fstyp_label(name):
+    """
+    The label of the file system on partition name as fstyp tells it, None if there is none
+    """
+    out, err, rc = call(['fstyp', '-l', '/dev/' + name], timeout=10, verbose_on_failure=False)
+    if rc != 0 or not out:
+        return None
+    parts = out[0].split(" ", 1)
+    if len(parts) < 2 or not parts[1]:
+        return None
+    return parts[1]
+
+
+def get_volume_labels(names):
+    """
+    The volume labels of the partitions names, like 'da0s1', all at once.
+
+    The labels GEOM knows come from a single query. fstyp is run only for the other partitions,
+    several at the same time. The labels are kept until invalidate_disks() is called.
+
+    Returns a dictionary of name: label, None for the partitions without a label.
+    """
+    global _labels_cache
+    names = [re.sub('/dev/', '', name) for name in names if name]
+    if _labels_cache is None:
+        _labels_cache = _geom_labels()
+    labels = {}
+    missing = []
+    for name in names:
+        if name in _labels_cache:
+            labels[name] = _labels_cache[name]
+        elif name in _fstyp_labels:
+            labels[name] = _fstyp_labels[name]
+        elif name not in missing:
+            missing.append(name)
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(FSTYP_WORKERS, len(missing))) as pool:
+            for name, label in zip(missing, pool.map(fstyp_label, missing)):
+                _fstyp_labels[name] = label
+                labels[name] = label
+    return labels
+
+
 def get_zpools():
     """
-    Captures information about partitions from 'zpool list'.
+    Captures information about zpools from 'zpool list'.
 
-    Returns a dictionary, with all the 'gpart show' fields as keys.
+    Returns a list of Zpool.
     """
-    command = ['/sbin/zpool', 'list', '-Hp']
-    out, err, rc = call(command)
-    zpools = []
-    for line in out:
-        fields = line.split()
-        print(fields)
-        zp = Zpool(fields[0])
-        zp.size = fields[1]
-        zp.alloc = fields[2]
-        zp.free = fields[3]
-        zp.ckpoint = fields[4]
-        zp.expandsz = fields[5]
-        zp.frag = fields[6]
-        zp.cap = fields[7]
-        zp.dedup = fields[8]
-        zp.health = fields[9]
-        zp.altroot = fields[10]
-        zpools.append(zp)
-    return(zpools)
+    out, err, rc = call(list(ZPOOL_LIST_COMMAND))
+    return zpool_list_parser(out)
 
 def get_datasets(zpool):
     command = ['zfs', 'list', '-H', '-o', 'name',  '-r', zpool]
@@ -128,108 +377,70 @@ def get_partitions(diskname):
     """
     Captures information about partitions from 'gpart show'.
 
-    Returns a dictionary, with all the 'gpart show' fields as keys.
+    Returns a list of Partition, the first one being the partitioning scheme of the whole disk.
     """
-    command = ['/sbin/gpart', 'show', '-lp', re.sub('/dev/', '', diskname)]
-    out, err, rc = call(command)
-    partitions = []
-    for line in out:
-        line = line.replace("=>", "").replace("- free -", "free")
-        line.strip()
-        fields = line.split()
-        if len(fields) < 2:
-            continue
-        if fields[2] == "free":
-            fields.insert(2, "")
-        partition = {}
-        logical_starting_block = fields[0]
-        partition_size_in_blocks = fields[1]
-        name = fields[2]
-        if name == "":
-            name = None
-        partition_type_or_label = fields[3]
-        partition_type_or_label = partition_type_or_label.replace("(null)", "Partition")
-        human_readable_partition_size = fields[4]
-        p = Partition()
-        p.name = name
-        p.logical_starting_block = logical_starting_block
-        p.size_in_blocks = partition_size_in_blocks
-        p.type_or_label = partition_type_or_label
-        p.human_readable_size = human_readable_partition_size
-        partitions.append(p)
-    return(partitions)
-
-def get_disks():
-    command = ['/sbin/geom', 'disk', 'status', '-s']
-    out, err, rc = call(command)
-    disks = {}
-    for path in out:
-        dsk, rest1, rest2 = path.split()
-        disk = get_disk(dsk)
-        disks['/dev/'+dsk] = disk
-    return disks
+    out, err, rc = call(GPART_SHOW_COMMAND + [re.sub('/dev/', '', diskname)])
+    return gpart_show_parser(out)
 
-class Disks(object):
 
-    def __init__(self, path=None):
-        self.disks = {}
+class Disk(object):
+    """
+    A disk as GEOM describes it. Every field GEOM gave is in fields, as text.
+    """
+    __slots__ = ('path', 'fields') + tuple(name for name, convert in DISK_FIELDS)
 
+    def __init__(self, fields):
+        self.fields = fields
+        for name, convert in DISK_FIELDS:
+            setattr(self, name, convert(fields.get(name, '')))
+        self.path = '/dev/' + self.geomname
 
-class Disk(object):
+    def __eq__(self, other):
+        # So that pages can tell whether anything changed since they last listed the disks
+        return isinstance(other, Disk) and self.fields == other.fields
+
+    def __hash__(self):
+        # Equal disks hash alike, as __eq__ alone would make them unhashable
+        return hash(frozenset(self.fields.items()))
 
-    def __init__(self, path):
-        self.abspath = path
-        self.path = path
-        self.reject_reasons = []
-        self.available = True
+    def __repr__(self):
+        return _repr(self)
 
 
 class Partition(object):
+    __slots__ = ('name', 'logical_starting_block', 'size_in_blocks', 'type_or_label', 'human_readable_size')
 
-    def __init__(self):
-        self.name = None
-        self.logical_starting_block = None
-        self.size_in_blocks = None
-        self.type_or_label = None
-        self.human_readable_size = None
+    def __init__(self, name=None, logical_starting_block=None, size_in_blocks=None, type_or_label=None,
+                 human_readable_size=None):
+        self.name = name
+        self.logical_starting_block = logical_starting_block
+        self.size_in_blocks = size_in_blocks
+        self.type_or_label = type_or_label
+        self.human_readable_size = human_readable_size
 
     def __repr__(self):
-        return("{'name': '%s', 'logical_starting_block': %s, 'size_in_blocks': %s, 'type_or_label': '%s', 'human_readable_size': '%s'}" % (self.name, self.logical_starting_block, self.size_in_blocks, self.type_or_label, self.human_readable_size))
+        return _repr(self)
 
     def get_volume_label(self):
-        command = ["fstyp", "-l", "/dev/" + self.name]
-        out, err, rc = call(command)
-        if rc != 0:
-            return self.name
-        parts = out[0].split(" ")
-        parts.pop(0)
-        result = " ".join(parts)
-        if result:
-            return(result)
-        else:
-            return self.name
+        return get_volume_labels([self.name]).get(self.name) or self.name
+
 
 class Zpool(object):
+    __slots__ = tuple(name for name, convert in ZPOOL_COLUMNS)
 
-    def __init__(self, name):
+    def __init__(self, name, **columns):
         self.name = name
-        self.size = None
-        self.alloc = None
-        self.free = None
-        self.ckpoint = None
-        self.expandsz = None
-        self.frag = None
-        self.cap = None
-        self.dedup = None
-        self.health = None
-        self.altroot = None
+        for column, convert in ZPOOL_COLUMNS[1:]:
+            setattr(self, column, columns.get(column))
+
+    def __repr__(self):
+        return _repr(self)
 
 
 if __name__ == "__main__":
     ds = get_disks()
     for d in ds:
-
         di = get_disk(d)
         print(di)
-        if int(di.get("mediasize")) >= 6*1024*1024:
-          print(di.get("descr"))
+        if di.mediasize >= 6*1024*1024:
+            print(di.descr)
@@ -18,6 +18,7 @@ from PyQt5.uic import loadUi
 
 import filesystems # bundled
 import disks # bundled
+import commandrunner # bundled
 import selectdisk # bundled
 
 # Translate this application using Qt .ts files without the need for compilation
@@ -213,20 +214,13 @@ class Window(QMainWindow):
     def get_geom_details(self):
         # Find out which unpartitioned disk we are working on
         # We could also use get_disk() from disks.py but that one does not give us the readable capacity (yet)
-        p = QProcess()
-        p.setProgram("geom")
-        p.setArguments(["disk", "list", self.device.replace("/dev/", "")])
-        p.start()
-        p.waitForFinished()
+        result = commandrunner.run(["/sbin/geom", "disk", "list", self.device.replace("/dev/", "")])
 
-        err = p.readAllStandardError().data().decode()
-        if err:
-            self.fatalError(err)
+        if result.stderr:
+            self.fatalError("\n".join(result.stderr))
 
-        out = p.readAllStandardOutput().data().decode()
-        if out:
-            lines = out.split("\n")
-            for line in lines:
+        if result.stdout:
+            for line in result.stdout:
                 if not ":" in line:
                     continue
                 parts = line.split(":")
@@ -12,6 +12,7 @@ import os
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 import disks
+import devicewatcher
 
 # Translate this application using Qt .ts files without the need for compilation
 import tstranslator
@@ -39,7 +40,7 @@ class DiskSelectionWidget(QtWidgets.QWidget):
         self.label = QtWidgets.QLabel()
         disk_vlayout.addWidget(self.label)
         self.required_mib_on_disk = 0
-        self.periodically_list_disks()
+        self.list_disks()
 
         # Add a ButtonBox with an OK button and a Cancel button
         self.button_box = QtWidgets.QDialogButtonBox()
@@ -61,24 +62,20 @@ class DiskSelectionWidget(QtWidgets.QWidget):
         self.shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("Return"), self)
         self.shortcut.activated.connect(self.accept)
         
-        # Start a timer to periodically refresh the list of disks
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(self.periodically_list_disks)
-        self.timer.start(1000)
+        # Refresh the list of disks when disks come and go
+        self.disk_watch = devicewatcher.DiskWatch()
+        self.disk_watch.changed.connect(self.list_disks)
+        self.disk_watch.start()
 
     def accept(self):
         if self.user_agreed_to_erase == True:
-            self.timer.stop()
+            self.disk_watch.stop()
             self.close()
 
     def reject(self):
-        self.timer.stop()
+        self.disk_watch.stop()
         self.close()
 
-    def periodically_list_disks(self):
-        print("periodically_list_disks")
-        self.list_disks()
-
     def list_disks(self):
         ds = disks.get_disks()
         # Do not refresh the list of disks if nothing has changed, because it de-selects the selection
@@ -86,12 +83,12 @@ class DiskSelectionWidget(QtWidgets.QWidget):
             self.disk_listwidget.clear()
             for d in ds:
                 di = disks.get_disk(d)
-                available_bytes = int(di.get("mediasize").split(" ")[0])
-                if (available_bytes >= self.required_mib_on_disk) and di.get("geomname").startswith("cd") == False:
-                    title = "%s on %s (%s GiB)" % (di.get("descr"), di.get("geomname"), f"{(available_bytes // (2 ** 30)):,}")
-                    if di.get("geomname").startswith("cd") == True:
+                available_bytes = di.mediasize
+                if (available_bytes >= self.required_mib_on_disk) and di.geomname.startswith("cd") == False:
+                    title = "%s on %s (%s GiB)" % (di.descr, di.geomname, f"{(available_bytes // (2 ** 30)):,}")
+                    if di.geomname.startswith("cd") == True:
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-optical'), title)
-                    elif di.get("geomname").startswith("da") == True:
+                    elif di.geomname.startswith("da") == True:
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-removable-media'), title)
                     else:
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-harddisk'), title)
@@ -36,6 +36,7 @@ from datetime import datetime
 import urllib.request, json
 from PyQt5 import QtWidgets, QtGui, QtCore # pkg install py37-qt5-widgets
 import disks # Privately bundled file
+import devicewatcher # Privately bundled file
 
 import ssl
 
@@ -128,7 +129,8 @@ class DiskPage(QtWidgets.QWizardPage, object):
         print("Preparing DiskPage")
         super().__init__()
 
-        self.timer = QtCore.QTimer() # Used to periodically check the available disks
+        self.disk_watch = devicewatcher.DiskWatch() # Tells when disks come and go
+        self.disk_watch.changed.connect(self.list_disks)
         self.old_ds = None # The disks we have recognized so far
         self.setTitle('Select Disk')
         self.setSubTitle('Please select the disk that should be checked, recovered, or repaired.')
@@ -144,18 +146,15 @@ class DiskPage(QtWidgets.QWizardPage, object):
         print("Displaying DiskPage")
 
         self.disk_listwidget.clearSelection() # If the user clicked back and forth, start with nothing selected
-        self.periodically_list_disks()
+        self.watch_disks()
 
     def cleanupPage(self):
         print("Leaving DiskPage")
 
-    def periodically_list_disks(self):
-        print("periodically_list_disks")
+    def watch_disks(self):
+        print("watch_disks")
         self.list_disks()
-
-        self.timer.setInterval(3000)
-        self.timer.timeout.connect(self.list_disks)
-        self.timer.start()
+        self.disk_watch.start()
 
     def list_disks(self):
 
@@ -166,16 +165,16 @@ class DiskPage(QtWidgets.QWizardPage, object):
             for d in ds:
                 di = disks.get_disk(d)
                 # print(di)
-                # print(di.get("descr"))
+                # print(di.descr)
                 # print(di.keys())
-                available_bytes = int(di.get("mediasize").split(" ")[0])
-                if di.get("geomname").startswith("cd") == False:
+                available_bytes = di.mediasize
+                if di.geomname.startswith("cd") == False:
                     # item.setTextAlignment()
-                    title = "%s on %s (%s GiB)" % (di.get("descr"), di.get("geomname"), f"{(available_bytes // (2 ** 30)):,}")
-                    if di.get("geomname").startswith("cd") == True:
+                    title = "%s on %s (%s GiB)" % (di.descr, di.geomname, f"{(available_bytes // (2 ** 30)):,}")
+                    if di.geomname.startswith("cd") == True:
                         # TODO: Add burning powers
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-optical'), title)
-                    elif di.get("geomname").startswith("da") == True:
+                    elif di.geomname.startswith("da") == True:
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-removable-media'), title)
                     else:
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-harddisk'), title)
@@ -215,13 +214,13 @@ class DiskPage(QtWidgets.QWizardPage, object):
         # TODO: Use __setattr__() and __getattribute__() instead; see above for an example on how to use those
         for d in self.old_ds:
             di = disks.get_disk(d)
-            searchstring = " on " + str(di.get("geomname")) + " "
+            searchstring = " on " + di.geomname + " "
             print(searchstring)
             if len(self.disk_listwidget.selectedItems()) < 1:
                 return False
             if searchstring in self.disk_listwidget.selectedItems()[0].text():
-                wizard.selected_disk_device = str(di.get("geomname"))
-                self.timer.stop() # FIXME: This does not belong here, but cleanupPage() gets called only
+                wizard.selected_disk_device = di.geomname
+                self.disk_watch.stop() # FIXME: This does not belong here, but cleanupPage() gets called only
                 # if the user goes back, not when they go forward...
                 return True
 
@@ -229,7 +228,7 @@ class DiskPage(QtWidgets.QWizardPage, object):
         return False
 
     def cleanupPage(self):
-        self.timer.stop()
+        self.disk_watch.stop()
 
 #############################################################################
 # Work page
@@ -327,7 +326,8 @@ class SuccessPage(QtWidgets.QWizardPage, object):
 
         print("Preparing SuccessPage")
         super().__init__()
-        self.timer = QtCore.QTimer()  # Used to periodically check the available disks
+        self.disk_watch = devicewatcher.DiskWatch()  # Tells when the device is unplugged
+        self.disk_watch.changed.connect(self.list_disks)
 
     def initializePage(self):
         print("Displaying SuccessPage")
@@ -358,21 +358,18 @@ class SuccessPage(QtWidgets.QWizardPage, object):
         self.setButtonText(wizard.CancelButton, "Quit")
         wizard.setButtonLayout([QtWidgets.QWizard.Stretch, QtWidgets.QWizard.CancelButton])
 
-        self.periodically_list_disks()
+        self.watch_disks()
 
-    def periodically_list_disks(self):
-        print("periodically_list_disks")
+    def watch_disks(self):
+        print("watch_disks")
         self.list_disks()
-
-        self.timer.setInterval(3000)
-        self.timer.timeout.connect(self.list_disks)
-        self.timer.start()
+        self.disk_watch.start()
 
     def list_disks(self):
         ds = disks.get_disks()
         if "/dev/" + wizard.selected_disk_device not in ds:
             print("Device was unplugged, exiting")
-            self.timer.stop()
+            self.disk_watch.stop()
             sys.exit(0)
 
 #############################################################################
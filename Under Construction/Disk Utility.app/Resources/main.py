@@ -28,31 +28,36 @@ class Disks(QMainWindow):
 
     def populate_geom_tree(self):
         ds = disks.get_disks()
+        disk_partitions = []
         for d in ds:
             di = disks.get_disk(d)
             print(di)
-            print(di.get("descr"))
+            print(di.descr)
             item = QTreeWidgetItem()
-            item.setText(0, di["descr"])
+            item.setText(0, di.descr)
             item.__setattr__("di", di)
-            if di.get("geomname").startswith("cd") == True:
+            if di.geomname.startswith("cd") == True:
                 item.setIcon(0, QIcon.fromTheme('drive-optical'))
-            elif di.get("geomname").startswith("da") == True:
+            elif di.geomname.startswith("da") == True:
                 item.setIcon(0, QIcon.fromTheme('drive-removable-media'))
             else:
                 item.setIcon(0, QIcon.fromTheme('drive-harddisk'))
             self.geomTreeWidget.addTopLevelItem(item)
-            # Add the partitions that are on the hardware devices as children
-            partitions = disks.get_partitions(di["name"])
+            partitions = disks.get_partitions(di.name)
             if len(partitions) > 0:
                 partitions.pop(0)
-                for p in partitions:
-                    if p.name == None:
-                        continue
-                    child = QTreeWidgetItem()
-                    child.setText(0, (p.name + " " + p.type_or_label))
-                    child.setFlags(Qt.ItemIsSelectable) # Make it greyed out here for now
-                    item.addChild(child)
+                disk_partitions.append((item, partitions))
+        # Add the partitions that are on the hardware devices as children,
+        # with the volume labels of all of them looked up at once
+        labels = disks.get_volume_labels([p.name for item, partitions in disk_partitions for p in partitions])
+        for item, partitions in disk_partitions:
+            for p in partitions:
+                if p.name == None:
+                    continue
+                child = QTreeWidgetItem()
+                child.setText(0, (p.name + " " + (labels.get(p.name) or p.type_or_label)))
+                child.setFlags(Qt.ItemIsSelectable) # Make it greyed out here for now
+                item.addChild(child)
         # In addition to hardware devices, also show ZFS zpools
         # Not entirely sure if this is the best place to do this in the UI,#
         # but zpools are neither strictly a child nor a parent of hardware devices...
@@ -149,7 +154,7 @@ class Disks(QMainWindow):
         if hasattr(self.geomTreeWidget.selectedItems()[0], "di"):
             di = getattr(self.geomTreeWidget.selectedItems()[0], "di")
             self.partitionsListWidget.setStyleSheet("QListWidget::item { text-align: center; margin-left: 2px; margin-right: 2px; margin-top: 2px; border: 2px solid grey }")
-            partitions = disks.get_partitions(di["name"])
+            partitions = disks.get_partitions(di.name)
             self.detailsPlainTextEdit.setPlainText(pp.pformat(di) + "\n\n" + pp.pformat(partitions))
             if len(partitions) > 0:
                 partitions.pop(0)
@@ -40,6 +40,9 @@ from pathlib import Path
 
 import ssl
 
+import downloadcache  # Privately bundled file
+import releaseindex  # Privately bundled file
+
 # Translate this application using Qt .ts files without the need for compilation
 import tstranslator
 # FIXME: Do not import translations from outside of the application bundle
@@ -166,7 +169,11 @@ class IntroPage(QtWidgets.QWizardPage, object):
         self.setTitle(tr('Download Applications'))
         self.setSubTitle(tr("This will download an application of your choice."))
 
+        # The repository whose releases are listed
         self.releases_url = None
+        self.release_index = releaseindex.ReleaseIndex()
+        self.release_index.releases_changed.connect(self.onReleasesChanged)
+        self.release_index.failed.connect(self.onReleasesFailed)
 
         self.disk_vlayout = QtWidgets.QVBoxLayout(self)
 
@@ -257,51 +264,72 @@ class IntroPage(QtWidgets.QWizardPage, object):
             self.onSelectionChanged()
             return
 
-        if internetCheckConnected() == False:
-            wizard.showErrorPage(tr("This requires an active internet connection."))
-            self.label.hide()  # FIXME: Why is this needed? Can we do without?
-            self.repo_menu.hide()  # FIXME: Why is this needed? Can we do without?
-            self.release_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
-            return
-
         url = self.available_repos[self.repo_menu.currentIndex()]
-        print("Getting releases from", url)
-
-        #try:
-        with urllib.request.urlopen(url) as url:
-            data = json.loads(url.read().decode())
-            # print(data)
-            for release in data:
-                if len(release["assets"]) > 0:
-                    # print(asset)
-                    for asset in release["assets"]:
-                        if asset["browser_download_url"].endswith(".img"):
-                            # display_name = "%s (%s)" % (asset["name"], release["tag_name"])
-                            # display_name = "%s %s" % (release["tag_name"], asset["name"])
-                            display_name = asset["name"]
-                            self.available_isos.append(asset)
-                            item = QtWidgets.QListWidgetItem(display_name)
-                            item.__setattr__("browser_download_url", asset["browser_download_url"]) # __setattr__() is the equivalent to setProperty() in Qt
-                            item.__setattr__("updated_at", asset["updated_at"])
-                            item.__setattr__("size", asset["size"])
-                            item.__setattr__("prerelease", release["prerelease"])
-                            if self.prerelease_checkbox.isChecked() == False:
-                                if release["prerelease"] == False:
-                                    self.release_listwidget.addItem(item)
-                            else:
+
+        # At once from the cache if they were listed before, onReleasesChanged() tells when they change
+        releases = self.release_index.releases(url)
+        if releases is None:
+            if internetCheckConnected() == False:
+                wizard.showErrorPage(tr("This requires an active internet connection."))
+                self.label.hide()  # FIXME: Why is this needed? Can we do without?
+                self.repo_menu.hide()  # FIXME: Why is this needed? Can we do without?
+                self.release_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
+            return
+        self.releases_url = url
+        self.showReleases(releases)
+
+    def showReleases(self, releases):
+        for release in releases:
+            if len(release["assets"]) > 0:
+                # print(asset)
+                for asset in release["assets"]:
+                    if asset["browser_download_url"].endswith(".img"):
+                        # display_name = "%s (%s)" % (asset["name"], release["tag_name"])
+                        # display_name = "%s %s" % (release["tag_name"], asset["name"])
+                        display_name = asset["name"]
+                        self.available_isos.append(asset)
+                        item = QtWidgets.QListWidgetItem(display_name)
+                        item.__setattr__("browser_download_url", asset["browser_download_url"]) # __setattr__() is the equivalent to setProperty() in Qt
+                        item.__setattr__("updated_at", asset["updated_at"])
+                        item.__setattr__("size", asset["size"])
+                        item.__setattr__("prerelease", release["prerelease"])
+                        if self.prerelease_checkbox.isChecked() == False:
+                            if release["prerelease"] == False:
                                 self.release_listwidget.addItem(item)
-        #except:
-            #pass
-            # wizard.showErrorPage("The list of available images could not be retrieved. GitHub rate limit exceeded?")
-            # self.label.hide()  # FIXME: Why is this needed? Can we do without?
-            # self.repo_menu.hide()  # FIXME: Why is this needed? Can we do without?
-            # self.release_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
-            # return
+                        else:
+                            self.release_listwidget.addItem(item)
+
+        # Keep what the user had selected before the list was refreshed
+        for row in range(self.release_listwidget.count()):
+            item = self.release_listwidget.item(row)
+            if item.browser_download_url == wizard.selected_iso_url:
+                item.setSelected(True)
 
         # Invalidate that the user already has selected something and we can proceed
         self.completeChanged.emit()
 
 
+    def onReleasesChanged(self, url, releases):
+        if url != self.available_repos[self.repo_menu.currentIndex()]:
+            return
+        self.available_isos = []
+        self.release_listwidget.clear()
+        self.releases_url = url
+        self.showReleases(releases)
+
+    def onReleasesFailed(self, url, message):
+        # The releases from the cache are good enough
+        if url != self.available_repos[self.repo_menu.currentIndex()] or url == self.releases_url:
+            return
+        if "rate limit exceeded" in message:
+            wizard.showErrorPage(tr("You have exceeded the GitHub rate limit. Please try again later."))
+        else:
+            wizard.showErrorPage(tr("The list of available images could not be retrieved.") + " " + message + ".")
+        self.label.hide()  # FIXME: Why is this needed? Can we do without?
+        self.repo_menu.hide()  # FIXME: Why is this needed? Can we do without?
+        self.release_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
+
+
     def onSelectionChanged(self):
         print("onSelectionChanged")
         # print("selectedIndexes", self.release_listwidget.selectedIndexes())
@@ -356,9 +384,8 @@ class InstallationPage(QtWidgets.QWizardPage, object):
         workaroundtimer.singleShot(200, self.download)
 
 
-    def handleProgress(self, blocknum, blocksize, totalsize):
+    def handleProgress(self, processed_data, totalsize):
 
-        processed_data = blocknum * blocksize
         # print("processed_data %i" % processed_data)
         if totalsize > 0:
             download_percentage = processed_data * 100 / totalsize
@@ -374,7 +401,8 @@ class InstallationPage(QtWidgets.QWizardPage, object):
         socket.setdefaulttimeout(240)
         print("socket.getdefaulttimeout(): %s" % socket.getdefaulttimeout())
         try:
-            urllib.request.urlretrieve(wizard.selected_iso_url, wizard.save_loc, self.handleProgress)
+            # Through the download cache, which resumes dropped connections
+            downloadcache.fetch(wizard.selected_iso_url, wizard.save_loc, self.handleProgress)
         except BaseException as error:
             print('An error occurred: {}'.format(error))
             wizard.showErrorPage('{}'.format(error) + ".")
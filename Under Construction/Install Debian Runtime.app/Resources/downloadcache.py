@@ -0,0 +1,498 @@
+# Privately bundled in every application that downloads images.
+# Keep all the copies of this file identical.
+
+import errno
+import fcntl
+import hashlib
+import http.client
+import json
+import os
+import re
+import shutil
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+CACHE_DIRECTORY = os.path.expanduser("~/.cache/hello/Downloads")
+# The least recently used files are removed when the cache grows larger than this
+CACHE_LIMIT = 8 * 1024 * 1024 * 1024
+NETWORK_TIMEOUT = 240
+# Times in a row a dropped connection is resumed, waiting RETRY_DELAY seconds longer each time
+RETRIES = 5
+RETRY_DELAY = 2
+READ_SIZE = 1024 * 1024
+# Other URLs, e.g. file:// ones, are read directly
+CACHED_SCHEMES = ("http", "https")
+
+CONTENT_RANGE_REGEX = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class DownloadError(Exception):
+    pass
+
+
+def parse_content_range(value):
+    """
+    (first byte, size of the whole file or 0 if unknown) from 'bytes 100-199/1000'
+    """
+    match = CONTENT_RANGE_REGEX.match(value or "")
+    if not match:
+        return None, 0
+    return int(match.group(1)), int(match.group(3)) if match.group(3) != "*" else 0
+
+
+def _validators(headers):
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+class DownloadCache(object):
+    """
+    Complete downloads are stored under directory by their SHA-256, with an index of the URLs they
+    came from. Incomplete ones are kept by the SHA-256 of their URL so that they can be resumed.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, limit=CACHE_LIMIT):
+        self.directory = directory
+        self.limit = limit
+        self.index_path = os.path.join(directory, "index.json")
+
+    def blob_path(self, sha256):
+        return os.path.join(self.directory, "sha256", sha256)
+
+    def partial_path(self, url):
+        return os.path.join(self.directory, "partial", hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def read_index(self):
+        try:
+            with open(self.index_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def write_index(self, index):
+        temporary = "%s.%i" % (self.index_path, os.getpid())
+        with open(temporary, "w") as file:
+            json.dump(index, file, indent=1)
+        os.replace(temporary, self.index_path)
+
+    def lookup(self, url, sha256=None):
+        """
+        The index entry of the complete file with sha256, or else of the one from url, or None
+        """
+        if sha256 and os.path.exists(self.blob_path(sha256)):
+            return {"sha256": sha256, "size": os.path.getsize(self.blob_path(sha256))}
+        entry = self.read_index().get(url)
+        if entry and not sha256 and os.path.exists(self.blob_path(entry["sha256"])):
+            return entry
+        return None
+
+    def add(self, url, partial, sha256, size, validators):
+        path = self.blob_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(partial, path)
+        index = self.read_index()
+        index[url] = dict(validators, sha256=sha256, size=size)
+        self.write_index(index)
+        self.prune(keep=sha256)
+        return path
+
+    def prune(self, keep=None):
+        """
+        Remove the least recently used files until the cache is no larger than self.limit
+        """
+        directory = os.path.dirname(self.blob_path(""))
+        blobs = []
+        for entry in os.scandir(directory):
+            stat = entry.stat()
+            blobs.append((stat.st_mtime, stat.st_size, entry.name))
+        total = sum(size for mtime, size, name in blobs)
+        removed = set()
+        for mtime, size, name in sorted(blobs):
+            if total <= self.limit:
+                break
+            if name == keep:
+                continue
+            print("Removing %s from the download cache" % name)
+            os.unlink(os.path.join(directory, name))
+            removed.add(name)
+            total -= size
+        if removed:
+            self.forget(removed)
+
+    def forget(self, removed):
+        """
+        Take the files with the SHA-256 in removed, which are not in the cache any more, out of the index
+        """
+        index = self.read_index()
+        self.write_index({url: entry for url, entry in index.items() if entry["sha256"] not in removed})
+
+
+class CachedDownload(object):
+    """
+    Reads url through the cache like a file: what is in the cache already is read from disk, the rest
+    comes from the network and is added to the cache as it is read. A dropped connection is resumed
+    with a Range request where it stopped. self.hash is the SHA-256 of everything read so far.
+
+    Once everything has been read, the file is stored in the cache and self.path is where it is.
+    A file that does not match expected_sha256 is not stored, and reading its end raises DownloadError.
+    """
+
+    def __init__(self, url, expected_sha256=None, cache=None):
+        self.url = url
+        self.expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        self.cache = cache or DownloadCache()
+        self.hash = hashlib.sha256()
+        # Bytes in the file or 0 if the server does not tell, bytes handed out, bytes there are so far
+        self.total = 0
+        self.position = 0
+        self.received = 0
+        self.resumed = 0
+        self.path = None
+        # Whether the file is being added to the cache, not when it is already there or cannot be
+        self.caching = False
+        self.complete = False
+        self._fd = None
+        self._response = None
+        self._validators = {}
+        self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _open(self):
+        entry = self.cache.lookup(self.url, self.expected_sha256)
+        if entry and not self.expected_sha256 and os.path.exists(self.cache.partial_path(self.url)):
+            # A newer one was being downloaded when it was stopped
+            entry = None
+        if entry and not self.expected_sha256:
+            # Only the server knows whether the file behind the URL is still the same one
+            try:
+                self._request(entry)
+            except (OSError, http.client.HTTPException) as error:
+                print("Using the cached %s, could not check whether it changed: %s" % (self.url, error))
+            else:
+                if self._response is not None:
+                    entry = None
+        if entry:
+            self.path = self.cache.blob_path(entry["sha256"])
+            self._fd = os.open(self.path, os.O_RDONLY)
+            self.total = self.received = entry["size"]
+            self.complete = True
+            # For the least recently used to go first
+            os.utime(self.path)
+            print("Reading %s from the download cache" % self.url)
+            return
+
+        if not self._open_partial():
+            if self._response is None:
+                self._request()
+        elif self._response is not None:
+            # The cached file changed on the server, the response has the new one from its start
+            self._restart()
+            self._write_partial_info()
+        else:
+            self.received = os.fstat(self._fd).st_size
+            self._read_partial_info()
+            # Unless it stopped between the last byte and storing the file
+            if not self.received or self.received != self.total:
+                self._request()
+
+    def _open_partial(self):
+        partial = self.cache.partial_path(self.url)
+        try:
+            os.makedirs(os.path.dirname(partial), exist_ok=True)
+            self._fd = os.open(partial, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as error:
+            # E.g. being downloaded by another application
+            print("Not caching %s: %s" % (self.url, error.strerror))
+            self._close_fd()
+            return False
+        self.caching = True
+        return True
+
+    def _partial_info_path(self):
+        return self.cache.partial_path(self.url) + ".json"
+
+    def _read_partial_info(self):
+        try:
+            with open(self._partial_info_path()) as file:
+                info = json.load(file)
+        except (OSError, ValueError):
+            info = {}
+        if info.get("url") != self.url:
+            # Nothing is known about where what was received came from
+            self._restart()
+            return
+        self.total = info.get("total", 0)
+        self._validators = info.get("validators", {})
+
+    def _write_partial_info(self):
+        info = {"url": self.url, "total": self.total, "validators": self._validators}
+        with open(self._partial_info_path(), "w") as file:
+            json.dump(info, file)
+
+    def _restart(self):
+        os.ftruncate(self._fd, 0)
+        self.received = 0
+
+    def _request(self, cached=None):
+        """
+        Ask for the file from self.received on, or only if it differs from the cached one
+        """
+        request = urllib.request.Request(self.url)
+        validators = cached or self._validators
+        if cached:
+            if validators.get("etag"):
+                request.add_header("If-None-Match", validators["etag"])
+            if validators.get("last_modified"):
+                request.add_header("If-Modified-Since", validators["last_modified"])
+        elif self.received:
+            request.add_header("Range", "bytes=%i-" % self.received)
+            # Weak ETags cannot be used to put two parts of a file together
+            validator = validators.get("etag")
+            if not validator or validator.startswith("W/"):
+                validator = validators.get("last_modified")
+            if validator:
+                request.add_header("If-Range", validator)
+        try:
+            response = urllib.request.urlopen(request, timeout=NETWORK_TIMEOUT)
+        except urllib.error.HTTPError as error:
+            if cached and error.code == 304:
+                return
+            raise
+        if cached and response.status == 304:
+            response.close()
+            return
+
+        if response.status == 206:
+            start, total = parse_content_range(response.headers.get("Content-Range"))
+            if start != self.received:
+                response.close()
+                raise DownloadError("The server sent %s from byte %s on instead of %i" % (
+                    self.url, start, self.received))
+        else:
+            total = int(response.headers.get("Content-Length") or 0)
+            if self.received:
+                if self.position and _validators(response.headers) != self._validators:
+                    response.close()
+                    raise DownloadError("%s changed on the server while it was being downloaded" % self.url)
+                if self.position:
+                    # The server does not do ranges, skip what we have already
+                    self._skip(response, self.received)
+                else:
+                    print("Downloading %s from its start again" % self.url)
+                    self._restart()
+        self._response = response
+        self.total = total or self.total
+        if self.received:
+            print("Resuming %s at byte %i of %i" % (self.url, self.received, self.total))
+        self._validators = _validators(response.headers)
+        if self.caching:
+            self._write_partial_info()
+
+    def _skip(self, response, count):
+        while count:
+            data = response.read(min(count, READ_SIZE))
+            if not data:
+                raise DownloadError("The connection to %s was closed" % self.url)
+            count -= len(data)
+
+    def readinto(self, buffer):
+        with memoryview(buffer) as view:
+            if self.position < self.received:
+                count = os.preadv(self._fd, [view[:self.received - self.position]], self.position)
+            elif self.complete or (self.total and self.received >= self.total):
+                count = 0
+            else:
+                count = self._receive(view)
+            if count:
+                self.hash.update(view[:count])
+                self.position += count
+            elif not self.complete:
+                self._finish()
+        return count
+
+    def fileno(self):
+        """
+        The file in the cache, with self.received bytes so far, or None if it is not being cached
+        """
+        return self._fd
+
+    def read(self, size=READ_SIZE):
+        buffer = bytearray(size)
+        return bytes(buffer[:self.readinto(buffer)])
+
+    def _receive(self, view):
+        failures = 0
+        while True:
+            try:
+                if self._response is None:
+                    self._request()
+                count = self._response.readinto(view)
+            except urllib.error.HTTPError as error:
+                if error.code < 500:
+                    raise
+                reason = error
+            except (OSError, http.client.HTTPException) as error:
+                reason = error
+            else:
+                if count or not self.total or self.received >= self.total:
+                    break
+                reason = "the connection was closed early"
+            self._close_response()
+            failures += 1
+            if failures > RETRIES:
+                raise DownloadError("Could not download %s: %s" % (self.url, reason))
+            print("Download of %s stopped at byte %i (%s), resuming" % (self.url, self.received, reason))
+            self.resumed += 1
+            time.sleep(RETRY_DELAY * failures)
+        if count:
+            self._append(view[:count])
+        return count
+
+    def _append(self, data):
+        self.received += len(data)
+        if not self.caching:
+            return
+        try:
+            written = 0
+            while written < len(data):
+                written += os.write(self._fd, data[written:])
+        except OSError as error:
+            if error.errno not in (errno.ENOSPC, errno.EDQUOT):
+                raise
+            # Writing the image matters more than keeping it
+            print("Not caching %s any more: %s" % (self.url, error.strerror))
+            self.caching = False
+            self._remove_partial()
+
+    def _finish(self):
+        self.complete = True
+        self._close_response()
+        if not self.caching:
+            return
+        sha256 = self.hash.hexdigest()
+        if self.expected_sha256 and sha256 != self.expected_sha256:
+            self._remove_partial()
+            raise DownloadError("The downloaded image is damaged, its SHA-256 is %s instead of %s" % (
+                sha256, self.expected_sha256))
+        self.path = self.cache.add(self.url, self.cache.partial_path(self.url), sha256, self.received,
+                                   self._validators)
+        os.unlink(self._partial_info_path())
+        self.caching = False
+        print("Added %s to the download cache as %s" % (self.url, sha256))
+
+    def _remove_partial(self):
+        for path in (self.cache.partial_path(self.url), self._partial_info_path()):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._close_fd()
+
+    def _close_response(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+    def _close_fd(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def close(self):
+        """
+        What has been received so far stays in the cache, to be resumed
+        """
+        self._close_response()
+        if self.caching:
+            self._write_partial_info()
+        self._close_fd()
+
+
+def open_url(url, expected_sha256=None, cache=None):
+    """
+    A file-like object to read url from, through the cache where it makes sense.
+    Its total is the size of the file or 0 if it is not known.
+    """
+    if urllib.parse.urlparse(url).scheme not in CACHED_SCHEMES:
+        response = urllib.request.urlopen(url, timeout=NETWORK_TIMEOUT)
+        response.total = int(response.headers.get("Content-Length") or 0)
+        return response
+    return CachedDownload(url, expected_sha256, cache)
+
+
+def fetch(url, destination, progress=None, expected_sha256=None, cache=None):
+    """
+    Download url to destination through the cache, progress(bytes done, total) is called as it goes.
+    destination is a copy of the file in the cache, so that changing it does not change the cache.
+    A file larger than a quarter of the cache is moved out of it to destination instead, rather than
+    taking up twice its size on disk, and is downloaded again the next time.
+    """
+    temporary = destination + ".part"
+    kept = None
+    try:
+        with open_url(url, expected_sha256, cache) as source:
+            downloading = isinstance(source, CachedDownload)
+            cached = downloading and (source.caching or source.complete)
+            image_hash = source.hash if downloading else hashlib.sha256()
+            if cached and not source.complete:
+                # What the cache has received stays readable here if it gives up on keeping the file
+                kept = os.dup(source.fileno())
+            with open(temporary, "wb") as file:
+                buffer = bytearray(READ_SIZE)
+                done = 0
+                # What is in the cache already is copied at once
+                while not (cached and source.complete):
+                    count = source.readinto(buffer)
+                    if not count:
+                        break
+                    if cached and not source.caching:
+                        # The cache ran out of space, the file is written here from now on
+                        cached = False
+                        copied = 0
+                        while copied < done:
+                            data = os.pread(kept, min(READ_SIZE, done - copied), copied)
+                            if not data:
+                                raise DownloadError("Could not read back what was downloaded of %s" % url)
+                            file.write(data)
+                            copied += len(data)
+                        os.close(kept)
+                        kept = None
+                    if not cached:
+                        file.write(memoryview(buffer)[:count])
+                        if not downloading:
+                            image_hash.update(memoryview(buffer)[:count])
+                    done += count
+                    if progress:
+                        progress(done, source.total)
+            if not cached:
+                # The cache only checks the files it keeps
+                sha256 = image_hash.hexdigest()
+                if expected_sha256 and sha256 != expected_sha256.lower():
+                    raise DownloadError("The downloaded file is damaged, its SHA-256 is %s instead of %s" % (
+                        sha256, expected_sha256.lower()))
+            else:
+                if os.path.getsize(source.path) > source.cache.limit // 4:
+                    shutil.move(source.path, temporary)
+                    source.cache.forget({os.path.basename(source.path)})
+                else:
+                    shutil.copyfile(source.path, temporary)
+                if progress:
+                    progress(source.total, source.total)
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except FileNotFoundError:
+            pass
+        raise
+    finally:
+        if kept is not None:
+            os.close(kept)
+    os.replace(temporary, destination)
+    return destination
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+"""
+Checks and throughput of downloadcache.py against a local stand-in for the download server
+
+The stand-in serves a random image with an ETag and HTTP Range support, and can drop the
+connection part way through. The downloads are checked to resume where they stopped, to be read
+from the cache the next time, to be downloaded again when the image changes on the server and to
+be rejected when they do not match their SHA-256, also when they are not cached. Then a cold
+download, a download with dropped connections and a cached read are timed along with urlretrieve.
+
+Run it with:
+    python3 benchmarks/download_resume.py --size 256
+"""
+
+import argparse
+import hashlib
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import downloadcache
+
+downloadcache.RETRY_DELAY = 0
+MIB = 1024 * 1024
+
+
+class StandIn(object):
+    def __init__(self, size):
+        self.set_image(os.urandom(size))
+        # Requests from now on are cut after drop_after bytes, as long as drops is not 0
+        self.drops = 0
+        self.drop_after = 0
+        self.requests = []
+
+    def set_image(self, image):
+        self.image = image
+        self.etag = '"%s"' % hashlib.sha256(image).hexdigest()[:16]
+
+
+def handler(stand_in):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            image = stand_in.image
+            stand_in.requests.append((self.headers.get("Range"), self.headers.get("If-None-Match")))
+            if self.headers.get("If-None-Match") == stand_in.etag:
+                self.send_response(304)
+                self.send_header("ETag", stand_in.etag)
+                self.end_headers()
+                return
+            start = 0
+            byte_range = self.headers.get("Range")
+            if byte_range and self.headers.get("If-Range", stand_in.etag) == stand_in.etag:
+                start = int(byte_range.split("=")[1].rstrip("-"))
+                self.send_response(206)
+                self.send_header("Content-Range", "bytes %i-%i/%i" % (start, len(image) - 1, len(image)))
+            else:
+                self.send_response(200)
+            self.send_header("ETag", stand_in.etag)
+            self.send_header("Content-Length", str(len(image) - start))
+            self.end_headers()
+            end = len(image)
+            if stand_in.drops:
+                stand_in.drops -= 1
+                end = min(end, start + stand_in.drop_after)
+            try:
+                self.wfile.write(image[start:end])
+            except ConnectionError:
+                # The client stopped reading
+                return
+            if end < len(image):
+                self.close_connection = True
+
+    return Handler
+
+
+def read_all(source):
+    buffer = bytearray(4 * MIB)
+    while source.readinto(buffer):
+        pass
+    return source
+
+
+def check(stand_in, url, directory):
+    cache = downloadcache.DownloadCache(os.path.join(directory, "cache"))
+    sha256 = hashlib.sha256(stand_in.image).hexdigest()
+
+    stand_in.drops, stand_in.drop_after = 2, len(stand_in.image) // 3
+    with downloadcache.CachedDownload(url, cache=cache) as source:
+        read_all(source)
+    assert source.resumed == 2 and source.hash.hexdigest() == sha256, source.resumed
+    assert source.path == cache.blob_path(sha256) and open(source.path, "rb").read() == stand_in.image
+    assert [r for r, n in stand_in.requests][1:] == [
+        "bytes=%i-" % (len(stand_in.image) // 3), "bytes=%i-" % (len(stand_in.image) // 3 * 2)], stand_in.requests
+
+    # The same image is not downloaded again, only checked for changes
+    stand_in.requests.clear()
+    with downloadcache.CachedDownload(url, cache=cache) as source:
+        read_all(source)
+    assert stand_in.requests == [(None, stand_in.etag)] and source.hash.hexdigest() == sha256
+    stand_in.requests.clear()
+    with downloadcache.CachedDownload(url, sha256, cache=cache) as source:
+        read_all(source)
+    assert stand_in.requests == [] and source.hash.hexdigest() == sha256
+
+    # An image that changed on the server is downloaded again, from where an earlier attempt stopped
+    stand_in.set_image(os.urandom(len(stand_in.image)))
+    sha256 = hashlib.sha256(stand_in.image).hexdigest()
+    with downloadcache.CachedDownload(url, cache=cache) as source:
+        source.readinto(bytearray(MIB))
+    assert source.path is None and os.path.getsize(cache.partial_path(url)) == MIB
+    stand_in.requests.clear()
+    with downloadcache.CachedDownload(url, cache=cache) as source:
+        read_all(source)
+    assert stand_in.requests == [("bytes=%i-" % MIB, None)] and source.hash.hexdigest() == sha256
+    assert source.path == cache.blob_path(sha256)
+
+    # An image that does not match its checksum is not kept
+    stand_in.set_image(os.urandom(len(stand_in.image)))
+    try:
+        with downloadcache.CachedDownload(url, "0" * 64, cache=cache) as source:
+            read_all(source)
+    except downloadcache.DownloadError:
+        pass
+    else:
+        raise AssertionError("A damaged image was accepted")
+    assert not os.path.exists(cache.partial_path(url))
+
+    destination = os.path.join(directory, "image.img")
+    downloadcache.fetch(url, destination, cache=cache)
+    assert open(destination, "rb").read() == stand_in.image
+
+    # While another application downloads it into the cache, it is not cached here but still checked,
+    # and nothing is left behind when it does not match
+    stand_in.set_image(os.urandom(len(stand_in.image)))
+    other = os.path.join(directory, "other.img")
+    with downloadcache.CachedDownload(url, cache=cache) as source:
+        source.readinto(bytearray(MIB))
+        try:
+            downloadcache.fetch(url, other, expected_sha256="0" * 64, cache=cache)
+        except downloadcache.DownloadError:
+            pass
+        else:
+            raise AssertionError("A damaged download was accepted")
+        assert not os.path.exists(other) and not os.path.exists(other + ".part")
+        downloadcache.fetch(url, other, expected_sha256=hashlib.sha256(stand_in.image).hexdigest(), cache=cache)
+        assert open(other, "rb").read() == stand_in.image
+
+    # A file too large to keep a second copy of is moved out of the cache
+    sha256 = hashlib.sha256(stand_in.image).hexdigest()
+    small = downloadcache.DownloadCache(os.path.join(directory, "small"), limit=len(stand_in.image) * 2)
+    downloadcache.fetch(url, destination, cache=small)
+    assert open(destination, "rb").read() == stand_in.image
+    assert not os.path.exists(small.blob_path(sha256)) and url not in small.read_index()
+    print("All download checks passed")
+
+
+def throughput(name, size, run):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {size / MIB / elapsed:10.1f} MiB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="downloadcache.py checks and throughput")
+    parser.add_argument("--size", type=int, default=256, help="size of the image in MiB")
+    args = parser.parse_args()
+
+    stand_in = StandIn(args.size * MIB)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler(stand_in))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%i/image.img" % server.server_address[1]
+
+    with tempfile.TemporaryDirectory() as directory:
+        check(stand_in, url, directory)
+
+        size = len(stand_in.image)
+        cache = downloadcache.DownloadCache(os.path.join(directory, "timed"))
+        throughput("urlretrieve", size,
+                   lambda: urllib.request.urlretrieve(url, os.path.join(directory, "retrieved.img")))
+        throughput("download cache, cold", size,
+                   lambda: read_all(downloadcache.CachedDownload(url, cache=cache)).close())
+        stand_in.set_image(os.urandom(size))
+        stand_in.drops, stand_in.drop_after = 3, size // 4
+        throughput("download cache, 3 drops", size,
+                   lambda: read_all(downloadcache.CachedDownload(url, cache=cache)).close())
+        throughput("download cache, cached", size,
+                   lambda: read_all(downloadcache.CachedDownload(url, cache=cache)).close())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
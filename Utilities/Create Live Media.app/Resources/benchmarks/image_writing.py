@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Throughput of writing an image served over HTTP, in MiB/s
+
+Compares urllib.request.urlretrieve, which Create Live Media used before, with ImageWriter,
+which also computes the SHA-256 of the image, without and with reading the result back, and
+writing to several devices at once. The image is served from a local HTTP server and written
+to files standing in for the devices, through a download cache of its own for every run.
+A device that cannot be written is checked not to stop the others.
+
+Run it with:
+    python3 benchmarks/image_writing.py --mib 512
+"""
+
+import argparse
+import functools
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication
+
+import downloadcache
+from imagewriter import ImageWriter
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def throughput(name, size, run):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<16} {size / elapsed / 2 ** 20:10.0f} MiB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create Live Media image writing throughput")
+    parser.add_argument("--mib", type=int, default=512)
+    parser.add_argument("--devices", type=int, default=4)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        image = os.path.join(directory, "image.iso")
+        with open(image, "wb") as file:
+            for i in range(args.mib):
+                file.write(os.urandom(2 ** 20))
+        size = os.path.getsize(image)
+        server = serve(directory)
+        url = "http://127.0.0.1:%i/image.iso" % server.server_address[1]
+        devices = [os.path.join(directory, "device%i" % i) for i in range(args.devices)]
+
+        throughput("urlretrieve", size, lambda: urllib.request.urlretrieve(url, devices[0]))
+
+        for device in devices:
+            open(device, "wb").close()
+
+        def write(devices, verify=False):
+            cache = downloadcache.DownloadCache(tempfile.mkdtemp(dir=directory))
+            writer = ImageWriter(url, devices, verify=verify, cache=cache)
+            writer.device_failed.connect(lambda device, message: print(message))
+            writer.finished.connect(app.quit)
+            writer.start()
+            app.exec_()
+            return writer
+
+        throughput("ImageWriter", size, lambda: write(devices[:1]))
+        throughput("  and read back", size, lambda: write(devices[:1], verify=True))
+        throughput("  to %i devices" % len(devices), size, lambda: write(devices))
+        with open(image, "rb") as expected:
+            expected = expected.read()
+        for device in devices:
+            with open(device, "rb") as written:
+                assert expected == written.read(), "The image written to %s differs" % device
+
+        missing = os.path.join(directory, "missing", "device")
+        writer = write([missing] + devices[:1], verify=True)
+        assert list(writer.failures) == [missing], writer.failures
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
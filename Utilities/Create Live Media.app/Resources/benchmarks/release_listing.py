@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""
+Checks and timing of releaseindex.py against a local stand-in for the GitHub releases API
+
+The stand-in serves releases in pages linked with Link headers, answers If-None-Match with
+304 Not Modified like GitHub does, and takes --latency ms for every request. The releases are
+checked to be listed completely, to come from the cache at once the next time while they are
+checked in the background, and to be refreshed when a release is added. Failures are checked
+to be reported. Then listing without the cache, from the cache and revalidating are timed.
+
+Run it with:
+    python3 benchmarks/release_listing.py --releases 250 --latency 150
+"""
+
+import argparse
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer
+
+import releaseindex
+
+
+class StandIn(object):
+    def __init__(self, count, latency):
+        self.releases = [self.release(i) for i in range(count)]
+        self.latency = latency
+        self.fail = None
+        # (page, status) of every request
+        self.requests = []
+
+    @staticmethod
+    def release(number):
+        name = "r%i.iso" % number
+        return {"tag_name": "r%i" % number, "prerelease": False, "assets": [
+            {"name": name, "browser_download_url": "https://example.org/" + name, "size": 2 ** 30}]}
+
+
+def handler(stand_in):
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(stand_in.latency / 1000)
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+            per_page, page = int(query.get("per_page", 30)), int(query.get("page", 1))
+            if stand_in.fail:
+                stand_in.requests.append((page, 403))
+                self.send_response(403, stand_in.fail)
+                self.send_header("X-RateLimit-Remaining", "0")
+                self.end_headers()
+                return
+            body = json.dumps(stand_in.releases[(page - 1) * per_page:page * per_page]).encode()
+            etag = '"%x"' % hash(body)
+            if self.headers.get("If-None-Match") == etag:
+                stand_in.requests.append((page, 304))
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            stand_in.requests.append((page, 200))
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            if page * per_page < len(stand_in.releases):
+                self.send_header("Link", '<http://%s/releases?per_page=%i&page=%i>; rel="next"' % (
+                    self.headers["Host"], per_page, page + 1))
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def wait_for(index, url, timeout=30):
+    """
+    What the background refresh of url tells, None if it tells nothing
+    """
+    loop = QEventLoop()
+    told = []
+    index.releases_changed.connect(lambda changed_url, releases: told.append(releases))
+    index.failed.connect(lambda failed_url, message: told.append(message))
+    # Done once the refresh is over, what it told has been posted to this thread by then
+    timer = QTimer()
+    timer.timeout.connect(lambda: url not in index._refreshing and (QCoreApplication.sendPostedEvents(), loop.quit()))
+    timer.start(10)
+    QTimer.singleShot(timeout * 1000, loop.quit)
+    loop.exec_()
+    index.releases_changed.disconnect()
+    index.failed.disconnect()
+    return told[0] if told else None
+
+
+def check(stand_in, url, directory):
+    index = releaseindex.ReleaseIndex(directory)
+    assert index.releases(url) is None
+    releases = wait_for(index, url)
+    assert releases == stand_in.releases, "Listed %s" % (len(releases) if releases is not None else "nothing")
+    pages = -(-len(stand_in.releases) // releaseindex.PER_PAGE)
+    assert stand_in.requests == [(page, 200) for page in range(1, pages + 1)], stand_in.requests
+
+    # Another application, or this one started again, lists them from the disk
+    releaseindex.REFRESH_INTERVAL = 0
+    stand_in.requests.clear()
+    index = releaseindex.ReleaseIndex(directory)
+    assert index.releases(url) == stand_in.releases
+    assert wait_for(index, url) is None
+    assert stand_in.requests == [(page, 304) for page in range(1, pages + 1)], stand_in.requests
+
+    stand_in.releases.insert(0, StandIn.release(len(stand_in.releases)))
+    assert index.releases(url) == stand_in.releases[1:]
+    assert wait_for(index, url) == stand_in.releases
+
+    stand_in.fail = "rate limit exceeded"
+    index.releases(url)
+    assert "rate limit exceeded" in wait_for(index, url)
+    stand_in.fail = None
+    print("All release listing checks passed")
+
+
+def timed(name, run):
+    start = time.perf_counter()
+    run()
+    print(f"{name:<40} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="releaseindex.py checks and timing")
+    parser.add_argument("--releases", type=int, default=250)
+    parser.add_argument("--latency", type=int, default=150, help="ms the stand-in takes for every request")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    stand_in = StandIn(args.releases, args.latency)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler(stand_in))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%i/releases" % server.server_address[1]
+
+    with tempfile.TemporaryDirectory() as directory:
+        check(stand_in, url, directory)
+
+        def first_listing():
+            index = releaseindex.ReleaseIndex(os.path.join(directory, "cold"))
+            index.releases(url)
+            wait_for(index, url)
+
+        timed("first listing, nothing cached", first_listing)
+        index = releaseindex.ReleaseIndex(os.path.join(directory, "cold"))
+        timed("listing from the cache", lambda: index.releases(url))
+        timed("  checked in the background", lambda: wait_for(index, url))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+Checks and throughput of ImageWriter for compressed images and images with runs of zeros
+
+An image that is mostly zeros with random data in between, like the free space in a Live image,
+is served plain and compressed with gzip, bzip2, xz and, if a module for it is installed, zstd
+from a local HTTP server. It is written to files standing in for the devices: once to a file
+that already has data, which gets every block written, and then to empty files, which read back
+zeros where nothing is written. Every result is checked against the image, written and read back.
+A damaged compressed image is checked to fail.
+
+Run it with:
+    python3 benchmarks/sparse_writing.py --mib 256 --data 25
+"""
+
+import argparse
+import bz2
+import functools
+import gzip
+import http.server
+import lzma
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication
+
+import downloadcache
+import imagewriter
+from imagewriter import ImageWriter
+
+MIB = 2 ** 20
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_image(path, mib, data_percent):
+    image = bytearray(mib * MIB)
+    for block in random.Random(0).sample(range(mib), mib * data_percent // 100):
+        image[block * MIB:(block + 1) * MIB] = os.urandom(MIB)
+    # Not a whole number of sectors, the end gets padded
+    image += os.urandom(1000)
+    with open(path, "wb") as file:
+        file.write(image)
+    return bytes(image)
+
+
+def compressors():
+    yielded = {".gz": lambda data: gzip.compress(data, 1), ".bz2": lambda data: bz2.compress(data, 1),
+               ".xz": lambda data: lzma.compress(data, preset=0)}
+    if imagewriter.zstd:
+        yielded[".zst"] = imagewriter.zstd.compress
+    elif imagewriter.zstandard:
+        yielded[".zst"] = imagewriter.zstandard.ZstdCompressor().compress
+    return yielded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ImageWriter checks and throughput for compressed and sparse images")
+    parser.add_argument("--mib", type=int, default=256)
+    parser.add_argument("--data", type=int, default=25, help="percent of the image that is not zeros")
+    args = parser.parse_args()
+
+    assert imagewriter.is_image("live.img.xz") and imagewriter.is_image("Live.ISO") and \
+        not imagewriter.is_image("live.iso.zsync")
+    assert imagewriter.compression_of("https://example.org/live.iso.zst?download=1") == "zstd"
+
+    app = QCoreApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        image = make_image(os.path.join(directory, "live.img"), args.mib, args.data)
+        names = {"": "live.img"}
+        for suffix, compress in compressors().items():
+            with open(os.path.join(directory, "live.img" + suffix), "wb") as file:
+                file.write(compress(image))
+            names[suffix] = "live.img" + suffix
+        with open(os.path.join(directory, "damaged.img.xz"), "wb") as file:
+            file.write(lzma.compress(image, preset=0)[:-4096])
+        server = serve(directory)
+
+        def write(name, device, **options):
+            url = "http://127.0.0.1:%i/%s" % (server.server_address[1], name)
+            cache = downloadcache.DownloadCache(tempfile.mkdtemp(dir=directory))
+            writer = ImageWriter(url, [device], cache=cache, **options)
+            writer.finished.connect(app.quit)
+            writer.start()
+            app.exec_()
+            return writer
+
+        def run(label, name, prefilled=False, **options):
+            device = os.path.join(directory, "device")
+            with open(device, "wb") as file:
+                if prefilled:
+                    file.write(b"\xff" * len(image))
+            start = time.perf_counter()
+            writer = write(name, device, **options)
+            elapsed = time.perf_counter() - start
+            assert not writer.failures, writer.failures
+            with open(device, "rb") as written:
+                assert written.read(len(image)) == image, "The image written from %s differs" % name
+            downloaded = os.path.getsize(os.path.join(directory, name))
+            allocated = os.stat(device).st_blocks * 512
+            print(f"{label:<28} {len(image) / MIB / elapsed:8.0f} MiB/s {downloaded / MIB:8.1f} MiB downloaded "
+                  f"{allocated / MIB:8.1f} MiB written")
+            return writer
+
+        run("plain, every block", names[""], prefilled=True)
+        run("plain, zeros skipped", names[""])
+        run("plain, full writes", names[""], full_writes=True)
+        for suffix, name in names.items():
+            if suffix:
+                run(suffix + ", zeros skipped", name)
+        run(".xz, read back", names[".xz"], verify=True)
+        if ".zst" not in names:
+            print("zstd is left out, neither compression.zstd nor zstandard is available")
+
+        writer = write("damaged.img.xz", os.path.join(directory, "device"))
+        assert list(writer.failures) == [os.path.join(directory, "device")], writer.failures
+        print("All sparse and compressed writing checks passed")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
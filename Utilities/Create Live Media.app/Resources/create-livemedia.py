@@ -43,6 +43,9 @@ import json
 # pkg install py37-qt5-widgets
 from PyQt5 import QtWidgets, QtGui, QtCore, QtMultimedia
 import disks  # Privately bundled file
+import devicewatcher  # Privately bundled file
+import imagewriter
+import releaseindex  # Privately bundled file
 
 import ssl
 
@@ -106,9 +109,20 @@ class InstallWizard(QtWidgets.QWizard, object):
         print("Preparing wizard")
         super().__init__()
 
-        self.selected_disk_device = None
+        # Geom names of the disks to write the image to, several sticks can be written at once
+        self.selected_disk_devices = []
+        # Geom name: why it could not be written, for the ones that could not
+        self.failed_disk_devices = {}
+        # Whether the image was compared with a published SHA-256
+        self.image_checked = False
         self.user_agreed_to_erase = False
         self.selected_iso_url = None
+        # SHA-256 the image should have, or the URL of a file that has it, if the release tells
+        self.selected_iso_sha256 = None
+        self.selected_iso_checksum_url = None
+        self.verify_after_writing = True
+        # Also write the blocks of zeros that the medium would read back anyway
+        self.write_every_block = False
         self.geolocation = None
         self.timezone = None
         self.required_mib_on_disk = 0
@@ -177,7 +191,11 @@ class IntroPage(QtWidgets.QWizardPage, object):
         self.setSubTitle(
             tr("This will download a Live image and will write it to an attached storage device."))
 
+        # The repository whose releases are listed
         self.releases_url = None
+        self.release_index = releaseindex.ReleaseIndex()
+        self.release_index.releases_changed.connect(self.onReleasesChanged)
+        self.release_index.failed.connect(self.onReleasesFailed)
 
         self.disk_vlayout = QtWidgets.QVBoxLayout(self)
 
@@ -255,6 +273,7 @@ class IntroPage(QtWidgets.QWizardPage, object):
                 "updated_at", datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"))
             item.__setattr__("size", 2*1024*1024*1024)
             item.__setattr__("prerelease", False)
+            # No checksum_url: a guessed sidecar name would mostly not exist, so this image is not checked
             # FIXME: Can we at least attempt to get the real size from the URL?
             self.release_listwidget.addItem(item)
             return
@@ -263,8 +282,11 @@ class IntroPage(QtWidgets.QWizardPage, object):
 
             filedialog = QtWidgets.QFileDialog()
             filedialog.setDefaultSuffix("iso")
+            patterns = ["*" + suffix + compression for suffix in imagewriter.IMAGE_SUFFIXES
+                        for compression in [""] + list(imagewriter.COMPRESSION_SUFFIXES)]
+            # Compressed images too, without losing the translations
             filedialog.setNameFilter(
-                tr("Disk images (*.iso *.img);;All files (*.*)"))
+                tr("Disk images (*.iso *.img);;All files (*.*)").replace("*.iso *.img", " ".join(patterns)))
             filename = None
             if filedialog.exec_():
                 filename = filedialog.selectedFiles()[0]
@@ -278,51 +300,38 @@ class IntroPage(QtWidgets.QWizardPage, object):
                 "updated_at", info.lastModified().toString("%Y-%m-%dT%H:%M:%SZ"))
             item.__setattr__("size", info.size())
             item.__setattr__("prerelease", False)
+            if os.path.exists(filename + ".sha256"):
+                item.__setattr__("checksum_url", QtCore.QUrl.fromLocalFile(filename + ".sha256").toString())
             # FIXME: Can we at least attempt to get the real size from the URL?
             self.release_listwidget.addItem(item)
             self.onSelectionChanged()
             return
 
-        if internetCheckConnected() == False:
-            wizard.showErrorPage(
-                tr("This requires an active internet connection."))
-            self.label.hide()  # FIXME: Why is this needed? Can we do without?
-            self.repo_menu.hide()  # FIXME: Why is this needed? Can we do without?
-            self.release_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
-            return
-
         url = self.available_repos[self.repo_menu.currentIndex()]
-        print("Getting releases from", url)
 
         self.date_label.hide()
         self.url_label.hide()
 
-        result = None
-        try:
-            result = urllib.request.urlopen(url)
-
-        except urllib.error.HTTPError as e:
-            # Show error dialog box
-            dialog = QtWidgets.QMessageBox()
-            dialog.setWindowTitle("   ")
-            dialog.setText(
-                tr("The list of available images could not be retrieved."))
-            if "rate limit exceeded" in str(e):
-                dialog.setInformativeText(
-                    tr("You have exceeded the GitHub rate limit.\nPlease try again later."))
-            else:
-                dialog.setInformativeText(str(e))
-            dialog.setIcon(QtWidgets.QMessageBox.Critical)
-            dialog.exec_()
-            sys.exit(1)
-
-        data = json.loads(result.read().decode("utf-8"))
-        # print(data)
-        for release in data:
+        # At once from the cache if they were listed before, onReleasesChanged() tells when they change
+        releases = self.release_index.releases(url)
+        if releases is None:
+            if internetCheckConnected() == False:
+                wizard.showErrorPage(
+                    tr("This requires an active internet connection."))
+                self.label.hide()  # FIXME: Why is this needed? Can we do without?
+                self.repo_menu.hide()  # FIXME: Why is this needed? Can we do without?
+                self.release_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
+            return
+        self.releases_url = url
+        self.showReleases(releases)
+
+    def showReleases(self, releases):
+        for release in releases:
             if len(release["assets"]) > 0:
+                asset_urls = {asset["name"]: asset["browser_download_url"] for asset in release["assets"]}
                 # print(asset)
                 for asset in release["assets"]:
-                    if asset["browser_download_url"].endswith(".iso"):
+                    if imagewriter.is_image(asset["name"]):
                         # display_name = "%s (%s)" % (asset["name"], release["tag_name"])
                         display_name = "%s %s" % (
                             release["tag_name"], asset["name"])
@@ -341,6 +350,14 @@ class IntroPage(QtWidgets.QWizardPage, object):
                         item.__setattr__("body", release["body"])
                         item.__setattr__("html_url", release["html_url"])
                         item.__setattr__("release", release)
+                        # GitHub gives the digest of newer assets, older releases may have a sidecar file
+                        digest = asset.get("digest") or ""
+                        if digest.startswith("sha256:"):
+                            item.__setattr__("sha256", digest[len("sha256:"):])
+                        for suffix in (".sha256", ".sha256sum"):
+                            if asset["name"] + suffix in asset_urls:
+                                item.__setattr__("checksum_url", asset_urls[asset["name"] + suffix])
+                                break
                         if self.prerelease_checkbox.isChecked() == False:
                             if release["prerelease"] == False:
                                 self.release_listwidget.addItem(item)
@@ -350,17 +367,41 @@ class IntroPage(QtWidgets.QWizardPage, object):
                                 if datetime.strptime(asset["updated_at"], "%Y-%m-%dT%H:%M:%SZ") > datetime.now() - timedelta(days=180):
                                     self.release_listwidget.addItem(item)
 
-        # except:
-            # pass
-            # wizard.showErrorPage("The list of available images could not be retrieved. GitHub rate limit exceeded?")
-            # self.label.hide()  # FIXME: Why is this needed? Can we do without?
-            # self.repo_menu.hide()  # FIXME: Why is this needed? Can we do without?
-            # self.release_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
-            # return
+        # Keep what the user had selected before the list was refreshed
+        for row in range(self.release_listwidget.count()):
+            item = self.release_listwidget.item(row)
+            if item.browser_download_url == wizard.selected_iso_url:
+                item.setSelected(True)
 
         # Invalidate that the user already has selected something and we can proceed
         self.completeChanged.emit()
 
+    def onReleasesChanged(self, url, releases):
+        if url != self.available_repos[self.repo_menu.currentIndex()]:
+            return
+        self.available_isos = []
+        self.release_listwidget.clear()
+        self.releases_url = url
+        self.showReleases(releases)
+
+    def onReleasesFailed(self, url, message):
+        # The releases from the cache are good enough
+        if url != self.available_repos[self.repo_menu.currentIndex()] or url == self.releases_url:
+            return
+        # Show error dialog box
+        dialog = QtWidgets.QMessageBox()
+        dialog.setWindowTitle("   ")
+        dialog.setText(
+            tr("The list of available images could not be retrieved."))
+        if "rate limit exceeded" in message:
+            dialog.setInformativeText(
+                tr("You have exceeded the GitHub rate limit.\nPlease try again later."))
+        else:
+            dialog.setInformativeText(message)
+        dialog.setIcon(QtWidgets.QMessageBox.Critical)
+        dialog.exec_()
+        sys.exit(1)
+
     def onSelectionChanged(self):
         print("onSelectionChanged")
         # print("selectedIndexes", self.release_listwidget.selectedIndexes())
@@ -372,6 +413,8 @@ class IntroPage(QtWidgets.QWizardPage, object):
               items[0].__getattribute__("browser_download_url"))
         wizard.selected_iso_url = items[0].__getattribute__(
             "browser_download_url")
+        wizard.selected_iso_sha256 = getattr(items[0], "sha256", None)
+        wizard.selected_iso_checksum_url = getattr(items[0], "checksum_url", None)
         date = QtCore.QDateTime.fromString(
             items[0].__getattribute__("updated_at"), "yyyy-MM-ddThh:mm:ssZ")
         self.date_label.setText(date.toLocalTime().toString(
@@ -406,13 +449,17 @@ class DiskPage(QtWidgets.QWizardPage, object):
         print("Preparing DiskPage")
         super().__init__()
 
-        self.timer = QtCore.QTimer()  # Used to periodically check the available disks
+        self.disk_watch = devicewatcher.DiskWatch()  # Tells when disks come and go
+        self.disk_watch.changed.connect(self.list_disks)
         self.old_ds = None  # The disks we have recognized so far
+        # Geom name: Disk, of the disks in the list
+        self.disk_inventory = {}
         self.setTitle(tr('Select Destination Disk'))
         self.setSubTitle(tr('All data on the selected disk will be erased.'))
         self.disk_listwidget = QtWidgets.QListWidget()
         # self.disk_listwidget.setViewMode(QtWidgets.QListView.IconMode)
         self.disk_listwidget.setIconSize(QtCore.QSize(48, 48))
+        self.disk_listwidget.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
         # self.disk_listwidget.setSpacing(24)
         self.disk_listwidget.itemSelectionChanged.connect(
             self.onSelectionChanged)
@@ -420,16 +467,32 @@ class DiskPage(QtWidgets.QWizardPage, object):
         disk_vlayout.addWidget(self.disk_listwidget)
         self.label = QtWidgets.QLabel()
         disk_vlayout.addWidget(self.label)
+        self.verify_checkbox = QtWidgets.QCheckBox()
+        self.verify_checkbox.setText(tr("Verify the medium after writing"))
+        self.verify_checkbox.setChecked(wizard.verify_after_writing)
+        self.verify_checkbox.toggled.connect(self.onVerifyToggled)
+        disk_vlayout.addWidget(self.verify_checkbox)
+        self.every_block_checkbox = QtWidgets.QCheckBox()
+        self.every_block_checkbox.setText(tr("Write empty parts of the image, too"))
+        self.every_block_checkbox.setChecked(wizard.write_every_block)
+        self.every_block_checkbox.toggled.connect(self.onEveryBlockToggled)
+        disk_vlayout.addWidget(self.every_block_checkbox)
+
+    def onVerifyToggled(self, checked):
+        wizard.verify_after_writing = checked
+
+    def onEveryBlockToggled(self, checked):
+        wizard.write_every_block = checked
 
     def initializePage(self):
         print("Displaying DiskPage")
 
         # If the user clicked back and forth, start with nothing selected
         self.disk_listwidget.clearSelection()
-        self.periodically_list_disks()
+        self.watch_disks()
 
         if wizard.required_mib_on_disk < 5:
-            self.timer.stop()
+            self.disk_watch.stop()
             wizard.showErrorPage(
                 tr("Could not determine the required disk space."))
             self.disk_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
@@ -442,13 +505,10 @@ class DiskPage(QtWidgets.QWizardPage, object):
     def cleanupPage(self):
         print("Leaving DiskPage")
 
-    def periodically_list_disks(self):
-        print("periodically_list_disks")
+    def watch_disks(self):
+        print("watch_disks")
         self.list_disks()
-
-        self.timer.setInterval(3000)
-        self.timer.timeout.connect(self.list_disks)
-        self.timer.start()
+        self.disk_watch.start()
 
     def list_disks(self):
 
@@ -456,24 +516,24 @@ class DiskPage(QtWidgets.QWizardPage, object):
         # Do not refresh the list of disks if nothing has changed, because it de-selects the selection
         if ds != self.old_ds:
             self.disk_listwidget.clear()
+            self.disk_inventory = {}
             for d in ds:
-                di = disks.get_disk(d)
+                di = ds[d]
                 # print(di)
-                # print(di.get("descr"))
+                # print(di.descr)
                 # print(di.keys())
                 # Only show disks that are above minimum_target_disk_size and are writable
-                available_bytes = int(di.get("mediasize").split(" ")[0])
+                available_bytes = di.mediasize
                 # For now, we don't show cd* but once we add burning capabilities we may want to un-blacklist them
                 # TODO: Identify the disk the Live system is running from, and don't offer that
-                if (available_bytes >= wizard.required_mib_on_disk) and di.get("geomname").startswith("cd") == False:
+                if (available_bytes >= wizard.required_mib_on_disk) and di.geomname.startswith("cd") == False:
                     # item.setTextAlignment()
-                    title = "%s on %s (%s GiB)" % (di.get("descr"), di.get(
-                        "geomname"), f"{(available_bytes // (2 ** 30)):,}")
-                    if di.get("geomname").startswith("cd") == True:
+                    title = "%s on %s (%s GiB)" % (di.descr, di.geomname, f"{(available_bytes // (2 ** 30)):,}")
+                    if di.geomname.startswith("cd") == True:
                         # TODO: Add burning powers
                         item = QtWidgets.QListWidgetItem(
                             QtGui.QIcon.fromTheme('drive-optical'), title)
-                    elif di.get("geomname").startswith("da") == True:
+                    elif di.geomname.startswith("da") == True:
                         item = QtWidgets.QListWidgetItem(
                             QtGui.QIcon.fromTheme('drive-removable-media'), title)
                     else:
@@ -485,57 +545,62 @@ class DiskPage(QtWidgets.QWizardPage, object):
                     if available_bytes < wizard.required_mib_on_disk*1024*1024:
                         # Disk is too small
                         item.setFlags(QtCore.Qt.ItemIsSelectable)
+                    # __setattr__() is the equivalent to setProperty() in Qt
+                    item.__setattr__("disk", di)
+                    self.disk_inventory[di.geomname] = di
                     self.disk_listwidget.addItem(item)
             self.old_ds = ds
 
     def onSelectionChanged(self):
         wizard.user_agreed_to_erase = False
-        self.show_warning()
+        # self.isComplete() # Calling it like this does not make its result get used
+        # But like this isComplete() gets called and its result gets used
+        self.completeChanged.emit()
 
     def show_warning(self):
-        # After we remove the selection, do not call this again
-        if len(self.disk_listwidget.selectedItems()) != 1:
-            return
+        # Asked when going forward rather than on every click, so that several disks can be selected first
         wizard.user_agreed_to_erase = False
+        if len(wizard.selected_disk_devices) == 1:
+            text = tr("This will erase all contents of this disk and install the live system on it. Continue?")
+        else:
+            text = tr("This will erase all contents of these %i disks and install the live system on each of them. "
+                      "Continue?") % len(wizard.selected_disk_devices)
         reply = QtWidgets.QMessageBox.warning(
             wizard,
             tr("Warning"),
-            tr("This will erase all contents of this disk and install the live system on it. Continue?"),
+            text,
             QtWidgets.QMessageBox.Yes,
             QtWidgets.QMessageBox.No,
         )
         if reply == QtWidgets.QMessageBox.Yes:
-            print("User has agreed to erase all contents of this disk")
+            print("User has agreed to erase all contents of %s" % ", ".join(wizard.selected_disk_devices))
             wizard.user_agreed_to_erase = True
-        else:
-            self.disk_listwidget.clearSelection()
-            pass
-        # self.isComplete() # Calling it like this does not make its result get used
-        # But like this isComplete() gets called and its result gets used
-        self.completeChanged.emit()
+        return wizard.user_agreed_to_erase
+
+    def validatePage(self):
+        # showErrorPage() goes forward through here too
+        if wizard.should_show_last_page:
+            self.disk_watch.stop()
+            return True
+        if not self.show_warning():
+            return False
+        self.disk_watch.stop()  # cleanupPage() gets called only if the user goes back, not when they go forward
+        return True
 
     def isComplete(self):
-        if wizard.user_agreed_to_erase == True:
-            ds = disks.get_disks()
-            # Given a clear text label, get back the rdX
-            # TODO: Use __setattr__() and __getattribute__() instead; see above for an example on how to use those
-            for d in self.old_ds:
-                di = disks.get_disk(d)
-                searchstring = " on " + str(di.get("geomname")) + " "
-                print(searchstring)
-                if len(self.disk_listwidget.selectedItems()) < 1:
-                    return False
-                if searchstring in self.disk_listwidget.selectedItems()[0].text():
-                    wizard.selected_disk_device = str(di.get("geomname"))
-                    self.timer.stop()  # FIXME: This does not belong here, but cleanupPage() gets called only
-                    # if the user goes back, not when they go forward...
-                    return True
-
-        selected_disk_device = None
-        return False
+        # Qt asks often, so this only looks at what list_disks() found
+        selected_items = self.disk_listwidget.selectedItems()
+        wizard.selected_disk_devices = []
+        if len(selected_items) < 1:
+            return False
+        for item in selected_items:
+            di = self.disk_inventory.get(item.__getattribute__("disk").geomname)
+            if di is not None:
+                wizard.selected_disk_devices.append(di.geomname)
+        return len(wizard.selected_disk_devices) == len(selected_items)
 
     def cleanupPage(self):
-        self.timer.stop()
+        self.disk_watch.stop()
 
 #############################################################################
 # Installation page
@@ -553,37 +618,72 @@ class InstallationPage(QtWidgets.QWizardPage, object):
             tr('The Live image is being downloaded and written to the medium.'))
 
         self.layout = QtWidgets.QVBoxLayout(self)
-        self.progress = QtWidgets.QProgressBar(self)
-        self.layout.addWidget(self.progress, True)
+        self.progress_layout = QtWidgets.QFormLayout()
+        self.layout.addLayout(self.progress_layout, True)
+        # Device: its progress bar
+        self.progress = {}
+        self.writer = None
 
     def initializePage(self):
         print("Displaying InstallationPage")
         wizard.setButtonLayout(
             [QtWidgets.QWizard.Stretch])
 
+        # One progress bar for each device, labeled when there are several
+        while self.progress_layout.rowCount():
+            self.progress_layout.removeRow(0)
+        self.progress = {}
+        for device in wizard.selected_disk_devices:
+            self.progress['/dev/' + device] = QtWidgets.QProgressBar(self)
+            if len(wizard.selected_disk_devices) > 1:
+                self.progress_layout.addRow(device, self.progress['/dev/' + device])
+            else:
+                self.progress_layout.addRow(self.progress['/dev/' + device])
+
         # If we immediately call self.download(), then the window contents don't get drawn.
         # Hence we use a timer.
-        self.save_loc = '/dev/' + wizard.selected_disk_device
         workaroundtimer = QtCore.QTimer()
         workaroundtimer.singleShot(200, self.download)
 
-    def handleProgress(self, blocknum, blocksize, totalsize):
+    def handlePhase(self, device, phase):
+        self.progress[device].setValue(0)
+        if phase == imagewriter.PHASE_VERIFYING:
+            self.setTitle(tr('Verifying Live medium'))
+            self.setSubTitle(tr('The Live medium is being read back to make sure that it was written correctly.'))
 
-        processed_data = blocknum * blocksize
-        # print("processed_data %i" % processed_data)
+    def handleProgress(self, device, written, totalsize):
         if totalsize > 0:
-            download_percentage = processed_data * 100 / totalsize
-            self.progress.setValue(download_percentage)
-            # Important trick so that the app stays responsive without the need for threading!
-            QtWidgets.QApplication.processEvents()
+            self.progress[device].setMaximum(100)
+            self.progress[device].setValue(written * 100 // totalsize)
+        else:
+            # The server did not tell the size, show that something is happening
+            self.progress[device].setMaximum(0)
+
+    def handleFailure(self, device, message):
+        print('An error occurred on {}: {}'.format(device, message))
+        wizard.failed_disk_devices[os.path.basename(device)] = message
+        # The others go on
+        self.progress[device].setMaximum(100)
+        self.progress[device].setValue(0)
+        self.progress[device].setEnabled(False)
+
+    def handleFinished(self):
+        # Only known once the writer has looked for the checksum
+        wizard.image_checked = self.writer.expected_sha256 is not None
+        if len(wizard.failed_disk_devices) == len(wizard.selected_disk_devices):
+            wizard.showErrorPage("\n".join(sorted(set(wizard.failed_disk_devices.values()))) + ".")
+        else:
+            wizard.next()
 
     def download(self):
         print("Download started")
 
         import glob
-        partitions = glob.glob(self.save_loc + "*")
+        partitions = []
+        for device in self.progress:
+            partitions += glob.glob(device + "*")
         print("Trying to unmount %s*" % partitions)
-        # Unmount all partitions on the target disk
+        # Unmount all partitions on the target disks
         proc = QtCore.QProcess()
         command = '/sbin/umount'
         args = partitions
@@ -594,18 +694,23 @@ class InstallationPage(QtWidgets.QWizardPage, object):
         except:
             wizard.showErrorPage(tr("Could not unmount partitions."))
 
-        # Download and write directly to the device
+        # Download once and write to all devices at the same time, in threads so that the window stays responsive
         print(wizard.selected_iso_url)
-        socket.setdefaulttimeout(240)
-        print("socket.getdefaulttimeout(): %s" % socket.getdefaulttimeout())
-        try:
-            urllib.request.urlretrieve(
-                wizard.selected_iso_url, self.save_loc, self.handleProgress)
-        except BaseException as error:
-            print('An error occurred: {}'.format(error))
-            wizard.showErrorPage('{}'.format(error) + ".")
-
-        wizard.next()
+        sector_sizes = {}
+        for device in wizard.selected_disk_devices:
+            disk = disks.get_disk(device)
+            sector_sizes['/dev/' + device] = disk.sectorsize if disk else 512
+        wizard.failed_disk_devices = {}
+        wizard.image_checked = False
+        self.writer = imagewriter.ImageWriter(
+            wizard.selected_iso_url, list(self.progress), sector_sizes,
+            expected_sha256=wizard.selected_iso_sha256, checksum_url=wizard.selected_iso_checksum_url,
+            verify=wizard.verify_after_writing, full_writes=wizard.write_every_block)
+        self.writer.phase_changed.connect(self.handlePhase)
+        self.writer.progress.connect(self.handleProgress)
+        self.writer.device_failed.connect(self.handleFailure)
+        self.writer.finished.connect(self.handleFinished)
+        self.writer.start()
 
 #############################################################################
 # Success page
@@ -617,7 +722,8 @@ class SuccessPage(QtWidgets.QWizardPage, object):
 
         print("Preparing SuccessPage")
         super().__init__()
-        self.timer = QtCore.QTimer()  # Used to periodically check the available disks
+        self.disk_watch = devicewatcher.DiskWatch()  # Tells when the device is unplugged
+        self.disk_watch.changed.connect(self.list_disks)
 
     def initializePage(self):
         print("Displaying SuccessPage")
@@ -647,27 +753,29 @@ class SuccessPage(QtWidgets.QWizardPage, object):
         label = QtWidgets.QLabel()
         label.setText(
             tr("You can now start your computer from the Live medium."))
+        if wizard.failed_disk_devices:
+            label.setText(label.text() + "\n\n" + "\n".join(
+                "%s: %s." % (device, message) for device, message in sorted(wizard.failed_disk_devices.items())))
+        if not wizard.image_checked:
+            label.setText(label.text() + "\n\n" + tr("No checksum was published for this image, so it was not checked."))
         label.setWordWrap(True)
         layout.addWidget(label)
         self.setButtonText(wizard.CancelButton, tr("Quit"))
         wizard.setButtonLayout(
             [QtWidgets.QWizard.Stretch, QtWidgets.QWizard.CancelButton])
 
-        self.periodically_list_disks()
+        self.watch_disks()
 
-    def periodically_list_disks(self):
-        print("periodically_list_disks")
+    def watch_disks(self):
+        print("watch_disks")
         self.list_disks()
-
-        self.timer.setInterval(3000)
-        self.timer.timeout.connect(self.list_disks)
-        self.timer.start()
+        self.disk_watch.start()
 
     def list_disks(self):
         ds = disks.get_disks()
-        if "/dev/" + wizard.selected_disk_device not in ds:
+        if not any("/dev/" + device in ds for device in wizard.selected_disk_devices):
             print(tr("Device was unplugged, exiting"))
-            self.timer.stop()
+            self.disk_watch.stop()
             sys.exit(0)
 
 #############################################################################
@@ -0,0 +1,175 @@
+# Privately bundled in every application that lists disks.
+# Keep all the copies of this file identical.
+
+import os
+import re
+import socket
+
+from PyQt5.QtCore import QObject, QSocketNotifier, QTimer, pyqtSignal
+
+import disks
+
+DEVD_SEQPACKET_PIPE = "/var/run/devd.seqpacket.pipe"
+DEVD_PIPE = "/var/run/devd.pipe"
+# Path of a socket to use instead of the devd ones, e.g. a stand-in that replays events for testing
+DEVD_SOCKET_VARIABLE = "DEVD_SOCKET"
+# While devd cannot be reached, disks are listed again this often (in ms), like before there was a watcher
+FALLBACK_INTERVAL = 3000
+# A disk and its partitions come with one event each, tell about them once (in ms)
+COALESCE_INTERVAL = 250
+
+DISK_DEVICE_REGEX = re.compile(r"(ada|da|nvd|nda|vtbd|mmcsd|cd|md|mfid|mfisyspd|sdda|xbd)\d+")
+DEVD_VARIABLE_REGEX = re.compile(r'(\w+)=("[^"]*"|\S*)')
+
+
+def parse_devd_event(line):
+    """
+    Turns '!system=DEVFS subsystem=CDEV type=CREATE cdev=da0' into a dictionary.
+    Returns None for attach, detach and nomatch events, which start with '+', '-' and '?'.
+    """
+    if not line.startswith("!"):
+        return None
+    return {key: value.strip('"') for key, value in DEVD_VARIABLE_REGEX.findall(line[1:])}
+
+
+class DeviceWatcher(QObject):
+    """
+    Listens to devd and tells when devices come, go or change their media.
+    Costs nothing while no device changes. Where devd cannot be reached,
+    disks_changed is emitted periodically and the connection retried.
+    """
+    device_added = pyqtSignal(str)
+    device_removed = pyqtSignal(str)
+    device_changed = pyqtSignal(str)
+    # Disks or partitions came, went or changed, get_disks() lists them again
+    disks_changed = pyqtSignal()
+
+    def __init__(self, path=None, parent=None):
+        super().__init__(parent)
+        self.path = path or os.environ.get(DEVD_SOCKET_VARIABLE)
+        self.socket = None
+        self.notifier = None
+        self.buffer = b""
+
+        self.coalesce_timer = QTimer(self)
+        self.coalesce_timer.setSingleShot(True)
+        self.coalesce_timer.setInterval(COALESCE_INTERVAL)
+        self.coalesce_timer.timeout.connect(self.disks_changed)
+
+        self.fallback_timer = QTimer(self)
+        self.fallback_timer.setInterval(FALLBACK_INTERVAL)
+        self.fallback_timer.timeout.connect(self._fallback)
+
+        if not self.connect_devd():
+            print("Cannot connect to devd, listing the disks every %i ms instead" % FALLBACK_INTERVAL)
+            self.fallback_timer.start()
+
+    def connect_devd(self):
+        if self.path:
+            candidates = [(self.path, socket.SOCK_SEQPACKET), (self.path, socket.SOCK_STREAM)]
+        else:
+            candidates = [(DEVD_SEQPACKET_PIPE, socket.SOCK_SEQPACKET), (DEVD_PIPE, socket.SOCK_STREAM)]
+        for path, kind in candidates:
+            devd_socket = socket.socket(socket.AF_UNIX, kind)
+            try:
+                devd_socket.connect(path)
+            except OSError:
+                devd_socket.close()
+                continue
+            devd_socket.setblocking(False)
+            self.socket = devd_socket
+            self.buffer = b""
+            self.notifier = QSocketNotifier(devd_socket.fileno(), QSocketNotifier.Read, self)
+            self.notifier.activated.connect(self._read)
+            return True
+        return False
+
+    def _disconnect(self):
+        self.notifier.setEnabled(False)
+        self.notifier.deleteLater()
+        self.notifier = None
+        self.socket.close()
+        self.socket = None
+
+    def _read(self):
+        while self.socket is not None:
+            try:
+                data = self.socket.recv(8192)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                data = b""
+            if not data:
+                print("Lost the connection to devd")
+                self._disconnect()
+                self.fallback_timer.start()
+                return
+            # One event per line, a seqpacket message is a whole line
+            lines = (self.buffer + data).split(b"\n")
+            self.buffer = lines.pop()
+            for line in lines:
+                self.handle_event(line.decode("utf-8", "replace"))
+
+    def handle_event(self, line):
+        event = parse_devd_event(line)
+        if event is None:
+            return
+        cdev = event.get("cdev", "")
+        if event.get("system") == "DEVFS" and event.get("subsystem") == "CDEV":
+            if event.get("type") == "CREATE":
+                self.device_added.emit(cdev)
+            elif event.get("type") == "DESTROY":
+                self.device_removed.emit(cdev)
+            else:
+                return
+        elif event.get("system") == "GEOM" and event.get("subsystem") == "DEV" \
+                and event.get("type") in ("MEDIACHANGE", "SIZECHANGE"):
+            self.device_changed.emit(cdev)
+        else:
+            return
+        if DISK_DEVICE_REGEX.match(cdev):
+            disks.invalidate_disks()
+            if not self.coalesce_timer.isActive():
+                self.coalesce_timer.start()
+
+    def _fallback(self):
+        if self.connect_devd():
+            self.fallback_timer.stop()
+        # Catch up with what happened while nobody was listening
+        disks.invalidate_disks()
+        self.disks_changed.emit()
+
+
+_shared_watcher = None
+
+
+def shared_watcher():
+    """
+    The DeviceWatcher of the application, connected to devd on first use
+    """
+    global _shared_watcher
+    if _shared_watcher is None:
+        _shared_watcher = DeviceWatcher()
+    return _shared_watcher
+
+
+class DiskWatch(QObject):
+    """
+    For a page that shows disks: changed is emitted whenever disks come, go or change,
+    from start() until stop()
+    """
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.active = False
+
+    def start(self):
+        if not self.active:
+            shared_watcher().disks_changed.connect(self.changed)
+            self.active = True
+
+    def stop(self):
+        if self.active:
+            shared_watcher().disks_changed.disconnect(self.changed)
+            self.active = False
@@ -0,0 +1,676 @@
+#!/usr/bin/env python3
+
+import bisect
+import bz2
+import errno
+import fcntl
+import gzip
+import hashlib
+import io
+import lzma
+import mmap
+import os
+import re
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+
+try:
+    from compression import zstd  # Python 3.14 and later
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+import downloadcache  # Privately bundled file
+
+# Bytes read from the image and written to a device at a time, a multiple of every sector size
+CHUNK_SIZE = 4 * 1024 * 1024
+# Chunks of the image kept in memory at most, when there is no space left on disk for it
+MEMORY_CHUNKS = 4
+NETWORK_TIMEOUT = 240
+SHA256_REGEX = re.compile(r"\b[0-9a-fA-F]{64}\b")
+# Runs of zeros are looked for in blocks this large, a multiple of every sector size
+ZERO_BLOCK_SIZE = 64 * 1024
+ZERO_BLOCK = bytes(ZERO_BLOCK_SIZE)
+
+IMAGE_SUFFIXES = (".iso", ".img")
+# Suffix: what images ending in it are compressed with
+COMPRESSION_SUFFIXES = {".xz": "xz", ".gz": "gzip", ".bz2": "bzip2", ".zst": "zstd"}
+
+# Frees a range of a device, devices that support TRIM then read back zeros there
+if sys.platform.startswith("freebsd"):
+    DELETE_IOCTL = 0x80106488  # DIOCGDELETE
+    # What the device deletes at a time, and where its position 0 is in the first of them
+    STRIPE_SIZE_IOCTL = 0x4008648b  # DIOCGSTRIPESIZE
+    STRIPE_OFFSET_IOCTL = 0x4008648c  # DIOCGSTRIPEOFFSET
+elif sys.platform.startswith("linux"):
+    DELETE_IOCTL = 0x1277  # BLKDISCARD
+else:
+    DELETE_IOCTL = None
+# Written where deleting is tried out, to see that the device really reads back zeros there afterwards
+DELETE_PROBE_BYTE = b"\xa5"
+
+PHASE_WRITING = "writing"
+PHASE_VERIFYING = "verifying"
+
+
+def parse_checksum_file(text, name=None):
+    """
+    The SHA-256 in a .sha256 sidecar or a SHA256SUMS file, preferably from the line about name
+    """
+    lines = text.splitlines()
+    if name:
+        lines = [line for line in lines if name in line] + lines
+    for line in lines:
+        match = SHA256_REGEX.search(line)
+        if match:
+            return match.group().lower()
+    return None
+
+
+def compression_of(url):
+    """
+    What the image at url is compressed with, None if it is not
+    """
+    path = urllib.parse.urlparse(url).path.lower()
+    for suffix, compression in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return compression
+    return None
+
+
+def is_image(name):
+    """
+    Whether name is the one of a disk image that can be written, compressed or not
+    """
+    name = name.lower()
+    for suffix in COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.endswith(IMAGE_SUFFIXES)
+
+
+def decompressing(compression, source):
+    """
+    A file-like object that reads the decompressed image from source, source itself if it is not compressed
+    """
+    if compression is None:
+        return source
+    if compression == "xz":
+        return lzma.LZMAFile(source)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=source)
+    if compression == "bzip2":
+        return bz2.BZ2File(source)
+    if zstd:
+        return zstd.ZstdFile(source)
+    if zstandard:
+        return zstandard.ZstdDecompressor().stream_reader(source, read_across_frames=True)
+    raise WriteError("Images compressed with zstd can only be written once the zstandard Python module is installed")
+
+
+def delete_alignment(fd):
+    """
+    (granularity, offset) of the ranges the device open as fd deletes, each range starts granularity
+    bytes after the one before, the first one offset bytes before position 0. (0, 0) if it is not known.
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            rdev = os.fstat(fd).st_rdev
+            path = "/sys/dev/block/%i:%i" % (os.major(rdev), os.minor(rdev))
+            offset = 0
+            if os.path.exists(os.path.join(path, "partition")):
+                with open(os.path.join(path, "start")) as file:
+                    offset = int(file.read()) * 512
+                path = os.path.join(path, "..")
+            with open(os.path.join(path, "queue", "discard_granularity")) as file:
+                return int(file.read()), offset
+        if sys.platform.startswith("freebsd"):
+            size, = struct.unpack("q", fcntl.ioctl(fd, STRIPE_SIZE_IOCTL, bytes(8)))
+            offset, = struct.unpack("q", fcntl.ioctl(fd, STRIPE_OFFSET_IOCTL, bytes(8)))
+            return size, offset
+    except (OSError, ValueError):
+        pass
+    return 0, 0
+
+
+class WriteError(Exception):
+    pass
+
+
+class _Staging(object):
+    """
+    The image as far as it has been read, that each device writer reads at its own pace. It is kept in
+    files, the image itself or a temporary copy, and in memory when there is no space left for a copy.
+    """
+
+    def __init__(self, devices):
+        # (offset in the image, file descriptor or bytes) of each part of the image, in order.
+        # A file has its part at the offset in the image minus the one of its part.
+        self.parts = []
+        # Whether append() writes to the file of the last part
+        self.spooling = False
+        # Bytes of the parts in memory
+        self.held = 0
+        self.available = 0
+        self.complete = False
+        self.failed = False
+        # Why reading failed, None when it was stopped
+        self.error = None
+        self.condition = threading.Condition()
+        # How far each device writer has read, the parts they have all read past are dropped
+        self.positions = {device: 0 for device in devices}
+        # The reader and the writers, the files are closed when the last one is done with them
+        self.users = 1 + len(devices)
+
+    def add_file(self, fd):
+        """
+        Read what is available from now on from fd, at the same offsets as in the image
+        """
+        with self.condition:
+            self.parts.append((0, fd))
+
+    def spool(self):
+        """
+        Keep what is appended from now on in a temporary file
+        """
+        try:
+            spool = tempfile.TemporaryFile()
+        except OSError as error:
+            print("Could not create a temporary copy of the image: %s" % error.strerror)
+            return
+        with self.condition:
+            self.parts.append((self.available, os.dup(spool.fileno())))
+            self.spooling = True
+        spool.close()
+
+    def append(self, data):
+        """
+        Add data to the end of the image, in memory once there is no space left for it in the temporary file
+        """
+        written = 0
+        if self.spooling:
+            start, fd = self.parts[-1]
+            try:
+                while written < len(data):
+                    written += os.write(fd, data[written:])
+            except OSError as error:
+                if error.errno not in (errno.ENOSPC, errno.EDQUOT):
+                    raise
+                # The slowest device writer sets the pace from now on
+                print("No space left for a temporary copy of the image, keeping the rest of it in memory")
+                self.spooling = False
+            self.grow(self.available + written)
+        if written == len(data):
+            return
+        with self.condition:
+            while self.held >= MEMORY_CHUNKS * CHUNK_SIZE:
+                if self.failed:
+                    raise WriteError(self.error)
+                self.condition.wait()
+            self.parts.append((self.available, bytes(data[written:])))
+            self.held += len(data) - written
+            self.available += len(data) - written
+            self.condition.notify_all()
+
+    def grow(self, available, complete=False):
+        with self.condition:
+            self.available = available
+            self.complete = complete
+            self.condition.notify_all()
+
+    def fail(self, error):
+        with self.condition:
+            if not self.failed:
+                self.failed = True
+                self.error = error
+            self.condition.notify_all()
+
+    def advance(self, device, position):
+        """
+        device has read the image up to position, or all it needs of it when position is None
+        """
+        with self.condition:
+            if position is None:
+                self.positions.pop(device, None)
+            else:
+                self.positions[device] = position
+            slowest = min(self.positions.values(), default=self.available)
+            dropped = False
+            while len(self.parts) > 1 and self.parts[1][0] <= slowest:
+                start, part = self.parts.pop(0)
+                if isinstance(part, bytes):
+                    self.held -= len(part)
+                else:
+                    os.close(part)
+                dropped = True
+            if dropped:
+                self.condition.notify_all()
+
+    def release(self):
+        with self.condition:
+            self.users -= 1
+            if self.users == 0:
+                for start, part in self.parts:
+                    if not isinstance(part, bytes):
+                        os.close(part)
+                self.parts = []
+
+    def wait(self, offset, size):
+        """
+        How many of the size bytes from offset on can be read, once they all can or the image is complete
+        """
+        with self.condition:
+            while True:
+                if self.failed:
+                    raise WriteError(self.error)
+                if self.available - offset >= size or self.complete:
+                    return min(size, self.available - offset)
+                self.condition.wait()
+
+    def read(self, offset, view):
+        """
+        Read into view from offset on, as far as the part offset is in goes
+        """
+        with self.condition:
+            index = bisect.bisect_right([start for start, part in self.parts], offset) - 1
+            start, part = self.parts[index]
+            end = self.parts[index + 1][0] if index + 1 < len(self.parts) else self.available
+        count = min(len(view), end - offset)
+        if isinstance(part, bytes):
+            view[:count] = part[offset - start:offset - start + count]
+            return count
+        return os.preadv(part, [view[:count]], offset - start)
+
+
+class _StagingReader(io.RawIOBase):
+    """
+    The image as it is read from the staging parts by one device writer, waiting for what has not arrived yet
+    """
+
+    def __init__(self, staging, device):
+        super().__init__()
+        self.staging = staging
+        self.device = device
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        with memoryview(buffer) as view:
+            length = self.staging.wait(self.position, len(view))
+            done = 0
+            while done < length:
+                done += self.staging.read(self.position + done, view[done:length])
+        self.position += length
+        self.staging.advance(self.device, self.position)
+        return length
+
+
+class ImageWriter(QObject):
+    """
+    Writes the image at url to each of devices at the same time, downloading it once.
+
+    One thread reads the image into the download cache, or into a temporary file when it cannot be kept
+    there, from where it ran out of space on. When there is no space left for that either, the rest of
+    the image is kept in a few chunks in memory, and the slowest device sets the pace. Each device has a thread of its own that reads what has arrived so far in large chunks and
+    writes them with os.pwrite, so that a slow device does not hold up the others and a failing one
+    does not stop them. Every device is synced before it is reported as finished.
+
+    Images compressed with xz, gzip, bzip2 or zstd are downloaded and cached as they are, and each
+    device writer decompresses them as it goes. Blocks of zeros are not written to devices that
+    already read back zeros there: empty files, zeroed_devices, and devices that support TRIM, which
+    get those ranges deleted instead, in whole units of what the device deletes at a time, once the
+    start of the device was seen to read back zeros after it was written and deleted. With full_writes, every block is written.
+
+    The SHA-256 of the image is computed as it is read, and compared with expected_sha256 or the one
+    in the file at checksum_url. With verify, each device is then read back and its SHA-256 compared
+    with the one of what was written to it.
+
+    The signals are emitted from the threads, connected slots run in the thread of their object.
+    """
+    # Device, bytes done so far in its current phase, bytes in the image or 0 if the server does not tell.
+    # While writing, they are bytes of the image as it was downloaded, before it is decompressed.
+    progress = pyqtSignal(str, object, object)
+    # Device, PHASE_WRITING then PHASE_VERIFYING
+    phase_changed = pyqtSignal(str, str)
+    device_finished = pyqtSignal(str)
+    device_failed = pyqtSignal(str, str)
+    # Every device is done, whether it could be written or not
+    finished = pyqtSignal()
+
+    def __init__(self, url, devices, sector_sizes=None, expected_sha256=None, checksum_url=None, verify=False,
+                 full_writes=False, zeroed_devices=(), cache=None, parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.devices = list(devices)
+        self.sector_sizes = sector_sizes or {}
+        self.expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        self.checksum_url = checksum_url
+        self.verify = verify
+        self.full_writes = full_writes
+        self.zeroed_devices = set(zeroed_devices)
+        self.compression = compression_of(url)
+        self.cache = cache
+        self.total = 0
+        # Of the image as it was read, once all of it has been
+        self.sha256 = None
+        # Device: message, for the devices that could not be written
+        self.failures = {}
+        self._staging = _Staging(self.devices)
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._remaining = len(self.devices)
+        self._threads = []
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._read, name="ImageWriter reader", daemon=True)]
+        for device in self.devices:
+            self._threads.append(threading.Thread(target=self._write, args=(device,),
+                                                  name="ImageWriter writer for %s" % device, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Stop reading and writing, what was written stays on the devices
+        """
+        self._stopped.set()
+        self._staging.fail(None)
+        for thread in self._threads:
+            thread.join()
+
+    def open_source(self):
+        """
+        The file-like object the image is read from, self.total is set if its size is known
+        """
+        source = downloadcache.open_url(self.url, self.expected_sha256, self.cache)
+        self.total = source.total
+        return source
+
+    def fetch_expected_sha256(self):
+        if self.expected_sha256 or not self.checksum_url:
+            return
+        try:
+            with urllib.request.urlopen(self.checksum_url, timeout=NETWORK_TIMEOUT) as response:
+                text = response.read(1024 * 1024).decode("utf-8", "replace")
+        except Exception as error:
+            # Not every image comes with a checksum
+            print("No checksum from %s: %s" % (self.checksum_url, error))
+            return
+        self.expected_sha256 = parse_checksum_file(text, os.path.basename(self.url))
+
+    def _read(self):
+        staging = self._staging
+        try:
+            # Rather than downloading what cannot be decompressed
+            decompressing(self.compression, io.BytesIO())
+            self.fetch_expected_sha256()
+            with self.open_source() as source:
+                local = urllib.parse.urlparse(self.url).scheme == "file"
+                cached = getattr(source, "caching", False) or getattr(source, "complete", False)
+                if local or cached:
+                    # The writers read the file itself, as far as it has been read here
+                    staging.add_file(os.dup(source.fileno()))
+                else:
+                    staging.spool()
+                if local or getattr(source, "complete", False):
+                    staging.grow(self.total)
+                # The download cache hashes what it reads anyway
+                hashing = not hasattr(source, "hash")
+                image_hash = hashlib.sha256() if hashing else source.hash
+                position = 0
+                buffer = mmap.mmap(-1, CHUNK_SIZE)
+                with memoryview(buffer) as view:
+                    while not self._stopped.is_set():
+                        count = source.readinto(view)
+                        if not count:
+                            break
+                        position += count
+                        if hashing:
+                            image_hash.update(view[:count])
+                        if cached and not (source.caching or source.complete):
+                            # The download cache ran out of space while adding this chunk, what it has
+                            # before it stays readable for the writers and the rest goes elsewhere
+                            print("Keeping the rest of the image in a temporary copy")
+                            cached = False
+                            staging.spool()
+                        if cached:
+                            staging.grow(max(source.received, staging.available))
+                        elif local:
+                            staging.grow(max(position, staging.available))
+                        else:
+                            staging.append(view[:count])
+                buffer.close()
+            if self._stopped.is_set():
+                return
+            self.total = position
+            self.sha256 = image_hash.hexdigest()
+            print("SHA-256 of the image: %s" % self.sha256)
+            if self.expected_sha256 and self.sha256 != self.expected_sha256:
+                raise WriteError("The downloaded image is damaged, its SHA-256 is %s instead of %s" % (
+                    self.sha256, self.expected_sha256))
+            staging.grow(position, complete=True)
+        except (WriteError, downloadcache.DownloadError) as error:
+            staging.fail(str(error))
+        except Exception as error:
+            staging.fail("Could not download %s: %s" % (self.url, error))
+        finally:
+            staging.release()
+
+    def _write(self, device):
+        buffer = mmap.mmap(-1, CHUNK_SIZE)
+        try:
+            size, sha256 = self._write_device(device, buffer)
+            if self.verify:
+                self._verify(device, buffer, size, sha256 or self.sha256)
+        except WriteError as error:
+            if error.args[0] is not None:
+                self.failures[device] = error.args[0]
+                print("Could not write %s: %s" % (device, error.args[0]))
+                self.device_failed.emit(device, error.args[0])
+        else:
+            self.device_finished.emit(device)
+        finally:
+            buffer.close()
+            self._staging.advance(device, None)
+            self._staging.release()
+            with self._lock:
+                self._remaining -= 1
+                done = self._remaining == 0
+            if done:
+                # Nobody needs the rest of the image any more
+                self._stopped.set()
+                self.finished.emit()
+
+    def _write_device(self, device, buffer):
+        """
+        Write the image to device as it arrives, returns its size and, if it was decompressed
+        and is going to be verified, its SHA-256
+        """
+        sector_size = self.sector_sizes.get(device) or 512
+        try:
+            fd = os.open(device, os.O_WRONLY)
+        except OSError as error:
+            raise WriteError("Could not open %s: %s" % (device, error.strerror))
+        self.phase_changed.emit(device, PHASE_WRITING)
+        raw = _StagingReader(self._staging, device)
+        view = memoryview(buffer)
+        image_hash = hashlib.sha256() if self.verify and self.compression else None
+        try:
+            source = decompressing(self.compression, raw)
+            skip_zeros = self._zero_skipper(device, fd)
+            offset = end = 0
+            # Where the zeros that have not been written yet start
+            hole = None
+            while True:
+                length = 0
+                while length < CHUNK_SIZE:
+                    count = source.readinto(view[length:])
+                    if not count:
+                        break
+                    length += count
+                if not length:
+                    break
+                if image_hash:
+                    image_hash.update(view[:length])
+                # Devices only take whole sectors, the end of the last one is filled with zeros
+                padded = -(-length // sector_size) * sector_size
+                if padded > length:
+                    buffer[length:padded] = bytes(padded - length)
+                for start, end, zeros in self._runs(buffer, padded, skip_zeros is not None):
+                    if zeros:
+                        if hole is None:
+                            hole = offset + start
+                        continue
+                    if hole is not None:
+                        skip_zeros(hole, offset + start - hole)
+                        hole = None
+                    written = start
+                    while written < end:
+                        written += os.pwrite(fd, view[written:end], offset + written)
+                end = offset + padded
+                offset += length
+                self.progress.emit(device, raw.position, self.total)
+            if hole is not None:
+                skip_zeros(hole, end - hole)
+            os.fsync(fd)
+        except WriteError:
+            raise
+        except OSError as error:
+            raise WriteError("Could not write to %s: %s" % (device, error.strerror or error))
+        except Exception as error:
+            # Decompressors raise errors of their own about damaged data
+            raise WriteError("Could not decompress the image: %s" % error)
+        finally:
+            view.release()
+            os.close(fd)
+        # A damaged image is only known once all of it has been read
+        self._staging.wait(raw.position, 1)
+        return offset, image_hash.hexdigest() if image_hash else None
+
+    @staticmethod
+    def _runs(buffer, length, find_zeros):
+        """
+        (start, end, whether it is all zeros) of the runs in the first length bytes of buffer
+        """
+        if not find_zeros:
+            yield 0, length, False
+            return
+        run_start, run_zeros = 0, None
+        for start in range(0, length, ZERO_BLOCK_SIZE):
+            end = min(start + ZERO_BLOCK_SIZE, length)
+            zeros = buffer[start:end] == ZERO_BLOCK[:end - start]
+            if zeros != run_zeros and start > 0:
+                yield run_start, start, run_zeros
+                run_start = start
+            run_zeros = zeros
+        if length:
+            yield run_start, length, run_zeros
+
+    def _zero_skipper(self, device, fd):
+        """
+        A function that makes length bytes from start read back zeros on device without writing all of them,
+        None if zeros have to be written
+        """
+        if self.full_writes:
+            return None
+        info = os.fstat(fd)
+        regular = stat.S_ISREG(info.st_mode)
+        if device in self.zeroed_devices or (regular and info.st_size == 0):
+            if regular:
+                # Files read back zeros where nothing was written, as far as they are long
+                return lambda start, length: os.ftruncate(fd, max(start + length, os.fstat(fd).st_size))
+            return lambda start, length: None
+        if regular or DELETE_IOCTL is None:
+            return None
+
+        # Deletes that are not whole ranges of the device can be ignored, only whole units are deleted
+        granularity, origin = delete_alignment(fd)
+        unit = -(-ZERO_BLOCK_SIZE // granularity) * granularity if granularity > 0 else ZERO_BLOCK_SIZE
+        origin %= unit
+
+        def delete(start, length):
+            fcntl.ioctl(fd, DELETE_IOCTL, struct.pack("qq", start, length))
+
+        def write_zeros(start, end):
+            while start < end:
+                start += os.pwrite(fd, ZERO_BLOCK[:min(ZERO_BLOCK_SIZE, end - start)], start)
+
+        def skip_zeros(start, length):
+            end = start + length
+            first = -(-(start + origin) // unit) * unit - origin
+            last = (end + origin) // unit * unit - origin
+            if last <= first:
+                write_zeros(start, end)
+                return
+            write_zeros(start, first)
+            delete(first, last - first)
+            write_zeros(last, end)
+
+        # Deleting does not read back zeros on every device. Find out at the start of the image, which is
+        # written over anyway: what was written there has to read back as zeros once it is deleted.
+        probe_start = -(-origin // unit) * unit - origin
+        try:
+            pattern = DELETE_PROBE_BYTE * unit
+            written = 0
+            while written < unit:
+                written += os.pwrite(fd, pattern[written:], probe_start + written)
+            os.fsync(fd)
+            delete(probe_start, unit)
+            probe = os.open(device, os.O_RDONLY)
+            try:
+                zeros = os.pread(probe, unit, probe_start) == bytes(unit)
+            finally:
+                os.close(probe)
+        except OSError:
+            # Most USB sticks do not support TRIM
+            return None
+        if not zeros:
+            return None
+        print("%s reads back zeros where it was deleted, blocks of zeros are deleted on it in units of %i bytes"
+              % (device, unit))
+        return skip_zeros
+
+    def _verify(self, device, buffer, size, sha256):
+        """
+        Read back the size bytes of the image from device with large sequential reads
+        """
+        self.phase_changed.emit(device, PHASE_VERIFYING)
+        self.progress.emit(device, 0, size)
+        read_back = hashlib.sha256()
+        view = memoryview(buffer)
+        try:
+            fd = os.open(device, os.O_RDONLY)
+            try:
+                done = 0
+                while done < size and not self._stopped.is_set():
+                    count = os.readv(fd, [buffer])
+                    if not count:
+                        break
+                    count = min(count, size - done)
+                    read_back.update(view[:count])
+                    done += count
+                    self.progress.emit(device, done, size)
+            finally:
+                os.close(fd)
+        except OSError as error:
+            raise WriteError("Could not read back %s: %s" % (device, error.strerror))
+        finally:
+            view.release()
+        if self._stopped.is_set():
+            raise WriteError(None)
+        if done < size or read_back.hexdigest() != sha256:
+            raise WriteError("The medium does not read back what was written to it, it may be damaged")
+        print("Read back %i bytes from %s, they match the image" % (done, device))
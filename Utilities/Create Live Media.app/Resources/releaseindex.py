@@ -0,0 +1,157 @@
+# Privately bundled in every application that lists GitHub releases.
+# Keep all the copies of this file identical.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+CACHE_DIRECTORY = os.path.expanduser("~/.cache/hello/Releases")
+# Releases checked less than this many seconds ago are not asked for again
+REFRESH_INTERVAL = 60
+PER_PAGE = 100
+# Releases beyond PER_PAGE * MAX_PAGES are not listed
+MAX_PAGES = 5
+NETWORK_TIMEOUT = 30
+
+LINK_NEXT_REGEX = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+
+def first_page_url(url):
+    """
+    url asking for as many releases per page as GitHub gives, so that fewer pages are needed
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.parse_qsl(parts.query)
+    if "per_page" not in dict(query):
+        query.append(("per_page", str(PER_PAGE)))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def cache_path(url, directory=CACHE_DIRECTORY):
+    return os.path.join(directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def read_cache(url, directory=CACHE_DIRECTORY):
+    try:
+        with open(cache_path(url, directory)) as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("url") == url else None
+
+
+def write_cache(entry, directory=CACHE_DIRECTORY):
+    path = cache_path(entry["url"], directory)
+    os.makedirs(directory, exist_ok=True)
+    temporary = "%s.%i" % (path, os.getpid())
+    with open(temporary, "w") as file:
+        json.dump(entry, file)
+    os.replace(temporary, path)
+
+
+def releases_of(entry):
+    return [release for page in entry["pages"] for release in page["releases"]]
+
+
+def fetch_releases(url, cached=None):
+    """
+    The releases at url, a GitHub API URL, page by page as a cache entry. Pages that did not change
+    since cached are not downloaded again: GitHub answers If-None-Match with 304 Not Modified, which
+    does not count against its rate limit.
+    """
+    old_pages = {page["url"]: page for page in (cached or {}).get("pages", [])}
+    pages = []
+    page_url = first_page_url(url)
+    while page_url and len(pages) < MAX_PAGES:
+        old = old_pages.get(page_url)
+        request = urllib.request.Request(page_url, headers={"Accept": "application/vnd.github+json"})
+        if old and old.get("etag"):
+            request.add_header("If-None-Match", old["etag"])
+        try:
+            response = urllib.request.urlopen(request, timeout=NETWORK_TIMEOUT)
+        except urllib.error.HTTPError as error:
+            if error.code == 304 and old:
+                pages.append(old)
+                page_url = old["next"]
+                continue
+            raise
+        with response:
+            releases = json.loads(response.read().decode("utf-8"))
+            link = LINK_NEXT_REGEX.search(response.headers.get("Link") or "")
+            page = {
+                "url": page_url,
+                "etag": response.headers.get("ETag"),
+                "next": link.group(1) if link else None,
+                "releases": releases,
+            }
+        pages.append(page)
+        page_url = page["next"]
+    return {"url": url, "checked": time.time(), "pages": pages}
+
+
+class ReleaseIndex(QObject):
+    """
+    The releases of GitHub repositories, at once from a cache on disk if they were listed before,
+    checked again in a background thread. The signals are emitted from that thread, connected
+    slots run in the thread of their object.
+    """
+    # URL, its releases, when they differ from what releases() returned
+    releases_changed = pyqtSignal(str, object)
+    # URL, why its releases could not be listed
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, directory=CACHE_DIRECTORY, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def releases(self, url):
+        """
+        The releases at url as they were last seen, or None if they never were. Unless they were checked
+        within REFRESH_INTERVAL, they are checked in the background and releases_changed tells if they changed.
+        """
+        entry = self._entries.get(url) or read_cache(url, self.directory)
+        if entry is not None:
+            self._entries[url] = entry
+        if entry is None or time.time() - entry["checked"] > REFRESH_INTERVAL:
+            self.refresh(url)
+        return releases_of(entry) if entry is not None else None
+
+    def refresh(self, url):
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+        threading.Thread(target=self._refresh, args=(url,), name="ReleaseIndex", daemon=True).start()
+
+    def _refresh(self, url):
+        cached = self._entries.get(url)
+        # Until what it found is known, nothing starts another refresh from what it started with
+        try:
+            try:
+                print("Getting releases from", url)
+                entry = fetch_releases(url, cached)
+            except Exception as error:
+                print("Could not get releases from %s: %s" % (url, error))
+                self.failed.emit(url, str(error))
+                return
+            try:
+                write_cache(entry, self.directory)
+            except OSError as error:
+                print("Could not cache the releases from %s: %s" % (url, error.strerror))
+            self._entries[url] = entry
+            if cached is None or releases_of(cached) != releases_of(entry):
+                self.releases_changed.emit(url, releases_of(entry))
+        finally:
+            with self._lock:
+                self._refreshing.discard(url)
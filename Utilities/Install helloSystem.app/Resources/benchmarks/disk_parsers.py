@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""
+Checks and throughput of the geom, glabel, gpart and zpool parsers in disks.py
+
+The fixtures are outputs captured on FreeBSD, so this runs anywhere. The parsers are first checked
+against what the fixtures contain, then timed along with the parsers disks.py used before.
+
+Run it with:
+    python3 benchmarks/disk_parsers.py --repeat 2000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import disks
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name)) as file:
+        return file.read()
+
+
+def legacy_geom_disk_parser(block):
+    pairs = block.split(';')
+    parsed = {}
+    for pair in pairs:
+        if 'Providers' in pair:
+            continue
+        try:
+            column, value = pair.split(':')
+        except ValueError:
+            continue
+        column = re.sub(r"\s+", "", column)
+        column = re.sub(r"^[0-9]+\.", "", column)
+        value = value.strip()
+        value = re.sub(r'\([0-9A-Z]+\)', '', value)
+        parsed[column.lower()] = value
+    return parsed
+
+
+def legacy_geom_disk_list_parser(lines):
+    parsed = {}
+    geom_block = ""
+    for line in lines + ["Geom name:"]:
+        if line.startswith("Geom name:") and geom_block:
+            disk = legacy_geom_disk_parser(geom_block)
+            parsed['/dev/' + disk.get('geomname')] = disk
+            geom_block = ""
+        geom_block += ";" + line
+    return parsed
+
+
+class LegacyPartition(object):
+
+    def __init__(self):
+        self.name = None
+        self.logical_starting_block = None
+        self.size_in_blocks = None
+        self.type_or_label = None
+        self.human_readable_size = None
+
+
+def legacy_gpart_show_parser(lines):
+    # Builds a partition object like disks.py did, so that both are timed for the same work
+    partitions = []
+    for line in lines:
+        line = line.replace("=>", "").replace("- free -", "free")
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        if fields[2] == "free":
+            fields.insert(2, "")
+        p = LegacyPartition()
+        p.name = fields[2] or None
+        p.logical_starting_block = fields[0]
+        p.size_in_blocks = fields[1]
+        p.type_or_label = fields[3].replace("(null)", "Partition")
+        p.human_readable_size = fields[4]
+        partitions.append(p)
+    return partitions
+
+
+def check():
+    geom_disk_list = fixture("geom_disk_list.txt").splitlines()
+    from_list = disks.geom_disk_list_parser(geom_disk_list)
+    from_confxml = disks.confxml_disks_parser(fixture("kern.geom.confxml.xml"))
+    assert list(from_list) == ['/dev/nvd0', '/dev/ada0', '/dev/da0', '/dev/cd0'], list(from_list)
+    assert list(from_confxml) == list(from_list), list(from_confxml)
+    for path, disk in from_list.items():
+        for name, convert in disks.DISK_FIELDS:
+            assert getattr(disk, name) == getattr(from_confxml[path], name), (path, name)
+    nvd0 = from_list['/dev/nvd0']
+    assert nvd0.mediasize == 512110190592 and nvd0.sectorsize == 512 and nvd0.name == 'nvd0'
+    assert nvd0.descr == 'SAMSUNG MZVLB512HBJQ-000L7' and nvd0.rotationrate == '0'
+    assert from_list['/dev/ada0'].stripesize == 4096
+    # The colon in the value is kept, the old parser dropped such fields
+    assert from_list['/dev/da0'].lunname == 'SanDisk Ultra: USB 3.0 4C530001231108117363'
+    assert from_list['/dev/cd0'].mediasize == 0 and from_list['/dev/cd0'].sectorsize == 2048
+
+    nvd0_partitions = disks.gpart_show_parser(fixture("gpart_show_nvd0.txt").splitlines())
+    assert [p.name for p in nvd0_partitions] == ['nvd0', 'nvd0p1', 'nvd0p2', None, 'nvd0p3', 'nvd0p4', None]
+    assert nvd0_partitions[0].type_or_label == 'GPT' and nvd0_partitions[0].size_in_blocks == 1000215136
+    assert nvd0_partitions[3].type_or_label == 'free' and nvd0_partitions[3].human_readable_size == '(492K)'
+    assert nvd0_partitions[5].logical_starting_block == 17311744 and nvd0_partitions[5].type_or_label == 'zfs0'
+    da0_partitions = disks.gpart_show_parser(fixture("gpart_show_da0.txt").splitlines())
+    assert [(p.name, p.type_or_label) for p in da0_partitions] == \
+        [('da0', 'MBR'), (None, 'free'), ('da0s1', 'Partition')]
+    for name in ("gpart_show_nvd0.txt", "gpart_show_da0.txt"):
+        lines = fixture(name).splitlines()
+        legacy = [(p.name, p.logical_starting_block, p.size_in_blocks, p.type_or_label, p.human_readable_size)
+                  for p in legacy_gpart_show_parser(lines)]
+        assert [(p.name, str(p.logical_starting_block), str(p.size_in_blocks), p.type_or_label, p.human_readable_size)
+                for p in disks.gpart_show_parser(lines)] == legacy, name
+
+    zpools = disks.zpool_list_parser(fixture("zpool_list.txt").splitlines())
+    assert [zpool.name for zpool in zpools] == ['zroot', 'backup']
+    assert zpools[0].size == 502511173632 and zpools[0].frag == 12 and zpools[0].cap == 23
+    assert zpools[0].ckpoint is None and zpools[0].dedup == 1.0 and zpools[0].health == 'ONLINE'
+    assert zpools[1].health == 'DEGRADED' and zpools[1].altroot == '/mnt'
+    labels = disks.confxml_labels_parser(fixture("kern.geom.confxml.xml"))
+    assert labels == {'da0s1': 'HELLO', 'ada0p1': 'backup'}, labels
+    assert disks.glabel_status_parser(fixture("glabel_status.txt").splitlines()) == labels
+    print("All parser checks passed")
+
+
+def throughput(name, repeat, run):
+    start = time.perf_counter()
+    for i in range(repeat):
+        run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {elapsed / repeat * 1e6:10.1f} µs per output")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="disks.py parser checks and throughput")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    check()
+
+    geom_disk_list = fixture("geom_disk_list.txt").splitlines()
+    confxml = fixture("kern.geom.confxml.xml")
+    gpart_show = fixture("gpart_show_nvd0.txt").splitlines()
+    zpool_list = fixture("zpool_list.txt").splitlines()
+    throughput("geom disk list (before)", args.repeat, lambda: legacy_geom_disk_list_parser(geom_disk_list))
+    throughput("geom disk list", args.repeat, lambda: disks.geom_disk_list_parser(geom_disk_list))
+    throughput("kern.geom.confxml", args.repeat, lambda: disks.confxml_disks_parser(confxml))
+    throughput("kern.geom.confxml labels", args.repeat, lambda: disks.confxml_labels_parser(confxml))
+    throughput("gpart show (before)", args.repeat, lambda: legacy_gpart_show_parser(gpart_show))
+    throughput("gpart show", args.repeat, lambda: disks.gpart_show_parser(gpart_show))
+    throughput("zpool list", args.repeat, lambda: disks.zpool_list_parser(zpool_list))
+
+
+if __name__ == "__main__":
+    main()
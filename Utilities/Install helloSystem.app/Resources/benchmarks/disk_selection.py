@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+Checks and cost of DiskPage.isComplete(), which Qt calls on every click and key press
+
+The disks come from the captured kern.geom.confxml in the fixtures, printed by cat standing in
+for sysctl, so that enumerating them costs a process like on FreeBSD. isComplete() as it was,
+which enumerated the disks again and searched the label of the selected item for
+" on <geomname> ", is timed along with the lookup in the inventory that list_disks() keeps.
+Listings are checked to compare equal as long as nothing changed, so that the list of disks and
+its selection are not rebuilt for nothing.
+
+Run it with:
+    python3 benchmarks/disk_selection.py --repeat 200
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import disks
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class Item(object):
+    """
+    Stands in for a QListWidgetItem of the list of disks
+    """
+
+    def __init__(self, di):
+        self.disk = di
+        self.label = "%s on %s (%s GiB)" % (di.descr, di.geomname, f"{(di.mediasize // (2 ** 30)):,}")
+
+    def text(self):
+        return self.label
+
+
+def legacy_is_complete(old_ds, selected_item):
+    disks.get_disks()
+    for d in old_ds:
+        di = disks.get_disk(d)
+        searchstring = " on " + di.geomname + " "
+        if searchstring in selected_item.text():
+            return di.geomname
+    return None
+
+
+def inventory_is_complete(disk_inventory, selected_item):
+    di = disk_inventory.get(selected_item.disk.geomname)
+    return di.geomname if di is not None else None
+
+
+def check():
+    ds = disks.get_disks()
+    assert disks.get_disks() == ds, "The same disks compare unequal, the list would be rebuilt for nothing"
+    changed = dict(ds)
+    changed.popitem()
+    assert changed != ds
+    disk_inventory = {di.geomname: di for di in ds.values()}
+    for di in ds.values():
+        assert inventory_is_complete(disk_inventory, Item(di)) == legacy_is_complete(ds, Item(di)) == di.geomname
+    print("All disk selection checks passed")
+    return ds, disk_inventory
+
+
+def quietly(run):
+    # Without what the command runner prints about every command
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run()
+
+
+def timed(name, repeat, run):
+    start = time.perf_counter()
+    for i in range(repeat):
+        run()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name:<28} {elapsed * 1e6:12.1f} µs per call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DiskPage.isComplete() checks and cost")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    disks.GEOM_CONFXML_COMMAND = ["cat", os.path.join(FIXTURES, "kern.geom.confxml.xml")]
+    ds, disk_inventory = check()
+    selected_item = Item(list(ds.values())[-1])
+    timed("enumerate and search labels", args.repeat, lambda: quietly(lambda: legacy_is_complete(ds, selected_item)))
+    timed("inventory lookup", args.repeat * 1000, lambda: inventory_is_complete(disk_inventory, selected_item))
+
+
+if __name__ == "__main__":
+    main()
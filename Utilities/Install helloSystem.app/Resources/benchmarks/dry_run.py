@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+
+"""
+Dry run of the installer wizards on Linux, with stand-ins for the system tools and a loopback file as the disk
+
+Install helloSystem, Create Live Media and Install Developer Tools are driven headless (Qt offscreen) from
+their first page to their last one, like a user would: the disk is selected, the warnings are answered with
+Yes, the user page is filled in, and Next is clicked as soon as it can be. benchmarks/standin.py is put on
+PATH as sysctl, geom, gpart, zpool, mount, kenv, blkid, sudo, the installer scripts and more, replaying what
+they printed on a real system (the fixtures). A loopback file is attached with losetup and shows up in GEOM as
+da<N>, so that the installer script stand-in and the image writer have a real block device to write to.
+Install Developer Tools gets it with a file system mounted on it.
+disks.py runs its commands by absolute path, it is first checked to run the stand-in for every one of them.
+
+For each page, this shows how long it took to be shown after Next was clicked (the first one, after the
+wizard was started), how long until it could be used, the longest time the GUI thread did not get to the
+event loop, and how many processes were started. The processes each wizard started are counted by command,
+and the MiB the installation page wrote are divided by the time it was shown for.
+
+Attaching the loopback file needs root, and the file system for Install Developer Tools mkfs.ext2.
+
+Run it with:
+    sudo python3 benchmarks/dry_run.py --mib 128
+"""
+
+import argparse
+import collections
+import json
+import os
+import runpy
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+from PyQt5 import QtCore, QtWidgets
+
+RESOURCES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.dirname(RESOURCES)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+import standin
+
+WIZARDS = collections.OrderedDict([
+    ("install", os.path.join(RESOURCES, "install.py")),
+    ("livemedia", os.path.join(REPOSITORY, "Utilities", "Create Live Media.app", "Resources", "create-livemedia.py")),
+    ("developer", os.path.join(REPOSITORY, "Root", "Install Developer Tools.app", "Resources", "developer-install.py")),
+])
+LAST_PAGES = ("SuccessPage", "ErrorPage")
+# The commands disks.py runs by absolute path, and the stand-ins each of them has to be run as instead
+DISKS_COMMANDS = collections.OrderedDict([
+    ("GEOM_CONFXML_COMMAND", "sysctl"),
+    ("GEOM_DISK_LIST_COMMAND", "geom"),
+    ("GLABEL_STATUS_COMMAND", "glabel"),
+    ("ZPOOL_LIST_COMMAND", "zpool"),
+    ("GPART_SHOW_COMMAND", "gpart"),
+])
+# How often the driver looks at the wizard (in ms), which is also how finely stalls are measured
+POLL_INTERVAL = 10
+
+LOOPBACK_GEOM = '''    <geom id="0xfffff800dead0800">
+      <class ref="0xffffffff81a2b6f0"/>
+      <name>{name}</name>
+      <rank>1</rank>
+      <config>
+      </config>
+      <provider id="0xfffff800dead0500">
+        <geom ref="0xfffff800dead0800"/>
+        <mode>r0w0e0</mode>
+        <name>{name}</name>
+        <mediasize>{mediasize}</mediasize>
+        <sectorsize>512</sectorsize>
+        <stripesize>0</stripesize>
+        <stripeoffset>0</stripeoffset>
+        <config>
+          <fwheads>0</fwheads>
+          <fwsectors>0</fwsectors>
+          <rotationrate>unknown</rotationrate>
+          <ident>DRYRUN</ident>
+          <lunid></lunid>
+          <descr>Loopback file</descr>
+        </config>
+      </provider>
+    </geom>
+'''
+
+
+class Driver(object):
+    """
+    Clicks through the wizard that the script being run shows, from timers on the GUI thread
+    """
+
+    def __init__(self, disk, report, timeout):
+        self.disk = disk
+        self.report = report
+        self.timeout = timeout
+        self.pages = []
+        self.answered = []
+        self.page = None
+        self.acted = False
+        self.clicked = None
+        self.last_poll = None
+
+    def start(self):
+        self.timer = QtCore.QTimer()
+        self.timer.setInterval(POLL_INTERVAL)
+        self.timer.timeout.connect(self.poll)
+        self.last_poll = time.time()
+        self.timer.start()
+        QtCore.QTimer.singleShot(self.timeout * 1000, lambda: self.finish("Timed out"))
+
+    def wizard(self):
+        for widget in QtWidgets.QApplication.topLevelWidgets():
+            if isinstance(widget, QtWidgets.QWizard):
+                return widget
+        return None
+
+    def poll(self):
+        now = time.time()
+        if self.pages:
+            self.pages[-1]["longest_stall"] = max(self.pages[-1]["longest_stall"], now - self.last_poll)
+        self.last_poll = now
+
+        # Answer the warnings with Yes, from here because they run an event loop of their own
+        modal = QtWidgets.QApplication.activeModalWidget()
+        if isinstance(modal, QtWidgets.QMessageBox):
+            button = modal.button(QtWidgets.QMessageBox.Yes) or modal.defaultButton()
+            if button is not None:
+                self.answered.append(modal.text())
+                button.click()
+            return
+
+        wizard = self.wizard()
+        if wizard is None or wizard.currentPage() is None:
+            return
+        page = wizard.currentPage()
+        if page is not self.page:
+            self.page = page
+            self.acted = False
+            self.pages.append({"page": type(page).__name__, "shown": now, "clicked": self.clicked,
+                               "ready": None, "longest_stall": 0})
+            self.clicked = None
+            if type(page).__name__ in LAST_PAGES:
+                message = getattr(wizard, "error_message_nice", "") if type(page).__name__ == "ErrorPage" else None
+                self.finish(message)
+                return
+
+        if not self.acted:
+            action = getattr(self, "on" + type(page).__name__, None)
+            if action is not None and not action(wizard, page):
+                return
+            self.acted = True
+        next_button = wizard.button(QtWidgets.QWizard.NextButton)
+        if self.clicked is None and next_button.isVisible() and next_button.isEnabled():
+            self.pages[-1]["ready"] = now
+            self.clicked = now
+            # Not from here, the page may ask a question when going forward
+            QtCore.QTimer.singleShot(0, next_button.click)
+
+    def onDiskPage(self, wizard, page):
+        # Once the loopback disk is in the list
+        for row in range(page.disk_listwidget.count()):
+            item = page.disk_listwidget.item(row)
+            disk = getattr(item, "disk", None)
+            vol = getattr(item, "vol", None)
+            if (disk is not None and disk.geomname == self.disk) or \
+                    (vol is not None and vol.device().data().decode() == "/dev/" + self.disk):
+                QtCore.QTimer.singleShot(0, lambda: item.setSelected(True))
+                return True
+        return False
+
+    def onUserPage(self, wizard, page):
+        wizard.setField("fullname", "Dry Run")
+        wizard.setField("userpw", "dry-run")
+        wizard.setField("userpw2", "dry-run")
+        return True
+
+    def finish(self, message):
+        self.timer.stop()
+        with open(self.report, "w") as file:
+            json.dump({"pages": self.pages, "answered": self.answered, "message": message}, file)
+        QtWidgets.QApplication.instance().exit(0 if message is None else 1)
+
+
+def stand_in_commands(disks):
+    """
+    Makes disks.py run the stand-ins on PATH rather than the commands in /sbin
+    """
+    for name in DISKS_COMMANDS:
+        command = getattr(disks, name)
+        setattr(disks, name, [os.path.basename(command[0])] + command[1:])
+
+
+def drive(args):
+    """
+    Runs the wizard script in this process, with a QApplication that starts the driver
+    """
+    sys.path.insert(0, os.path.dirname(args.drive))
+    import disks
+    stand_in_commands(disks)
+
+    driver = Driver(args.disk, args.report, args.timeout)
+
+    class DrivenApplication(QtWidgets.QApplication):
+        def __init__(self, argv):
+            super().__init__(argv)
+            QtCore.QTimer.singleShot(0, driver.start)
+
+    QtWidgets.QApplication = DrivenApplication
+    sys.argv = [args.drive] + args.arguments
+    try:
+        runpy.run_path(args.drive, run_name="__main__")
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def query_disks():
+    """
+    Asks disks.py for everything it can tell, also the way it does when kern.geom.confxml cannot be read
+    """
+    sys.path.insert(0, RESOURCES)
+    import disks
+    stand_in_commands(disks)
+    assert disks.get_disks(), "No disks from sysctl kern.geom.confxml"
+    assert disks.get_partitions("da0"), "No partitions from gpart show"
+    assert disks.get_zpools(), "No pools from zpool list"
+    disks.invalidate_disks()
+    disks.GEOM_CONFXML_COMMAND = ["sysctl", "-n", "kern.geom.confxml.unavailable"]
+    assert disks.get_disks(), "No disks from geom disk list"
+    assert disks.get_volume_labels(["da0s1"]) == {"da0s1": "HELLO"}, "No labels from glabel status"
+    return 0
+
+
+def check_disks_commands(directory, env):
+    """
+    Whether every command of disks.py ran as its stand-in, rather than the one in /sbin
+    """
+    calls = os.path.join(directory, "disks.calls")
+    open(calls, "w").close()
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), "--query-disks"],
+                             env=dict(env, DRY_RUN_CALLS=calls), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             universal_newlines=True)
+    with open(calls) as file:
+        used = set(line.split(" ", 2)[1] for line in file)
+    missing = [name for name, stand_in in DISKS_COMMANDS.items() if stand_in not in used]
+    if process.returncode != 0 or missing:
+        print(process.stdout, end="")
+        sys.exit("disks.py did not run the stand-ins for %s" % ", ".join(missing or ["all of its commands"]))
+    print("disks.py: ran the stand-ins for " + ", ".join(DISKS_COMMANDS))
+
+
+def run(command, **kw):
+    return subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True, **kw).stdout.strip()
+
+
+class LoopbackDisk(object):
+    """
+    A file attached as a loop device, and a device node for it named like a disk on FreeBSD
+    """
+
+    def __init__(self, path, mib):
+        with open(path, "wb") as file:
+            file.truncate(mib * 2 ** 20)
+        self.mediasize = mib * 2 ** 20
+        self.loop = run(["losetup", "-f", "--show", path])
+        self.name = next("da%i" % number for number in range(9, 100) if not os.path.exists("/dev/da%i" % number))
+        self.mountpoint = None
+        os.mknod("/dev/" + self.name, 0o600 | stat.S_IFBLK, os.stat(self.loop).st_rdev)
+
+    def mount(self, mountpoint):
+        run(["mkfs.ext2", "-q", "-F", "-L", "DRYRUN", "/dev/" + self.name])
+        os.makedirs(mountpoint, exist_ok=True)
+        run(["mount", "/dev/" + self.name, mountpoint])
+        self.mountpoint = mountpoint
+        # Install Developer Tools only offers volumes with an operating system on them
+        os.makedirs(os.path.join(mountpoint, "etc"))
+        shutil.copy("/etc/os-release", os.path.join(mountpoint, "etc", "os-release"))
+
+    def unmount(self):
+        if self.mountpoint is not None:
+            subprocess.run(["umount", self.mountpoint])
+            self.mountpoint = None
+
+    def detach(self):
+        self.unmount()
+        os.remove("/dev/" + self.name)
+        subprocess.run(["losetup", "-d", self.loop])
+
+
+def record(directory, disk):
+    """
+    The fixtures, and the loopback disk in what sysctl kern.geom.confxml says
+    """
+    recordings = os.path.join(directory, "recordings")
+    shutil.copytree(FIXTURES, recordings)
+    with open(os.path.join(FIXTURES, "kern.geom.confxml.xml")) as file:
+        confxml = file.read()
+    marker = "    <name>DISK</name>\n"
+    confxml = confxml.replace(marker, marker + LOOPBACK_GEOM.format(name=disk.name, mediasize=disk.mediasize), 1)
+    with open(os.path.join(recordings, "kern.geom.confxml.xml"), "w") as file:
+        file.write(confxml)
+    return recordings
+
+
+def stand_ins(directory):
+    bin_directory = os.path.join(directory, "bin")
+    os.mkdir(bin_directory)
+    for name in standin.TOOLS + standin.INSTALLER_SCRIPTS:
+        os.symlink(os.path.abspath(standin.__file__), os.path.join(bin_directory, name))
+    return bin_directory
+
+
+def live_image(path, mib):
+    # Every other MiB empty, which the image writer need not write
+    with open(path, "wb") as file:
+        for number in range(mib):
+            file.write(os.urandom(2 ** 20) if number % 2 else bytes(2 ** 20))
+    return path
+
+
+def dry_run(name, directory, disk, env, args):
+    calls = os.path.join(directory, name + ".calls")
+    report = os.path.join(directory, name + ".json")
+    arguments = []
+    if name == "livemedia":
+        arguments = [live_image(os.path.join(directory, "Live.img"), args.mib)]
+    if name == "developer":
+        if shutil.which("mkfs.ext2") is None:
+            print(f"{name}: needs mkfs.ext2 for a file system on the loopback disk")
+            return
+        disk.mount(os.path.join(directory, "Volume"))
+    env = dict(env, DRY_RUN_CALLS=calls, DRY_RUN_MOUNTPOINT=disk.mountpoint or "")
+    open(calls, "w").close()
+    start = time.time()
+    with open(os.path.join(directory, name + ".log"), "w") as log:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--drive", WIZARDS[name], "--disk", disk.name,
+             "--report", report, "--timeout", str(args.timeout)] + arguments,
+            env=env, stdout=log, stderr=subprocess.STDOUT)
+    elapsed = time.time() - start
+    disk.unmount()
+
+    if not os.path.exists(report):
+        print(f"{name}: the wizard exited with {process.returncode} before it got to its last page")
+        with open(log.name) as file:
+            print("".join("  " + line for line in file.readlines()[-20:]), end="")
+        return
+    with open(report) as file:
+        report = json.load(file)
+    with open(calls) as file:
+        started = [(float(when), command) for when, command, _ in (line.split(" ", 2) for line in file)]
+
+    pages = report["pages"]
+    print(f"{name}: got to {pages[-1]['page']} in {elapsed:.1f} s" +
+          (f", {report['message']}" if report["message"] else ""))
+    print(f"  {'page':<20} {'shown':>10} {'usable':>10} {'stall':>10} {'processes':>10}")
+    # The first page is shown after the wizard has started, the others after Next was clicked
+    pages[0]["clicked"] = start
+    for number, page in enumerate(pages):
+        since = page["clicked"] or page["shown"] if number else 0
+        until = pages[number + 1]["clicked"] or pages[number + 1]["shown"] if number + 1 < len(pages) else float("inf")
+        processes = sum(1 for when, _ in started if since <= when < until)
+        shown = f"{(page['shown'] - page['clicked']) * 1000:8.0f} ms" if page["clicked"] else f"{'':>10}"
+        usable = f"{(page['ready'] - page['shown']) * 1000:8.0f} ms" if page["ready"] else f"{'':>10}"
+        print(f"  {page['page']:<20} {shown} {usable} {page['longest_stall'] * 1000:7.0f} ms {processes:10}")
+    counts = collections.Counter(command for _, command in started)
+    print("  processes started: " + ", ".join(f"{command} {count}" for command, count in counts.most_common()))
+    for number, page in enumerate(pages[:-1]):
+        if page["page"] == "InstallationPage":
+            seconds = pages[number + 1]["shown"] - page["shown"]
+            print(f"  written: {args.mib} MiB in {seconds:.2f} s, {args.mib / seconds:.1f} MiB/s")
+    for text in report["answered"]:
+        print("  answered Yes to: " + text.replace("\n", " "))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dry run of the installer wizards with stand-in system tools")
+    parser.add_argument("--mib", type=int, default=128, help="MiB the installer scripts and the Live image write")
+    parser.add_argument("--wizards", default=",".join(WIZARDS), help="Which of %s" % ", ".join(WIZARDS))
+    parser.add_argument("--timeout", type=int, default=120, help="seconds each wizard may take")
+    parser.add_argument("--drive", help=argparse.SUPPRESS)
+    parser.add_argument("--query-disks", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--disk", help=argparse.SUPPRESS)
+    parser.add_argument("--report", help=argparse.SUPPRESS)
+    parser.add_argument("arguments", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.drive:
+        sys.exit(drive(args))
+    if args.query_disks:
+        sys.exit(query_disks())
+
+    if os.geteuid() != 0 or shutil.which("losetup") is None:
+        sys.exit("Attaching the loopback file needs root and losetup")
+
+    with tempfile.TemporaryDirectory() as directory:
+        disk = LoopbackDisk(os.path.join(directory, "disk.img"), args.mib * 4)
+        try:
+            env = dict(os.environ, QT_QPA_PLATFORM="offscreen", DRY_RUN_DISK=disk.name, DRY_RUN_MIB=str(args.mib),
+                       DRY_RUN_RECORDINGS=record(directory, disk))
+            env["PATH"] = stand_ins(directory) + os.pathsep + env.get("PATH", "")
+            check_disks_commands(directory, env)
+            for name in args.wizards.split(","):
+                dry_run(name, directory, disk, env, args)
+        finally:
+            disk.detach()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""
+Checks and latency of the progress the installer script reports, as read by installerprogress.py
+
+A stand-in for the installer script writes log lines and INSTALLER_PROGRESS= lines to stdout,
+and the time it wrote each of them to stderr. The progress lines are checked to be emitted in
+order, including one without a newline at the end, and the log to get everything the stand-in
+wrote. The time remaining is checked against a copy going at a known rate with some jitter.
+Then the delay between the stand-in reporting progress and the signal being emitted is shown,
+next to the 200 ms the fill level of the target disk was checked at.
+
+Run it with:
+    python3 benchmarks/install_progress.py --reports 200 --interval 10
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication, QProcess
+
+import installerprogress
+
+STAND_IN = r'''
+import sys, time
+reports, interval, total = int(sys.argv[1]), float(sys.argv[2]), 4 * 2 ** 30
+for i in range(1, reports + 1):
+    sys.stderr.write("%i %f\n" % (i, time.time()))
+    sys.stdout.write("cpdup: /usr/local/share/file%i copied\n" % i)
+    sys.stdout.write("INSTALLER_PROGRESS=copying %i %i\n" % (total * i // reports, total))
+    sys.stdout.flush()
+    time.sleep(interval)
+sys.stdout.write("INSTALLER_PROGRESS=configuring 1 0")
+'''
+
+
+def check_parsing():
+    parse = installerprogress.parse_progress_line
+    assert parse("INSTALLER_PROGRESS=copying 1024 4096") == ("copying", 1024, 4096)
+    assert parse("INSTALLER_PROGRESS=copying 1024") is None
+    assert parse("INSTALLER_PROGRESS=copying many 4096") is None
+    assert parse("INSTALLER_MIB_NEEDED=2158") is None
+
+
+def check_remaining_time():
+    remaining = installerprogress.RemainingTime()
+    rate, total, now, done = 50 * 2 ** 20, 4 * 2 ** 30, 0.0, 0
+    jitter = random.Random(0)
+    estimates = []
+    while done < total:
+        estimate = remaining.update(done, total, now)
+        if estimate is not None:
+            estimates.append((estimate, (total - done) / rate))
+        now += 0.2
+        done = min(total, done + int(rate * 0.2 * jitter.uniform(0.5, 1.5)))
+    assert remaining.update(0, total, now) is None, "A new copy was not noticed"
+    error = max(abs(estimate - actual) / actual for estimate, actual in estimates[:len(estimates) // 2])
+    assert error < 0.15, error
+    return error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="installerprogress.py checks and latency")
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--interval", type=int, default=10, help="ms between the reports of the stand-in")
+    args = parser.parse_args()
+
+    check_parsing()
+    error = check_remaining_time()
+
+    app = QCoreApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "stand-in.py")
+        with open(script, "w") as file:
+            file.write(STAND_IN)
+        logfile = os.path.join(directory, "Installer.log")
+        errorslogfile = os.path.join(directory, "Installer.err")
+        process = QProcess()
+        process.setStandardErrorFile(errorslogfile)
+        output = installerprogress.InstallerOutput(process, logfile)
+        received = []
+        output.progress.connect(lambda phase, done, total: received.append((phase, done, total, time.time())))
+        process.finished.connect(lambda: (output.close(), app.quit()))
+        process.start(sys.executable, [script, str(args.reports), str(args.interval / 1000)])
+        app.exec_()
+
+        with open(logfile) as file:
+            log = file.read()
+        assert log.count("copied") == args.reports and log.count("INSTALLER_PROGRESS=") == args.reports + 1
+        assert received[-1][:3] == ("configuring", 1, 0), received[-1]
+        copying = [report for report in received if report[0] == "copying"]
+        assert [done for _, done, _, _ in copying] == sorted(done for _, done, _, _ in copying)
+        assert copying[-1][1] == copying[-1][2]
+        print("All install progress checks passed")
+
+        sent = {}
+        with open(errorslogfile) as file:
+            for line in file:
+                number, when = line.split()
+                sent[int(number)] = float(when)
+        total = copying[-1][2]
+        delays = [(when - sent[round(done * args.reports / total)]) * 1000 for _, done, _, when in copying]
+        print(f"{'reports emitted':<36} {len(copying):8} of {args.reports}")
+        print(f"{'delay, mean':<36} {statistics.mean(delays):8.2f} ms")
+        print(f"{'delay, longest':<36} {max(delays):8.2f} ms")
+        print(f"{'disk fill level checked every':<36} {200:8.2f} ms")
+        print(f"{'time remaining, largest error':<36} {error * 100:8.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+Checks of processtasks.py, and how long the GUI thread stalls while the wizards probe the system
+
+Stand-ins for the probes that the installer wizards run when a page is shown (the installer
+script asked for the required disk space, mount, kenv) take --delay ms each. They are run one
+after the other with QProcess.waitForFinished(), like the wizards did before, and then with a
+TaskRunner. Meanwhile a timer ticks every 10 ms, and the longest time between two ticks is how
+long the window would not have been redrawn. The tasks are checked to be run only once, to get
+their output and environment, and to report commands that cannot be started.
+
+Run it with:
+    python3 benchmarks/probe_tasks.py --probes 5 --delay 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication, QEventLoop, QProcess, QTimer
+
+import processtasks
+
+
+class StallMeter(object):
+    """
+    The longest time between two ticks of a timer on the GUI thread
+    """
+
+    def __init__(self):
+        self.timer = QTimer()
+        self.timer.setInterval(10)
+        self.timer.timeout.connect(self.tick)
+        self.last = None
+        self.longest = 0
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.longest = max(self.longest, now - self.last)
+        self.last = now
+
+    def start(self):
+        self.last, self.longest = time.perf_counter(), 0
+        self.timer.start()
+
+    def stop(self):
+        self.tick()
+        self.timer.stop()
+        return self.longest
+
+
+def probe_args(number, delay):
+    return ["-c", "sleep %f; echo probe %i $PROBE_VALUE" % (delay / 1000, number)]
+
+
+def blocking(args):
+    for arguments in args:
+        proc = QProcess()
+        proc.start("sh", arguments)
+        proc.waitForFinished()
+        proc.readAllStandardOutput()
+
+
+def with_tasks(runner, args):
+    loop = QEventLoop()
+    tasks = [runner.run("sh", arguments, {"PROBE_VALUE": "1"}) for arguments in args]
+    runner.when_all(tasks, lambda tasks: loop.quit())
+    if not all(task.done for task in tasks):
+        loop.exec_()
+    return tasks
+
+
+def wait(task):
+    loop = QEventLoop()
+    task.then(lambda task: loop.quit())
+    if not task.done:
+        loop.exec_()
+    return task
+
+
+def check(args):
+    runner = processtasks.TaskRunner()
+    tasks = with_tasks(runner, args)
+    assert [task.lines() for task in tasks] == [["probe %i 1" % i] for i in range(len(args))], tasks
+    assert with_tasks(runner, args) == tasks, "The probes were run again"
+
+    missing = wait(runner.run("/nonexistent/command"))
+    assert missing.exit_code == 127 and "nonexistent" in missing.stderr, missing.stderr
+    runner.forget(missing)
+    assert wait(runner.run("/nonexistent/command")) is not missing
+    print("All probe task checks passed")
+
+
+def timed(name, meter, run):
+    meter.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    stall = meter.stop()
+    print(f"{name:<28} {elapsed * 1000:8.0f} ms in total {stall * 1000:8.0f} ms longest stall")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="processtasks.py checks and GUI thread stalls")
+    parser.add_argument("--probes", type=int, default=5)
+    parser.add_argument("--delay", type=int, default=200, help="ms each probe takes")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    probes = [probe_args(number, args.delay) for number in range(args.probes)]
+    check(probes)
+
+    meter = StallMeter()
+    runner = processtasks.TaskRunner()
+    fresh = [probe_args(number, args.delay + 1) for number in range(args.probes)]
+    timed("waitForFinished()", meter, lambda: blocking(fresh))
+    timed("TaskRunner", meter, lambda: with_tasks(runner, fresh))
+    timed("TaskRunner, page shown again", meter, lambda: with_tasks(runner, fresh))
+
+
+if __name__ == "__main__":
+    main()
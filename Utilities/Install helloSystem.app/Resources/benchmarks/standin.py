@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+"""
+Stand-in for the system tools and installer scripts that the installer wizards run, for benchmarks/dry_run.py
+
+It is linked into a directory on PATH under the name of each tool it stands in for, and does what that
+tool is called as. The tools replay what they printed on a real system, recorded in the directory in
+DRY_RUN_RECORDINGS. sudo runs the command it is given, except for the installer scripts, which it runs
+this stand-in for instead. The installer script stand-in writes DRY_RUN_MIB MiB to the loopback disk in
+DRY_RUN_DISK, and refuses to write anywhere else. Every call is appended to the file in DRY_RUN_CALLS.
+"""
+
+import os
+import sys
+import time
+
+TOOLS = ("sysctl", "geom", "glabel", "gpart", "zpool", "mount", "kenv", "blkid", "fstyp", "shutdown", "sudo")
+INSTALLER_SCRIPTS = ("furybsd-install", "developer-install.sh")
+CHUNK_SIZE = 2 ** 20
+
+
+def recording(name):
+    return os.path.join(os.environ["DRY_RUN_RECORDINGS"], name)
+
+
+def replay(name):
+    path = recording(name)
+    if not os.path.exists(path):
+        return 1
+    with open(path) as file:
+        sys.stdout.write(file.read())
+    return 0
+
+
+def sysctl(args):
+    if args == ["-n", "kern.geom.confxml"]:
+        return replay("kern.geom.confxml.xml")
+    sys.stderr.write("sysctl: unknown oid '%s'\n" % args[-1])
+    return 1
+
+
+def geom(args):
+    if args == ["disk", "list"]:
+        return replay("geom_disk_list.txt")
+    return 1
+
+
+def glabel(args):
+    return replay("glabel_status.txt")
+
+
+def gpart(args):
+    if replay("gpart_show_%s.txt" % os.path.basename(args[-1])) != 0:
+        sys.stderr.write("gpart: No such geom: %s.\n" % args[-1])
+        return 1
+    return 0
+
+
+def zpool(args):
+    return replay("zpool_list.txt")
+
+
+def mount(args):
+    if not args:
+        return replay("mount_live.txt")
+    return 0
+
+
+def kenv(args):
+    with open(recording("kenv.txt")) as file:
+        for line in file:
+            name, _, value = line.strip().partition("=")
+            if name == args[-1]:
+                print(value.strip('"'))
+                return 0
+    if "-q" not in args:
+        sys.stderr.write("kenv: unable to get %s\n" % args[-1])
+    return 1
+
+
+def blkid(args):
+    if args[-1] == "/dev/" + os.environ["DRY_RUN_DISK"]:
+        print("DRYRUN")
+        return 0
+    return 2
+
+
+def fstyp(args):
+    return 1
+
+
+def shutdown(args):
+    # Nothing is restarted during a dry run
+    return 0
+
+
+def sudo(args):
+    while args and args[0].startswith("-"):
+        args = args[1:]
+    if not args:
+        return 1
+    if os.path.basename(args[0]) in INSTALLER_SCRIPTS:
+        return installer(args[1:])
+    os.execvp(args[0], args)
+
+
+def target():
+    """
+    Where to write, if that is on the loopback disk
+    """
+    disk = os.environ["DRY_RUN_DISK"]
+    if "INSTALLER_TARGET_MOUNTPOINT" in os.environ:
+        mountpoint = os.environ["INSTALLER_TARGET_MOUNTPOINT"]
+        if os.path.realpath(mountpoint) == os.path.realpath(os.environ.get("DRY_RUN_MOUNTPOINT", "")):
+            return os.path.join(mountpoint, "Developer.img")
+        sys.stderr.write("Refusing to install to %s, which is not on the loopback disk %s\n" % (mountpoint, disk))
+        return None
+    if os.environ.get("INSTALLER_DEVICE") == disk:
+        return "/dev/" + disk
+    sys.stderr.write("Refusing to install to %s, which is not the loopback disk %s\n"
+                     % (os.environ.get("INSTALLER_DEVICE"), disk))
+    return None
+
+
+def installer(args):
+    mib = int(os.environ["DRY_RUN_MIB"])
+    if os.environ.get("INSTALLER_PRINT_MIB_NEEDED") == "YES":
+        print("INSTALLER_MIB_NEEDED=%i" % mib)
+        return 0
+    path = target()
+    if path is None:
+        return 1
+    reports_progress = os.environ.get("INSTALLER_PRINT_PROGRESS") == "YES"
+    # Half of it the same over and over, like files compress, half of it not
+    chunk = bytes(CHUNK_SIZE // 2) + os.urandom(CHUNK_SIZE // 2)
+    total = mib * CHUNK_SIZE
+    start = time.perf_counter()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        for done in range(CHUNK_SIZE, total + 1, CHUNK_SIZE):
+            os.write(fd, chunk)
+            print("Installed %i of %i bytes" % (done, total))
+            if reports_progress:
+                print("INSTALLER_PROGRESS=copying %i %i" % (done, total))
+            sys.stdout.flush()
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    sys.stderr.write("Wrote %i MiB to %s in %.2f s\n" % (mib, path, time.perf_counter() - start))
+    return 0
+
+
+def started():
+    """
+    When this process was started, rather than when Python got to run this, on Linux
+    """
+    try:
+        with open("/proc/self/stat") as file:
+            # The fields after the command name, of which the start time is the 20th, in clock ticks since boot
+            ticks = int(file.read().rsplit(")", 1)[1].split()[19])
+        # The end of that tick, so that it does not seem to have been started before what started it
+        return time.time() - time.clock_gettime(time.CLOCK_BOOTTIME) + (ticks + 1) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, AttributeError):
+        return time.time()
+
+
+def main():
+    name = os.path.basename(sys.argv[0])
+    args = sys.argv[1:]
+    with open(os.environ["DRY_RUN_CALLS"], "a") as file:
+        file.write("%f %s %s\n" % (started(), name, " ".join(args)))
+    if name in INSTALLER_SCRIPTS:
+        return installer(args)
+    return globals()[name](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -41,6 +41,9 @@ from PyQt5 import QtWidgets, QtGui, QtCore, QtMultimedia # pkg install py37-qt5-
 # QtMultimedia is used for playing the success sound; using mpg123 for now instead
 
 import disks  # Privately bundled file
+import devicewatcher  # Privately bundled file
+import processtasks  # Privately bundled file
+import installerprogress
 
 import ssl
 
@@ -130,6 +133,8 @@ class InstallWizard(QtWidgets.QWizard, object):
         self.timezone = None
         self.required_mib_on_disk = 0
         self.installer_script = "furybsd-install"
+        # Runs the commands the pages need without blocking, each one only once
+        self.tasks = processtasks.TaskRunner(self)
 
         # Save the original close handlers
         self.original_closeEvent = self.closeEvent
@@ -306,7 +311,9 @@ print(supported_languages)
 
 # Find out which X11 keyboard layouts are supported by the system
 localepath = "/usr/local/share/X11/xkb/symbols/"
-supported_layouts = [f for f in os.listdir(localepath) if os.path.isfile(os.path.join(localepath, f))]
+supported_layouts = []
+if os.path.isdir(localepath):  # Not where other systems, e.g., Linux, have them
+    supported_layouts = [f for f in os.listdir(localepath) if os.path.isfile(os.path.join(localepath, f))]
 supported_layouts = sorted(supported_layouts)
 print("Keyboard layouts supported by the system:")
 print(supported_layouts)
@@ -641,7 +648,9 @@ class LicensePage(QtWidgets.QWizardPage, object):
         license_label = QtWidgets.QLabel()
         license_label.setWordWrap(True)
         license_layout = QtWidgets.QVBoxLayout(self)
-        license_text = open('/COPYRIGHT', 'r').read()
+        license_text = ""
+        if os.path.exists('/COPYRIGHT'):  # Only FreeBSD has it
+            license_text = open('/COPYRIGHT', 'r').read()
         license_label.setText("\n".join(license_text.split("\n")[2:]))  # Skip the first 2 lines
 
         font = wizard.font()
@@ -672,8 +681,12 @@ class DiskPage(QtWidgets.QWizardPage, object):
         # NOTE: If the installer logic changes and the files are not copied from / but e.g., directly from an image
         # then the following line needs to be changed to reflect the changed logic accordingly
 
-        self.timer = QtCore.QTimer()  # Used to periodically check the available disks
+        self.disk_watch = devicewatcher.DiskWatch()  # Tells when disks come and go
+        self.disk_watch.changed.connect(self.list_disks)
         self.old_ds = None  # The disks we have recognized so far
+        # Geom name: Disk, of the disks in the list
+        self.disk_inventory = {}
+        self.times_shown = 0
         self.setTitle(tr('Select Destination Disk'))
         self.setSubTitle(tr('All data on the selected disk will be erased.'))
         self.disk_listwidget = QtWidgets.QListWidget()
@@ -686,27 +699,13 @@ class DiskPage(QtWidgets.QWizardPage, object):
         self.label = QtWidgets.QLabel()
         disk_vlayout.addWidget(self.label)
 
-    def getMiBRequiredOnDisk(self):
+    def getMiBRequiredOnDisk(self, task):
         # _, space_used_on_root_mountpoint, _ = shutil.disk_usage("/")
         # return int(float(space_used_on_root_mountpoint * 1.3))
-        proc = QtCore.QProcess()
-        command = 'sudo'
-        args = ["-n", "-E", wizard.installer_script]  # -E to pass environment variables into the command ran with sudo
-        env = QtCore.QProcessEnvironment.systemEnvironment()
-        env.insert("INSTALLER_PRINT_MIB_NEEDED", "YES")
-        proc.setProcessEnvironment(env)
-        try:
-            print("Starting %s %s" % (command, args))
-            proc.start(command, args)
-        except:
-            return 0
-        proc.waitForFinished()
-        output_lines = proc.readAllStandardOutput().split("\n")
-
         mib = 0
-        for output_line in output_lines:
-            print(str(output_line))
-            if "INSTALLER_MIB_NEEDED=" in str(output_line):
+        for output_line in task.lines():
+            print(output_line)
+            if "INSTALLER_MIB_NEEDED=" in output_line:
                 mib = int(output_line.split("=")[1])
                 print("Response from the installer script: %i" % mib)
                 correction_factor = 1.5  # FIXME: Correction factor due to compression differences
@@ -718,31 +717,39 @@ class DiskPage(QtWidgets.QWizardPage, object):
     def initializePage(self):
         print("Displaying DiskPage")
 
-        wizard.required_mib_on_disk = self.getMiBRequiredOnDisk()
         self.disk_listwidget.clearSelection()  # If the user clicked back and forth, start with nothing selected
-        self.periodically_list_disks()
+
+        # Ask the installer script for the required disk space and run mount at the same time, without
+        # blocking the window. Both run only once, however often the page is shown, unless they failed.
+        env = {"INSTALLER_PRINT_MIB_NEEDED": "YES"}
+        args = ["-n", "-E", wizard.installer_script]  # -E to pass environment variables into the command ran with sudo
+        tasks = [wizard.tasks.run('sudo', args, env), wizard.tasks.run('mount')]
+        self.times_shown += 1
+        wizard.tasks.when_all(tasks, lambda tasks, times_shown=self.times_shown: self.onProbesFinished(tasks, times_shown))
+
+    def onProbesFinished(self, tasks, times_shown):
+        if wizard.currentPage() is not self or times_shown != self.times_shown:
+            # The user has gone back in the meantime
+            return
+        required_task, mount_task = tasks
+
+        wizard.required_mib_on_disk = self.getMiBRequiredOnDisk(required_task)
+        self.watch_disks()
 
         # Check if the output of "mount" contains "/media/.uzip" as an indication that we are running from a Live system
-        proc = QtCore.QProcess()
-        command = 'mount'
-        args = []
-        try:
-            print("Starting %s %s" % (command, args))
-            proc.start(command, args)
-        except:
+        if mount_task.exit_code == 127:
             wizard.showErrorPage(tr("Could not run the mount command."))
             return
-        proc.waitForFinished()
 
-        if not "/media/.uzip" in str(proc.readAllStandardOutput()):
-            self.timer.stop()
+        if not "/media/.uzip" in mount_task.stdout:
+            self.disk_watch.stop()
             wizard.showErrorPage(tr("The installer can only run from the installation medium, not from an installed system."))
             self.disk_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
             return
 
 
         if wizard.required_mib_on_disk < 5:
-            self.timer.stop()
+            self.disk_watch.stop()
             wizard.showErrorPage(tr("The installer script did not report the required disk space. Are you running the installer on a supported system? Can you run the installer script with sudo without needing a password?"))
             self.disk_listwidget.hide()  # FIXME: Why is this needed? Can we do without?
             return
@@ -759,61 +766,55 @@ class DiskPage(QtWidgets.QWizardPage, object):
     def cleanupPage(self):
         print("Leaving DiskPage")
 
-    def periodically_list_disks(self):
-        print("periodically_list_disks")
+    def watch_disks(self):
+        print("watch_disks")
         self.list_disks()
-
-        self.timer.setInterval(3000)
-        self.timer.timeout.connect(self.list_disks)
-        self.timer.start()
+        self.disk_watch.start()
 
     def list_disks(self):
 
-        # Find out which disk the Live system is running from
-        proc = QtCore.QProcess()
-        command = 'mount'
-        args = []
-        try:
-            print("Starting %s %s" % (command, args))
-            proc.start(command, args)
-            proc.waitForFinished()
-        except:
-            wizard.showErrorPage(tr("Could not run the mount command."))
+        # Find out which disk the Live system is running from, with what mount said when the page was shown
+        mount_task = wizard.tasks.run('mount')
+        if not mount_task.done:
+            mount_task.then(lambda task: self.list_disks())
             return
 
-        output_lines = proc.readAllStandardOutput().split("\n")
         live_system_device = None
-        for output_line in output_lines:
-            if "on /media/LIVE" in str(output_line):
-                live_system_device = str(output_line).split(" ")[0].split("/dev/")[1]
+        for output_line in mount_task.lines():
+            if "on /media/LIVE" in output_line:
+                live_system_device = output_line.split(" ")[0].split("/dev/")[1]
                 print("Live system device: %s" % live_system_device)
         
         ds = disks.get_disks()
         # Do not refresh the list of disks if nothing has changed, because it de-selects the selection
         if ds != self.old_ds:
             self.disk_listwidget.clear()
+            self.disk_inventory = {}
             for d in ds:
-                di = disks.get_disk(d)
+                di = ds[d]
                 # print(di)
-                # print(di.get("descr"))
+                # print(di.descr)
                 # print(di.keys())
                 # Only show disks that are above minimum_target_disk_size and are writable
-                available_bytes = int(di.get("mediasize").split(" ")[0])
+                available_bytes = di.mediasize
                 # For now, we don't show cd* but once we add burning capabilities we may want to un-blacklist them
                 
-                if (available_bytes >= wizard.required_mib_on_disk) and di.get("geomname").startswith("cd") is False:
+                if (available_bytes >= wizard.required_mib_on_disk) and di.geomname.startswith("cd") is False:
                     # item.setTextAlignment()
-                    title = "%s on %s (%s GiB)" % (di.get("descr"), di.get("geomname"), f"{(available_bytes // (2 ** 30)):,}")
-                    if di.get("geomname").startswith("cd") == True:
+                    title = "%s on %s (%s GiB)" % (di.descr, di.geomname, f"{(available_bytes // (2 ** 30)):,}")
+                    if di.geomname.startswith("cd") == True:
                         # TODO: Add burning powers
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-optical'), title)
-                    elif di.get("geomname").startswith("da") == True:
+                    elif di.geomname.startswith("da") == True:
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-removable-media'), title)
                     else:
                         item = QtWidgets.QListWidgetItem(QtGui.QIcon.fromTheme('drive-harddisk'), title)
+                    # __setattr__() is the equivalent to setProperty() in Qt
+                    item.__setattr__("disk", di)
+                    self.disk_inventory[di.geomname] = di
                     self.disk_listwidget.addItem(item)
 
-                    if di.get("geomname") == live_system_device:
+                    if di.geomname == live_system_device:
                         item.setFlags(item.flags() & ~QtCore.Qt.ItemIsEnabled)
                         item.setFlags(item.flags() & ~QtCore.Qt.ItemIsSelectable)
                         item.setToolTip(tr("This is the disk that the Live system is running from"))
@@ -845,24 +846,19 @@ class DiskPage(QtWidgets.QWizardPage, object):
         self.completeChanged.emit()  # But like this isComplete() gets called and its result gets used
 
     def isComplete(self):
-        if wizard.user_agreed_to_erase is True:
-            disks.get_disks()
-            # Given a clear text label, get back the rdX
-            for d in self.old_ds:
-                di = disks.get_disk(d)
-                searchstring = " on " + str(di.get("geomname")) + " "
-                print(searchstring)
-                if len(self.disk_listwidget.selectedItems()) < 1:
-                    return False
-                available_bytes = int(di.get("mediasize").split(" ")[0])
+        # Qt asks often, so this only looks at what list_disks() found
+        selected_items = self.disk_listwidget.selectedItems()
+        if wizard.user_agreed_to_erase is True and len(selected_items) == 1:
+            di = self.disk_inventory.get(selected_items[0].__getattribute__("disk").geomname)
+            if di is not None:
+                available_bytes = di.mediasize
                 print("Available bytes: %d" % available_bytes)
                 print("Available space: %d GB" % (available_bytes // (2 ** 30)))
                 wizard.target_disk_size = available_bytes
-                if searchstring in self.disk_listwidget.selectedItems()[0].text():
-                    wizard.selected_disk_device = str(di.get("geomname"))
-                    self.timer.stop()  # FIXME: This does not belong here, but cleanupPage() gets called only
-                    # if the user goes back, not when they go forward...
-                    return True
+                wizard.selected_disk_device = di.geomname
+                self.disk_watch.stop()  # FIXME: This does not belong here, but cleanupPage() gets called only
+                # if the user goes back, not when they go forward...
+                return True
 
         wizard.selected_disk_device = None
         return False
@@ -1039,7 +1035,17 @@ class UserPage(QtWidgets.QWizardPage, object):
         self.user_label_comment.setStyleSheet("color: red")
         self.user_label_comment.setVisible(False)
         user_vlayout.addWidget(self.user_label_comment)
+        # Read in the background, the name is picked again once they are there
+        self.dmi_tasks = {which_info: wizard.tasks.run('kenv', ["-q", which_info]) for which_info in
+                          ("smbios.system.product", "smbios.planar.product", "smbios.bios.vendor")}
+        self.computer_name = self.computerName()
+        wizard.tasks.when_all(self.dmi_tasks.values(), self.onDmiInfo)
+
+    def onDmiInfo(self, tasks):
+        generic_name = self.computer_name
         self.computer_name = self.computerName()
+        if self.computername_lineEdit.text() == generic_name:
+            self.computername_lineEdit.setText(self.computer_name)
 
     def setTimezone(self):
         self.tz_label.hide()
@@ -1138,16 +1144,11 @@ class UserPage(QtWidgets.QWizardPage, object):
                 return True
 
     def getDmiInfo(self, whichInfo):
-        proc = QtCore.QProcess()
-        command = 'kenv'
-        args = ["-q", whichInfo]
-        try:
-            print("Starting %s %s" % (command, args))
-            proc.start(command, args)
-            proc.waitForFinished()
-            return(str(proc.readAllStandardOutput(), 'utf-8')).strip().replace(" ", "-")
-        except:  # FIXME: do not use bare 'except'
+        # As far as kenv has told, started in __init__()
+        task = self.dmi_tasks[whichInfo]
+        if not task.done or task.exit_code != 0:
             return ""
+        return task.stdout.strip().replace(" ", "-")
 
     def computerName(self):
 
@@ -1188,8 +1189,13 @@ class InstallationPage(QtWidgets.QWizardPage, object):
         self.installer_script_has_exited = False
         self.mib_used_on_target_disk = 0
         self.copying_has_started = False
+        # Whether the installer script reports its progress, then the fill level of the target disk is not needed
+        self.installer_reports_progress = False
+        self.phase = None
+        self.remaining_time = installerprogress.RemainingTime()
         
         self.ext_process = QtCore.QProcess()
+        self.installer_output = None
 
         self.layout = QtWidgets.QVBoxLayout(self)
 
@@ -1197,12 +1203,12 @@ class InstallationPage(QtWidgets.QWizardPage, object):
 
         self.layout.addWidget(self.progress, True)
 
-        # To update the progress bar, we need to know how much data is going to be copied
-        # and we need to check how full the target disk is every few seconds
+        self.remaining_label = QtWidgets.QLabel()
+        self.layout.addWidget(self.remaining_label)
 
-        # TODO: To estimate the remaining time, we could calculate the seconds since we started
-        # and since we know the percentage copied, just extrapolate from there.
-        # Should be about as accurate as other installers...
+        # To update the progress bar, the installer script tells how far it is with INSTALLER_PROGRESS= lines.
+        # Installer scripts that do not tell get the fill level of the target disk checked every few seconds
+        # against how much data is going to be copied.
 
     def initializePage(self):
         print("Displaying InstallationPage")
@@ -1210,7 +1216,7 @@ class InstallationPage(QtWidgets.QWizardPage, object):
             [QtWidgets.QWizard.CustomButton1, QtWidgets.QWizard.Stretch])
 
         print("wizard.required_mib_on_disk: %i" % wizard.required_mib_on_disk)
-        self.progress.setRange(0, wizard.required_mib_on_disk)
+        self.progress.setRange(0, int(wizard.required_mib_on_disk))
         self.progress.setValue(0)
         
         # Compute parameters to be handed over to the installer script
@@ -1273,6 +1279,7 @@ class InstallationPage(QtWidgets.QWizardPage, object):
             env.insert("INSTALLER_ENABLE_SSH", "YES")
         if self.field('disable_swap') is True:
             env.insert("INSTALLER_DISABLE_SWAP", "YES")
+        env.insert("INSTALLER_PRINT_PROGRESS", "YES")
 
         # Print the keys to stderr for debugging
         for key in env.keys():
@@ -1280,7 +1287,9 @@ class InstallationPage(QtWidgets.QWizardPage, object):
                 print("%s=%s" % (key, env.value(key)))
 
         self.ext_process.setProcessEnvironment(env)
-        self.ext_process.setStandardOutputFile(wizard.logfile)
+        # Written to the log by installer_output, which also reads the progress from it
+        self.installer_output = installerprogress.InstallerOutput(self.ext_process, wizard.logfile, self)
+        self.installer_output.progress.connect(self.onInstallerProgress)
         self.ext_process.setStandardErrorFile(wizard.errorslogfile)
         self.ext_process.finished.connect(self.onProcessFinished)
         self.ext_process.setProgram(command)
@@ -1301,6 +1310,7 @@ class InstallationPage(QtWidgets.QWizardPage, object):
         # cursor.movePosition(cursor.End)
         # cursor.insertText(str(self.ext_process.readAllStandardOutput()))
         # self.output.ensureCursorVisible()
+        self.installer_output.close()
         exit_code = self.ext_process.exitCode()
         print("Installer script exit code: %s" % exit_code)
         self.installer_script_has_exited = True
@@ -1319,6 +1329,32 @@ class InstallationPage(QtWidgets.QWizardPage, object):
         self.timer.timeout.connect(self.checkProgress)
         self.timer.start()
 
+    def onInstallerProgress(self, phase, done, total):
+        if not self.installer_reports_progress:
+            print("The installer script reports its progress, no longer checking the fill level of the target disk")
+            self.installer_reports_progress = True
+            self.timer.stop()
+        if phase != self.phase:
+            print("Installer phase: %s" % phase)
+            self.phase = phase
+            self.remaining_time.reset()
+        if total <= 0:
+            self.progress.setRange(0, 0)  # Indeterminate
+            self.showRemainingTime(None)
+            return
+        # In MiB, the progress bar only takes values that fit into an int
+        self.progress.setRange(0, max(total // 2**20, 1))
+        self.progress.setValue(min(done, total) // 2**20)
+        self.showRemainingTime(self.remaining_time.update(done, total))
+
+    def showRemainingTime(self, seconds):
+        if seconds is None:
+            self.remaining_label.setText("")
+        elif seconds < 60:
+            self.remaining_label.setText(tr("Less than a minute remaining"))
+        else:
+            self.remaining_label.setText(tr("About %i minutes remaining") % round(seconds / 60))
+
     def checkProgress(self):
         # print("check_progress")
         # print("self.progress.value: %i", self.progress.value())
@@ -1340,8 +1376,9 @@ class InstallationPage(QtWidgets.QWizardPage, object):
             # The target disk is filled more than we thought we would need
             self.progress.setRange(0, 0) # Indeterminate
         else:
-            self.progress.setRange(0, wizard.required_mib_on_disk)
+            self.progress.setRange(0, int(wizard.required_mib_on_disk))
             self.progress.setValue(self.mib_used_on_target_disk)
+            self.showRemainingTime(self.remaining_time.update(self.mib_used_on_target_disk, wizard.required_mib_on_disk))
         
 #############################################################################
 # Success page
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+# The installer script reports its progress when INSTALLER_PRINT_PROGRESS is set, with lines like
+#   INSTALLER_PROGRESS=copying 1073741824 4294967296
+# on stdout: the phase, the bytes done in it so far, and the bytes it takes in total or 0 if it does not know.
+
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+PROGRESS_PREFIX = "INSTALLER_PROGRESS="
+# Seconds of progress to go on before the time remaining is estimated
+ESTIMATE_AFTER = 5
+# Weight of the rate over the last interval in the smoothed rate
+RATE_SMOOTHING = 0.2
+# Rates are measured over intervals of at least this many seconds
+RATE_INTERVAL = 1
+
+
+def parse_progress_line(line):
+    """
+    (phase, bytes done, bytes in total) from a progress line of the installer script, None for any other line
+    """
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    fields = line[len(PROGRESS_PREFIX):].split()
+    if len(fields) != 3:
+        return None
+    try:
+        done, total = int(fields[1]), int(fields[2])
+    except ValueError:
+        return None
+    return fields[0], done, total
+
+
+class RemainingTime(object):
+    """
+    Estimates how many seconds it takes until done reaches total, from the smoothed rate at which it grew
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = None
+        # (time, done) where the current interval started
+        self.mark = None
+        self.rate = None
+
+    def update(self, done, total, now=None):
+        """
+        Seconds remaining, None until there is enough to go on
+        """
+        now = time.monotonic() if now is None else now
+        if self.mark is None or done < self.mark[1]:
+            self.started, self.mark, self.rate = now, (now, done), None
+            return None
+        elapsed = now - self.mark[0]
+        if elapsed >= RATE_INTERVAL:
+            rate = (done - self.mark[1]) / elapsed
+            self.rate = rate if self.rate is None else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.rate
+            self.mark = (now, done)
+        if not self.rate or total <= 0 or now - self.started < ESTIMATE_AFTER:
+            return None
+        return max(total - done, 0) / self.rate
+
+
+class InstallerOutput(QObject):
+    """
+    Reads the stdout of the installer script as it comes, writes it to logfile and emits
+    progress for the progress lines in it
+    """
+    # Phase, bytes done in it so far, bytes in total or 0 if not known
+    progress = pyqtSignal(str, object, object)
+
+    def __init__(self, process, logfile, parent=None):
+        super().__init__(parent)
+        self.process = process
+        self.log = open(logfile, "ab", buffering=0)
+        self.partial = b""
+        process.readyReadStandardOutput.connect(self.read)
+
+    def read(self):
+        data = bytes(self.process.readAllStandardOutput())
+        if not data:
+            return
+        self.log.write(data)
+        data = self.partial + data
+        end = data.rfind(b"\n") + 1
+        self.partial = data[end:]
+        # Only the newest of the progress lines that came at once is shown
+        report = None
+        for line in data[:end].decode("utf-8", "replace").splitlines():
+            report = parse_progress_line(line) or report
+        if report:
+            self.progress.emit(*report)
+
+    def close(self):
+        """
+        Read what is left once the installer script has exited
+        """
+        self.read()
+        if self.partial:
+            report = parse_progress_line(self.partial.decode("utf-8", "replace"))
+            self.partial = b""
+            if report:
+                self.progress.emit(*report)
+        self.process.readyReadStandardOutput.disconnect(self.read)
+        self.log.close()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""
+Throughput of the Logs.app line classifier, in lines per second
+
+Compares LineClassifier.classify and the whole LineIngestor.classify batch step, which also parses
+the syslog fields, with the substring loop Logs.app used before, on its 4 words and on all the
+configured words.
+
+Run it with:
+    python3 benchmarks/classifier.py --lines 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logs import LineClassifier, LineIngestor
+
+MESSAGES = [
+    "kernel: ugen0.3: <Logitech USB Receiver> at usbus0",
+    "kernel: ada0: <WDC WD10EZEX> ACS-3 ATA SATA 3.x device",
+    "dhclient[{pid}]: DHCPREQUEST on em0 to 255.255.255.255 port 67",
+    "sshd[{pid}]: Accepted publickey for user from 192.168.1.{n} port {port} ssh2",
+    "sshd[{pid}]: error: kex_exchange_identification: Connection closed by remote host",
+    "kernel: pid {pid} (python3.9), jid 0, uid 1001: exited on signal 11 (core dumped)",
+    "kernel: em0: link state changed to UP",
+    "kernel: carp: demoted by 240 to 240 (failover)",
+    "devd[{pid}]: Processing event '!system=USB subsystem=DEVICE type=ATTACH'",
+    "kernel: g_vfs_done():ada1p1[WRITE(offset={port}, length=4096)]error = 5",
+    "cron[{pid}]: (root) CMD (/usr/libexec/atrun)",
+    "kernel: swap_pager: out of swap space",
+]
+
+
+def synthetic_lines(count, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        message = rng.choice(MESSAGES).format(pid=rng.randint(1, 99999), n=rng.randint(1, 254),
+                                              port=rng.randint(1024, 65535))
+        lines.append(f"Oct 19 10:{i // 60 % 60:02d}:{i % 60:02d} hellosystem {message}")
+    return lines
+
+
+def legacy_classify(line, red_words=("error", "fail", "kill", "slow")):
+    red = False
+    for red_word in red_words:
+        if red_word in line.lower():
+            red = True
+    return red
+
+
+def throughput(name, lines, run):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {len(lines) / elapsed:12,.0f} lines/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logs.app classifier throughput")
+    parser.add_argument("--lines", type=int, default=200000)
+    args = parser.parse_args()
+
+    lines = synthetic_lines(args.lines)
+    classifier = LineClassifier()
+    ingestor = LineIngestor(classifier)
+
+    throughput("substring loop, 4 words", lines, lambda: [legacy_classify(line) for line in lines])
+    words = list(classifier.words)
+    throughput(f"substring loop, {len(words)} words", lines,
+               lambda: [legacy_classify(line, words) for line in lines])
+    throughput("LineClassifier.classify", lines, lambda: [classifier.classify(line) for line in lines])
+    sourced_lines = [("/var/log/messages", line) for line in lines]
+    throughput("LineIngestor.classify", lines, lambda: ingestor.classify(sourced_lines))
+
+
+if __name__ == "__main__":
+    main()
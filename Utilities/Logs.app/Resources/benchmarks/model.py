@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+"""
+Time the Logs.app model takes to append a batch of records once it holds as many as it keeps
+
+Fills a LogModel to its capacity, then appends batches of records:
+  - in order, so that as many of the oldest records are dropped
+  - with late records among them, older than the ones shown, like the first lines of a file
+    that starts to be followed
+both sorted by time in ascending and descending order, and filtered by program.
+
+Run it with:
+    python3 benchmarks/model.py --max-lines 100000 --batch 100
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication, Qt
+
+from logs import LineClassifier, LineIngestor, LogModel
+from benchmarks.classifier import synthetic_lines
+
+
+def records(ingestor, count, start, step=1.0):
+    """
+    count records, timestamped step seconds apart from start
+    """
+    batch, notify_lines = ingestor.classify([("/var/log/messages", line) for line in synthetic_lines(count)])
+    return [record[:3] + (start + i * step,) + record[4:] for i, record in enumerate(batch)]
+
+
+def measure(name, model, batches):
+    times = []
+    for batch in batches:
+        start = time.perf_counter()
+        model.append_lines(batch)
+        times.append(time.perf_counter() - start)
+    print(f"{name:<44} {statistics.median(times) * 1000:8.2f} ms median {max(times) * 1000:8.2f} ms max")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logs.app model append time at capacity")
+    parser.add_argument("--max-lines", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--batches", type=int, default=200)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    ingestor = LineIngestor(LineClassifier())
+    now = time.time()
+    filled = records(ingestor, args.max_lines, now - args.max_lines)
+    fresh = [records(ingestor, args.batch, now + n * args.batch) for n in range(args.batches)]
+    # Every tenth record of the batch is from before the ones shown
+    late = [[record[:3] + (now - args.max_lines - n * args.batch - i,) + record[4:] if i % 10 == 0 else record
+             for i, record in enumerate(batch)]
+            for n, batch in enumerate(fresh)]
+
+    for order in (Qt.AscendingOrder, Qt.DescendingOrder):
+        for filtered in (False, True):
+            for kind, batches in (("in order", fresh), ("late records", late)):
+                model = LogModel(args.max_lines)
+                model.sort(0, order)
+                model.append_lines(filled)
+                if filtered:
+                    model.set_filter("programs", model.table.program_names.index("kernel"))
+                name = "%s, %s%s" % ("ascending" if order == Qt.AscendingOrder else "descending", kind,
+                                     ", by program" if filtered else "")
+                measure(name, model, batches)
+    return app
+
+
+if __name__ == "__main__":
+    main()
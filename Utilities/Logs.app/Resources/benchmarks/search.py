@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""
+Indexing and search latency of the Logs.app log index
+
+Writes a synthetic week of syslog in a temporary directory, one current messages file
+and its rotated archives in plain, .gz and .bz2 like newsyslog leaves them, then measures:
+  - building the indexes from scratch, and loading them back from the disk cache
+  - word, multiple words and time range searches across all of them
+
+Run it with:
+    python3 benchmarks/search.py --lines-per-day 200000
+"""
+
+import argparse
+import bz2
+import gzip
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logindex
+from benchmarks.classifier import MESSAGES
+
+
+def write_week(directory, lines_per_day, seed=0):
+    rng = random.Random(seed)
+    now = time.time()
+    for day in range(7):
+        day_start = now - (day + 1) * 86400
+        lines = []
+        for n in range(lines_per_day):
+            timestamp = time.strftime("%b %e %H:%M:%S", time.localtime(day_start + n * 86400 / lines_per_day))
+            message = rng.choice(MESSAGES).format(pid=rng.randint(100, 99999), n=rng.randint(1, 254),
+                                                  port=rng.randint(1024, 65535))
+            lines.append(f"{timestamp} host {message}\n")
+        data = "".join(lines).encode("utf-8")
+        # Day 0 is the current file, the older ones are archives
+        if day == 0:
+            path, content = "messages", data
+        elif day % 2:
+            path, content = f"messages.{day - 1}.bz2", bz2.compress(data)
+        else:
+            path, content = f"messages.{day - 1}.gz", gzip.compress(data)
+        with open(os.path.join(directory, path), "wb") as file:
+            file.write(content)
+        os.utime(os.path.join(directory, path), (day_start + 86400, day_start + 86400))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logs.app index benchmark")
+    parser.add_argument("--lines-per-day", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        logindex.INDEX_DIRECTORY = os.path.join(directory, "index")
+        write_week(directory, args.lines_per_day)
+        patterns = [os.path.join(directory, "messages"), os.path.join(directory, "messages.*")]
+        paths = logindex.index_paths(patterns)
+        print(f"{len(paths)} files, {7 * args.lines_per_day} lines")
+
+        indexer = logindex.LogIndexer(patterns)
+        elapsed, _ = timed(indexer.refresh)
+        print(f"{'index from scratch':<32} {elapsed * 1000:9.0f} ms")
+        indexer.indexes = {}
+        elapsed, _ = timed(indexer.refresh)
+        print(f"{'load the cached indexes':<32} {elapsed * 1000:9.0f} ms")
+        indexes = list(indexer.indexes.values())
+
+        now = time.time()
+        queries = [
+            ("rare word", "Logitech", None, None),
+            ("common word", "kernel", None, None),
+            ("three words", "sshd accepted publickey", None, None),
+            ("word in the last day", "error", now - 86400, now),
+            ("one hour, no word", "", now - 3 * 86400, now - 3 * 86400 + 3600),
+        ]
+        for name, text, start, end in queries:
+            latencies = []
+            for _ in range(args.runs):
+                elapsed, (count, results) = timed(logindex.search, indexes, text, start, end)
+                latencies.append(elapsed)
+            print(
+                f"{name:<32} median {statistics.median(latencies) * 1000:7.1f} ms"
+                f"  max {max(latencies) * 1000:7.1f} ms  {count} matches"
+            )
+
+
+if __name__ == "__main__":
+    main()
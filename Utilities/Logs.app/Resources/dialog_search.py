@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+import os
+import time
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QDateTime, QThread
+from PyQt5.QtGui import QColor, QTextCursor, QTextFormat
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QCheckBox, QDateTimeEdit, QPushButton, QTreeWidget,
+    QTreeWidgetItem, QPlainTextEdit, QLabel, QSplitter, QAbstractItemView, QTextEdit,
+)
+
+from logindex import LogIndexer, search
+
+# Lines shown before and after the selected result
+CONTEXT_LINES = 20
+
+
+class SearchDialog(QDialog):
+    """
+    Search all the logs and their archives through the index, which is kept up to date in the background
+    """
+    refresh_requested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Search Logs")
+        self.resize(1000, 600)
+        self.indexes = {}
+        self.indexing = False
+
+        self.searchLineEdit = QLineEdit()
+        self.searchLineEdit.setPlaceholderText("Words to find in all logs, including the archives")
+        self.searchLineEdit.returnPressed.connect(self.search)
+        self.fromCheckBox = QCheckBox("From")
+        self.fromDateTimeEdit = QDateTimeEdit(QDateTime.currentDateTime().addDays(-1))
+        self.toCheckBox = QCheckBox("To")
+        self.toDateTimeEdit = QDateTimeEdit(QDateTime.currentDateTime())
+        for checkBox, dateTimeEdit in (
+                (self.fromCheckBox, self.fromDateTimeEdit),
+                (self.toCheckBox, self.toDateTimeEdit),
+        ):
+            dateTimeEdit.setCalendarPopup(True)
+            dateTimeEdit.setEnabled(False)
+            checkBox.toggled.connect(dateTimeEdit.setEnabled)
+        self.searchButton = QPushButton("Search")
+        self.searchButton.setDefault(True)
+        self.searchButton.clicked.connect(self.search)
+
+        query_layout = QHBoxLayout()
+        query_layout.addWidget(self.searchLineEdit, 1)
+        query_layout.addWidget(self.fromCheckBox)
+        query_layout.addWidget(self.fromDateTimeEdit)
+        query_layout.addWidget(self.toCheckBox)
+        query_layout.addWidget(self.toDateTimeEdit)
+        query_layout.addWidget(self.searchButton)
+
+        self.resultsTreeWidget = QTreeWidget()
+        self.resultsTreeWidget.setHeaderLabels(["Time", "File", "Line"])
+        self.resultsTreeWidget.setRootIsDecorated(False)
+        self.resultsTreeWidget.setUniformRowHeights(True)
+        self.resultsTreeWidget.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.resultsTreeWidget.currentItemChanged.connect(self.show_context)
+
+        self.contextPlainTextEdit = QPlainTextEdit()
+        self.contextPlainTextEdit.setReadOnly(True)
+        self.contextPlainTextEdit.setLineWrapMode(QPlainTextEdit.NoWrap)
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.resultsTreeWidget)
+        splitter.addWidget(self.contextPlainTextEdit)
+
+        self.statusLabel = QLabel()
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(query_layout)
+        layout.addWidget(splitter, 1)
+        layout.addWidget(self.statusLabel)
+
+        self.indexer = LogIndexer()
+        self.indexer_thread = QThread()
+        self.indexer.moveToThread(self.indexer_thread)
+        self.refresh_requested.connect(self.indexer.refresh)
+        self.indexer.index_updated.connect(self.index_updated)
+        self.indexer.index_removed.connect(self.index_removed)
+        self.indexer.progress.connect(self.indexing_progress)
+        self.indexer.finished.connect(self.indexing_finished)
+        self.indexer_thread.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_index()
+        self.searchLineEdit.setFocus()
+
+    def refresh_index(self):
+        if not self.indexing:
+            self.indexing = True
+            self.refresh_requested.emit()
+
+    def stop(self):
+        self.indexer.stopped = True
+        self.indexer_thread.quit()
+        self.indexer_thread.wait()
+
+    @pyqtSlot(object)
+    def index_updated(self, file_index):
+        self.indexes[file_index.path] = file_index
+
+    @pyqtSlot(str)
+    def index_removed(self, path):
+        self.indexes.pop(path, None)
+
+    @pyqtSlot(int, int)
+    def indexing_progress(self, done, total):
+        self.statusLabel.setText(f"Indexing {done} of {total} files…")
+
+    @pyqtSlot()
+    def indexing_finished(self):
+        self.indexing = False
+        lines = sum(len(file_index) for file_index in self.indexes.values())
+        self.statusLabel.setText(f"{len(self.indexes)} files, {lines} lines indexed")
+        # The results shown while indexing only covered the files indexed so far
+        if self.resultsTreeWidget.topLevelItemCount() or self.searchLineEdit.text():
+            self.search()
+
+    @pyqtSlot()
+    def search(self):
+        start = self.fromDateTimeEdit.dateTime().toSecsSinceEpoch() if self.fromCheckBox.isChecked() else None
+        end = self.toDateTimeEdit.dateTime().toSecsSinceEpoch() if self.toCheckBox.isChecked() else None
+        if not self.searchLineEdit.text().strip() and start is None and end is None:
+            return
+
+        search_start = time.perf_counter()
+        count, results = search(list(self.indexes.values()), self.searchLineEdit.text(), start, end)
+        elapsed = time.perf_counter() - search_start
+
+        self.resultsTreeWidget.clear()
+        self.contextPlainTextEdit.clear()
+        items = []
+        for timestamp, path, line_number, line in results:
+            item = QTreeWidgetItem([
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else "",
+                os.path.basename(path),
+                line,
+            ])
+            item.setData(0, Qt.UserRole, (path, line_number))
+            items.append(item)
+        self.resultsTreeWidget.addTopLevelItems(items)
+        for column in range(2):
+            self.resultsTreeWidget.resizeColumnToContents(column)
+        if items:
+            self.resultsTreeWidget.scrollToBottom()
+
+        status = f"{count} matches"
+        if count > len(results):
+            status += f", showing the newest {len(results)}"
+        status += f", in {elapsed * 1000:.0f} ms"
+        if self.indexing:
+            status += ", still indexing"
+        self.statusLabel.setText(status)
+
+    @pyqtSlot(QTreeWidgetItem, QTreeWidgetItem)
+    def show_context(self, item, previous):
+        if item is None:
+            return
+        path, line_number = item.data(0, Qt.UserRole)
+        file_index = self.indexes.get(path)
+        content = file_index.open_content() if file_index else None
+        if content is None:
+            self.contextPlainTextEdit.setPlainText(f"{path} changed since it was indexed")
+            return
+        first = max(0, line_number - CONTEXT_LINES)
+        last = min(len(file_index), line_number + CONTEXT_LINES + 1)
+        lines = [file_index.line(content, n).decode("utf-8", "replace") for n in range(first, last)]
+        if hasattr(content, "close"):
+            content.close()
+        self.contextPlainTextEdit.setPlainText("\n".join(lines))
+
+        # Highlight the result in the middle of its context
+        block = self.contextPlainTextEdit.document().findBlockByNumber(line_number - first)
+        cursor = QTextCursor(block)
+        self.contextPlainTextEdit.setTextCursor(cursor)
+        self.contextPlainTextEdit.centerCursor()
+        selection = QTextEdit.ExtraSelection()
+        selection.format.setBackground(QColor("yellow"))
+        selection.format.setProperty(QTextFormat.FullWidthSelection, True)
+        selection.cursor = cursor
+        self.contextPlainTextEdit.setExtraSelections([selection])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import glob
+import os
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QFileSystemWatcher, QObject, QTextCodec
+
+LOG_PATTERNS = ["/var/log/*.log", "/var/log/messages"]
+# Lines shown from the end of each file when following starts, like tail -n
+DEFAULT_FOLLOW_LINES = 1000
+BLOCK_SIZE = 64 * 1024
+
+
+def file_identity(stat):
+    return stat.st_dev, stat.st_ino
+
+
+def read_last_lines(file, count, block_size=BLOCK_SIZE):
+    """
+    The last count lines of file, read backwards by blocks so that only the end of a large log is read.
+    The file is left positioned at its end.
+    """
+    end = file.seek(0, os.SEEK_END)
+    position = end
+    blocks = []
+    newlines = 0
+    # One more newline than lines, the first line found may be cut by the block boundary
+    while position > 0 and newlines <= count:
+        size = min(block_size, position)
+        position -= size
+        file.seek(position)
+        block = file.read(size)
+        blocks.append(block)
+        newlines += block.count(b"\n")
+    file.seek(end)
+    data = b"".join(reversed(blocks))
+    if count <= 0:
+        return b""
+    return b"".join(data.splitlines(keepends=True)[-count:])
+
+
+class FollowedFile(object):
+    def __init__(self, path, file):
+        self.path = path
+        self.file = file
+        self.identity = file_identity(os.fstat(file.fileno()))
+        # What follows the last newline, a line that is still being written
+        self.partial = b""
+
+
+class LogFollower(QObject):
+    """
+    Follow the files matching patterns like tail -F does, without a tail process.
+    The files and their directories are watched with QFileSystemWatcher (kqueue or inotify),
+    rotated and truncated files are reopened, files created later are followed from their start.
+    The output comes as complete lines, along with the path of their file.
+    """
+    produce_output = pyqtSignal(str, str)
+
+    def __init__(self, patterns=LOG_PATTERNS, lines=DEFAULT_FOLLOW_LINES, parent=None):
+        super().__init__(parent)
+        self.patterns = list(patterns)
+        self.lines = lines
+        self.files = {}
+        self._codec = QTextCodec.codecForLocale()
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._file_changed)
+        self._watcher.directoryChanged.connect(self._directory_changed)
+
+    def matching_paths(self):
+        paths = []
+        for pattern in self.patterns:
+            for path in sorted(glob.glob(pattern)):
+                if path not in paths and os.path.isfile(path):
+                    paths.append(path)
+        return paths
+
+    @pyqtSlot()
+    def start(self):
+        directories = sorted({os.path.dirname(pattern) for pattern in self.patterns})
+        self._watcher.addPaths([directory for directory in directories if os.path.isdir(directory)])
+        for path in self.matching_paths():
+            self._open(path, self.lines)
+
+    def _open(self, path, lines=None):
+        """
+        Follow path from its last lines, or from its start if lines is None
+        """
+        try:
+            file = open(path, "rb", buffering=0)
+        except OSError as e:
+            print(f"Cannot follow {path}: {e.strerror}")
+            return
+        followed = FollowedFile(path, file)
+        self.files[path] = followed
+        self._watcher.addPath(path)
+        if lines is None:
+            self._emit(followed, file.read())
+        else:
+            self._emit(followed, read_last_lines(file, lines))
+
+    def _close(self, followed):
+        if followed.partial:
+            self._emit(followed, b"\n")
+        followed.file.close()
+        self._watcher.removePath(followed.path)
+        del self.files[followed.path]
+
+    @pyqtSlot(str)
+    def _file_changed(self, path):
+        followed = self.files.get(path)
+        if followed is None:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat is None or file_identity(stat) != followed.identity:
+            # Rotated or removed: the end of the old file, then the new one from its start
+            self._emit(followed, followed.file.read())
+            self._close(followed)
+            if stat is not None:
+                self._open(path)
+            return
+        if stat.st_size < followed.file.tell():
+            # Truncated in place
+            followed.file.seek(0)
+            followed.partial = b""
+        self._emit(followed, followed.file.read())
+
+    @pyqtSlot(str)
+    def _directory_changed(self, directory):
+        # Renames and deletions show up here on every platform, whatever happened to the file watches
+        for path in list(self.files):
+            if os.path.dirname(path) == directory:
+                self._file_changed(path)
+        for path in self.matching_paths():
+            if path not in self.files and os.path.dirname(path) == directory:
+                self._open(path)
+
+    def _emit(self, followed, data):
+        data = followed.partial + data
+        end = data.rfind(b"\n") + 1
+        followed.partial = data[end:]
+        if end == 0:
+            return
+        self.produce_output.emit(followed.path, self._codec.toUnicode(data[:end]))
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+
+import bz2
+import functools
+import glob
+import gzip
+import hashlib
+import lzma
+import mmap
+import os
+import pickle
+import re
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject
+
+# The current logs and their rotated, possibly compressed, archives
+INDEX_PATTERNS = ["/var/log/*.log", "/var/log/*.log.*", "/var/log/messages", "/var/log/messages.*"]
+INDEX_DIRECTORY = os.path.expanduser("~/.cache/hello/Logs")
+# Bumped whenever FileIndex changes, older indexes are rebuilt
+INDEX_VERSION = 1
+DEFAULT_MAX_RESULTS = 1000
+
+DECOMPRESSORS = {
+    ".bz2": bz2.decompress,
+    ".gz": gzip.decompress,
+    ".xz": lzma.decompress,
+}
+
+TOKEN_REGEX = re.compile(rb"\w+")
+MONTHS = {
+    b"Jan": 1, b"Feb": 2, b"Mar": 3, b"Apr": 4, b"May": 5, b"Jun": 6,
+    b"Jul": 7, b"Aug": 8, b"Sep": 9, b"Oct": 10, b"Nov": 11, b"Dec": 12,
+}
+# "Oct 19 17:58:41 host program[pid]: message", the syslog format, without a year
+SYSLOG_TIME_REGEX = re.compile(rb"([A-Z][a-z]{2}) +(\d{1,2}) (\d\d):(\d\d):(\d\d)")
+# "2026-10-19T17:58:41.123+02:00" or "2026-10-19 17:58:41", the RFC 5424 and most Linux formats
+ISO_TIME_REGEX = re.compile(rb"(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)")
+
+
+@functools.lru_cache(maxsize=4)
+def decompressed(path, extension, identity, mtime):
+    """
+    The content of an archive, kept for the next searches since decompressing is the slow part
+    """
+    with open(path, "rb") as file:
+        return DECOMPRESSORS[extension](file.read())
+
+
+def tokenize(data):
+    """
+    The distinct lower case words of data, as bytes
+    """
+    return set(TOKEN_REGEX.findall(data.lower()))
+
+
+def compression(path):
+    extension = os.path.splitext(path)[1]
+    if extension in DECOMPRESSORS:
+        return extension
+    return None
+
+
+def index_paths(patterns=INDEX_PATTERNS):
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            if path in paths or not os.path.isfile(path):
+                continue
+            # Archives in a format that cannot be read without an external tool, like .zst
+            if pattern.endswith(".*") and compression(path) is None and not path.rsplit(".", 1)[1].isdigit():
+                continue
+            paths.append(path)
+    return paths
+
+
+class FileIndex(object):
+    """
+    Where each line of a log file starts, when it was written and which lines contain each word.
+    Compressed archives are indexed on their decompressed content.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.compression = compression(path)
+        # Source file the index was built from, to notice rotation and changes
+        self.identity = None
+        self.mtime = None
+        # End of the last complete line indexed, in the decompressed content for archives
+        self.indexed_size = 0
+        self.line_offsets = array("Q")
+        # Seconds since the epoch, never decreasing so that time ranges are found by bisection.
+        # Lines without a timestamp, like continuation lines, get the one of the line before.
+        self.timestamps = array("d")
+        # Lower case word: sorted line numbers
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.line_offsets)
+
+    def __getstate__(self):
+        # All the postings in one array on disk, much smaller and faster to load than one array per word
+        state = self.__dict__.copy()
+        tokens = list(self.postings)
+        lengths = array("I", (len(self.postings[token]) for token in tokens))
+        lines = array("I")
+        for token in tokens:
+            lines.extend(self.postings[token])
+        state["postings"] = tokens, lengths, lines
+        return state
+
+    def __setstate__(self, state):
+        tokens, lengths, lines = state["postings"]
+        postings = {}
+        position = 0
+        for token, length in zip(tokens, lengths):
+            postings[token] = lines[position:position + length]
+            position += length
+        state["postings"] = postings
+        self.__dict__.update(state)
+
+    def copy(self):
+        file_index = FileIndex(self.path)
+        file_index.identity = self.identity
+        file_index.mtime = self.mtime
+        file_index.indexed_size = self.indexed_size
+        file_index.line_offsets = array("Q", self.line_offsets)
+        file_index.timestamps = array("d", self.timestamps)
+        file_index.postings = {token: array("I", lines) for token, lines in self.postings.items()}
+        return file_index
+
+    def is_current(self, stat):
+        if self.identity != (stat.st_dev, stat.st_ino):
+            return False
+        if self.compression:
+            return self.mtime == stat.st_mtime
+        return self.indexed_size <= stat.st_size
+
+    def update(self, stat, data, offset):
+        """
+        Index the complete lines of data, which starts at offset in the file
+        """
+        self.identity = stat.st_dev, stat.st_ino
+        self.mtime = stat.st_mtime
+        # Syslog timestamps have no year, take the one of the last write to the file
+        # and the one before for the months after it, written before new year
+        modified = time.localtime(stat.st_mtime)
+        previous_timestamp = self.timestamps[-1] if self.timestamps else 0.0
+
+        end = data.rfind(b"\n") + 1
+        position = 0
+        line_number = len(self.line_offsets)
+        line_offsets = self.line_offsets
+        timestamps = self.timestamps
+        postings = self.postings
+        while position < end:
+            next_position = data.index(b"\n", position) + 1
+            line = data[position:next_position]
+            timestamp = self.parse_timestamp(line, modified)
+            if timestamp is None or timestamp < previous_timestamp:
+                timestamp = previous_timestamp
+            line_offsets.append(offset + position)
+            timestamps.append(timestamp)
+            for token in TOKEN_REGEX.findall(line.lower()):
+                lines = postings.get(token)
+                if lines is None:
+                    postings[token] = array("I", [line_number])
+                elif lines[-1] != line_number:
+                    lines.append(line_number)
+            previous_timestamp = timestamp
+            position = next_position
+            line_number += 1
+        self.indexed_size = offset + end
+
+    @staticmethod
+    def parse_timestamp(line, modified):
+        match = SYSLOG_TIME_REGEX.match(line)
+        if match:
+            month = MONTHS.get(match.group(1))
+            if month is None:
+                return None
+            year = modified.tm_year if month <= modified.tm_mon else modified.tm_year - 1
+            day, hour, minute, second = (int(group) for group in match.groups()[1:])
+        else:
+            match = ISO_TIME_REGEX.match(line)
+            if not match:
+                return None
+            year, month, day, hour, minute, second = (int(group) for group in match.groups())
+        try:
+            return time.mktime((year, month, day, hour, minute, second, 0, 0, -1))
+        except (OverflowError, ValueError):
+            return None
+
+    def matching_lines(self, tokens, start=None, end=None):
+        """
+        Numbers of the lines containing all tokens and written between start and end, in order
+        """
+        first = 0 if start is None else bisect_left(self.timestamps, start)
+        last = len(self.timestamps) if end is None else bisect_right(self.timestamps, end)
+        if first >= last:
+            return []
+        if not tokens:
+            return range(first, last)
+        postings = []
+        for token in tokens:
+            lines = self.postings.get(token)
+            if lines is None:
+                return []
+            postings.append(lines)
+        # Walk the rarest word, look the line numbers up in the others
+        postings.sort(key=len)
+        rarest = postings[0]
+        others = postings[1:]
+        matches = []
+        for index in range(bisect_left(rarest, first), bisect_left(rarest, last)):
+            line_number = rarest[index]
+            for lines in others:
+                found = bisect_left(lines, line_number)
+                if found == len(lines) or lines[found] != line_number:
+                    break
+            else:
+                matches.append(line_number)
+        return matches
+
+    def open_content(self):
+        """
+        The indexed content: the file memory-mapped, or the decompressed archive. None if it changed since.
+        """
+        try:
+            with open(self.path, "rb") as file:
+                stat = os.fstat(file.fileno())
+                if not self.is_current(stat) or stat.st_size == 0:
+                    return None
+                if self.compression:
+                    return decompressed(self.path, self.compression, self.identity, self.mtime)
+                return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, EOFError, ValueError, lzma.LZMAError):
+            return None
+
+    def line(self, content, line_number):
+        start = self.line_offsets[line_number]
+        if line_number + 1 < len(self.line_offsets):
+            end = self.line_offsets[line_number + 1]
+        else:
+            end = self.indexed_size
+        return content[start:end].rstrip(b"\n")
+
+
+def index_file_path(path):
+    return os.path.join(INDEX_DIRECTORY, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".index")
+
+
+def load_index(path):
+    try:
+        with open(index_file_path(path), "rb") as file:
+            version, file_index = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+        return None
+    if version != INDEX_VERSION or file_index.path != path:
+        return None
+    return file_index
+
+
+def save_index(file_index):
+    # The index contains words of logs only root can read
+    os.makedirs(INDEX_DIRECTORY, mode=0o700, exist_ok=True)
+    temporary_path = index_file_path(file_index.path) + ".tmp"
+    with open(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as file:
+        pickle.dump((INDEX_VERSION, file_index), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, index_file_path(file_index.path))
+
+
+def build_index(path, file_index=None):
+    """
+    Bring the index of path up to date: only the new lines of a log that grew are read,
+    a rotated, truncated or changed file is indexed again.
+    Returns the same index if nothing changed, a new one otherwise.
+    """
+    with open(path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        if file_index is not None and file_index.is_current(stat):
+            if file_index.compression or file_index.indexed_size == stat.st_size:
+                return file_index
+            updated = file_index.copy()
+        else:
+            updated = FileIndex(path)
+        if updated.compression:
+            data = DECOMPRESSORS[updated.compression](file.read())
+        else:
+            file.seek(updated.indexed_size)
+            data = file.read()
+    updated.update(stat, data, updated.indexed_size)
+    return updated
+
+
+class LogIndexer(QObject):
+    """
+    Keep the indexes of the log files up to date, loading them from the disk cache first.
+    Meant to live in its own thread: indexing a week of compressed archives takes a while the first time.
+    """
+    index_updated = pyqtSignal(object)
+    index_removed = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+
+    def __init__(self, patterns=INDEX_PATTERNS, parent=None):
+        super().__init__(parent)
+        self.patterns = patterns
+        self.indexes = {}
+        # Set from another thread to give up between two files
+        self.stopped = False
+
+    @pyqtSlot()
+    def refresh(self):
+        paths = index_paths(self.patterns)
+        for path in list(self.indexes):
+            if path not in paths:
+                del self.indexes[path]
+                try:
+                    os.remove(index_file_path(path))
+                except OSError:
+                    pass
+                self.index_removed.emit(path)
+
+        for done, path in enumerate(paths):
+            if self.stopped:
+                return
+            self.progress.emit(done, len(paths))
+            file_index = self.indexes.get(path)
+            if file_index is None:
+                file_index = load_index(path)
+            try:
+                updated = build_index(path, file_index)
+            except (OSError, EOFError, ValueError, lzma.LZMAError) as e:
+                print(f"Cannot index {path}: {e}")
+                continue
+            if updated is not file_index:
+                try:
+                    save_index(updated)
+                except OSError as e:
+                    print(f"Cannot save the index of {path}: {e}")
+            if updated is not self.indexes.get(path):
+                self.indexes[path] = updated
+                self.index_updated.emit(updated)
+        self.progress.emit(len(paths), len(paths))
+        self.finished.emit()
+
+
+def search(indexes, text, start=None, end=None, max_results=DEFAULT_MAX_RESULTS):
+    """
+    Lines of all indexes containing every word of text, written between start and end.
+    Returns (number of matches, the newest max_results of them as (timestamp, path, line number, line) by time).
+    """
+    tokens = tokenize(text.encode("utf-8"))
+    count = 0
+    matches = []
+    for file_index in indexes:
+        timestamps = file_index.timestamps
+        lines = file_index.matching_lines(tokens, start, end)
+        count += len(lines)
+        # Line numbers follow time within a file, older matches would be cut anyway
+        for line_number in lines[-max_results:]:
+            matches.append((timestamps[line_number], file_index.path, line_number))
+    matches.sort()
+    matches = matches[-max_results:]
+
+    results = []
+    contents = {}
+    by_path = {file_index.path: file_index for file_index in indexes}
+    for timestamp, path, line_number in matches:
+        if path not in contents:
+            contents[path] = by_path[path].open_content()
+        content = contents[path]
+        if content is None:
+            continue
+        line = by_path[path].line(content, line_number)
+        results.append((timestamp, path, line_number, line.decode("utf-8", "replace")))
+    for content in contents.values():
+        if isinstance(content, mmap.mmap):
+            content.close()
+    return count, results
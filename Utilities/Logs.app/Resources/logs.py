@@ -3,32 +3,511 @@
 # Based on https://stackoverflow.com/a/41751956
 
 import os, sys
+import argparse
+import bisect
+import configparser
+import re
+import time
+from collections import deque
 
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, QProcess, QTextCodec
-from PyQt5.QtGui import QTextCursor, QPixmap, QIcon
-from PyQt5.QtWidgets import QApplication, QTextEdit, QAction, QMessageBox, QMainWindow
+from PyQt5.QtCore import (
+    pyqtSignal, pyqtSlot, QProcess, Qt, QAbstractTableModel, QModelIndex, QTimer, QObject, QMetaType,
+    QThread,
+)
+from PyQt5.QtDBus import QDBusConnection, QDBusInterface, QDBusArgument
+from PyQt5.QtGui import QPixmap, QIcon, QBrush, QColor, QFont, QKeySequence
+from PyQt5.QtWidgets import (
+    QApplication, QTableView, QAbstractItemView, QAction, QMessageBox, QMainWindow, QTreeWidget, QTreeWidgetItem,
+    QSplitter, QHeaderView,
+)
 
+from follower import LogFollower, DEFAULT_FOLLOW_LINES
+from logtable import LogTable, SyslogParser
+from dialog_search import SearchDialog
 
-class ProcessOutputReader(QProcess):
-    produce_output = pyqtSignal(str)
+# Oldest lines are dropped past this number, so that memory stays flat when following logs for days
+DEFAULT_MAX_LINES = 100000
+# The view is updated at most this many times per second, whatever the number of lines coming in
+DEFAULT_MAX_REFRESH_RATE = 10
+# Lines waiting for the next update past this number are dropped, the newest ones are kept
+DEFAULT_MAX_PENDING_LINES = 5000
 
-    def __init__(self, parent=None):
-        super().__init__(parent=parent)
-        self.setProcessChannelMode(QProcess.MergedChannels)
-        codec = QTextCodec.codecForLocale()
-        self._decoder_stdout = codec.makeDecoder()
-        self.readyReadStandardOutput.connect(self._ready_read_standard_output)
+STYLE_NORMAL = 0
+STYLE_HEADER = 1
+# Lines of the first severity have this style, lines of the second one this style + 1, and so on
+STYLE_SEVERITY = 2
+
+CLASSIFIER_CONFIG = os.path.expanduser("~/.config/hello/logs.conf")
+
+# Used when there is no CLASSIFIER_CONFIG, which replaces it as a whole.
+# One section per severity, the most severe first. Words match whole words only, case insensitive.
+DEFAULT_CLASSIFIER_CONFIG = """
+[critical]
+words = panic, fatal, segfault, segmentation fault, core dumped, out of swap space, machine check
+color = darkred
+notify = yes
+
+[error]
+words = error, errors, fail, fails, failed, failure, failures, kill, killed, cannot, can't, denied, timeout, timed out
+color = red
+notify = yes
+
+[warning]
+words = warning, warn, slow, retrying, deprecated, degraded
+color = darkorange
+notify = no
+"""
+
+
+def words_regex(words):
+    """
+    One regex for many words, factored as a prefix tree so that the regex engine never tries
+    the same prefix twice: ["fail", "failed", "fatal"] gives "fa(?:il(?:ed)?|tal)"
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for character in word:
+            node = node.setdefault(character, {})
+        node[""] = {}
+
+    def build(node):
+        alternatives = []
+        for character in sorted(node):
+            if character == "":
+                continue
+            prefix = r"\s+" if character == " " else re.escape(character)
+            alternatives.append(prefix + build(node[character]))
+        if not alternatives:
+            return ""
+        if len(alternatives) == 1 and "" not in node:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")" + ("?" if "" in node else "")
+
+    return build(trie)
+
+
+class LineClassifier(object):
+    """
+    Give each line the most severe level whose words it contains, with one precompiled regex for all levels
+    """
+
+    def __init__(self, config_text=None):
+        if config_text is None:
+            config_text = DEFAULT_CLASSIFIER_CONFIG
+            if os.path.exists(CLASSIFIER_CONFIG):
+                with open(CLASSIFIER_CONFIG, "r") as file:
+                    config_text = file.read()
+        config = configparser.ConfigParser()
+        config.read_string(config_text)
+
+        self.names = []
+        self.colors = []
+        self.notify = []
+        # Lower case word, with single spaces: severity
+        self.words = {}
+        for name in config.sections():
+            section = config[name]
+            words = [" ".join(word.lower().split()) for word in section.get("words", "").split(",") if word.strip()]
+            if not words:
+                continue
+            for word in words:
+                # A word listed twice belongs to its most severe level
+                self.words.setdefault(word, len(self.names))
+            self.names.append(name)
+            self.colors.append(section.get("color", "red"))
+            self.notify.append(section.getboolean("notify", fallback=False))
+        # Whole words only: "fail" matches "fail:" but not "failover"
+        self.regex = re.compile(r"(?<!\w)" + words_regex(self.words) + r"(?!\w)") if self.words else None
+
+    def classify(self, line):
+        """
+        Index of the most severe level found in line, or None
+        """
+        if self.regex is None:
+            return None
+        best = None
+        for match in self.regex.finditer(line.lower()):
+            severity = self.words[" ".join(match.group().split())]
+            if best is None or severity < best:
+                best = severity
+                if best == 0:
+                    break
+        return best
+
+
+class LineIngestor(QObject):
+    """
+    Cut the output of each source into complete lines, parse and classify them, and hand them
+    to the view in batches of records, at most max_refresh_rate times per second.
+    Meant to live in its own thread, the GUI thread only appends the batches.
+    """
+    lines_ready = pyqtSignal(list)
+    lines_dropped = pyqtSignal(int)
+    # Lines of the severities that ask for a notification
+    notify_lines = pyqtSignal(list)
+
+    def __init__(self, classifier, max_refresh_rate=DEFAULT_MAX_REFRESH_RATE,
+                 max_pending_lines=DEFAULT_MAX_PENDING_LINES, parent=None):
+        super().__init__(parent)
+        self.classifier = classifier
+        self.parser = SyslogParser()
+        # Source: what follows its last newline, a line that is not finished yet. LogFollower ends
+        # the last line of a file it closes, so this is completed by the next text from the source
+        self._partial_lines = {}
+        # Source: timestamp of its last line, for the lines that have none
+        self._last_timestamps = {}
+        self._pending = deque(maxlen=max_pending_lines)
+        self._received = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(int(1000 / max_refresh_rate))
+        self._timer.timeout.connect(self.flush)
 
+    @pyqtSlot(str, str)
+    def feed(self, source, text):
+        lines = (self._partial_lines.pop(source, "") + text).split("\n")
+        partial_line = lines.pop()
+        if partial_line:
+            self._partial_lines[source] = partial_line
+        self._pending.extend((source, line) for line in lines)
+        self._received += len(lines)
+        if not self._timer.isActive():
+            self._timer.start()
 
     @pyqtSlot()
-    def _ready_read_standard_output(self):
-        raw_bytes = self.readAllStandardOutput()
-        text = self._decoder_stdout.toUnicode(raw_bytes)
-        self.produce_output.emit(text)
+    def flush(self):
+        lines = list(self._pending)
+        dropped = self._received - len(lines)
+        self._pending.clear()
+        self._received = 0
+        if dropped > 0:
+            self.lines_dropped.emit(dropped)
+        if lines:
+            records, notify_lines = self.classify(lines)
+            self.lines_ready.emit(records)
+            if notify_lines:
+                self.notify_lines.emit(notify_lines)
+
+    def classify(self, lines):
+        """
+        (source, line) pairs to LogTable records, and the lines to notify
+        """
+        records = []
+        notify_lines = []
+        classify = self.classifier.classify
+        notify = self.classifier.notify
+        parse = self.parser.parse
+        last_timestamps = self._last_timestamps
+        for source, line in lines:
+            if line == "":
+                continue
+            severity = classify(line)
+            if severity is None:
+                style = STYLE_NORMAL
+            else:
+                style = STYLE_SEVERITY + severity
+                if notify[severity]:
+                    notify_lines.append(line)
+            fields = parse(line)
+            if fields is None:
+                # Continuation lines and logs that are not syslog stay next to the line before
+                timestamp = last_timestamps.get(source)
+                if timestamp is None:
+                    timestamp = time.time()
+                records.append((source, line, style, timestamp, False, "", "", -1, 0))
+            else:
+                timestamp, host, program, pid, message_start = fields
+                records.append((source, line, style, timestamp, True, host, program, pid, message_start))
+            last_timestamps[source] = timestamp
+        return records, notify_lines
+
+
+class NotificationCoalescer(QObject):
+    """
+    Group the lines that differ only by numbers during a time window, then send one notification
+    per group with its count, and no more than max_notifications per window.
+    Notifications go through one session bus connection, notify-send is only a fallback.
+    """
+
+    def __init__(self, window=5000, max_notifications=3, parent=None):
+        super().__init__(parent)
+        self.max_notifications = max_notifications
+        # key: [first line, count], in order of arrival
+        self._groups = {}
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(window)
+        self._timer.timeout.connect(self.flush)
+
+        self._interface = QDBusInterface(
+            "org.freedesktop.Notifications",
+            "/org/freedesktop/Notifications",
+            "org.freedesktop.Notifications",
+            QDBusConnection.sessionBus(),
+            self,
+        )
+
+    @staticmethod
+    def similarity_key(line):
+        # Timestamps, pids, addresses and counters are what usually differ between repeated messages
+        return re.sub(r"0x[0-9a-f]+|\d+", "#", line.lower())
+
+    def add(self, line):
+        group = self._groups.setdefault(self.similarity_key(line), [line, 0])
+        group[1] += 1
+        if not self._timer.isActive():
+            self._timer.start()
+
+    @pyqtSlot()
+    def flush(self):
+        groups = list(self._groups.values())
+        self._groups.clear()
+        for line, count in groups[:self.max_notifications]:
+            self.send(f"{line} (x{count})" if count > 1 else line)
+        others = groups[self.max_notifications:]
+        if others:
+            self.send(f"{sum(count for line, count in others)} more error lines of {len(others)} other kinds")
+
+    def send(self, text):
+        if self._interface.isValid():
+            self._interface.asyncCall(
+                "Notify",
+                "Logs",
+                QDBusArgument(0, QMetaType.UInt),  # replaces_id
+                "logviewer",
+                "Logs",
+                text,
+                QDBusArgument([], QMetaType.QStringList),  # actions
+                {},  # hints
+                -1,  # expire_timeout
+            )
+        else:
+            # No session bus, e.g. when running as root
+            QProcess.startDetached("notify-send", [text])
+
+
+class LogModel(QAbstractTableModel):
+    """
+    One row per log record of a LogTable, filtered by file or program and sorted by any column.
+    Sorted by time, the lines of all the files are merged in the order they were written.
+    The rows shown are kept as a list of record ids, the view only asks for the rows it paints.
+    """
+    COLUMNS = ["Time", "File", "Host", "Program", "PID", "Message"]
+
+    def __init__(self, max_lines=DEFAULT_MAX_LINES, severity_colors=(), parent=None):
+        super().__init__(parent)
+        self.table = LogTable(max_lines)
+        self.severity_brushes = [QBrush(QColor(color)) for color in severity_colors]
+        self.header_font = QFont()
+        self.header_font.setBold(True)
+        # (column of LogTable, index of the name) or None for all the records
+        self.filter = None
+        self.sort_column = 0
+        self.sort_order = Qt.AscendingOrder
+        # Ids of the records shown, in ascending order of their sort keys, from visible_start on.
+        # The rows removed from the start are only deleted from the lists once there are enough of them.
+        self.visible_ids = []
+        self.sort_keys = []
+        self.visible_start = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.visible_ids) - self.visible_start
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def record_row(self, row):
+        """
+        Row of the LogTable shown at row of the model
+        """
+        if self.sort_order == Qt.DescendingOrder:
+            return self.visible_ids[len(self.visible_ids) - 1 - row] - self.table.base_id
+        return self.visible_ids[self.visible_start + row] - self.table.base_id
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        table = self.table
+        row = self.record_row(index.row())
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                if not table.parsed[row]:
+                    return ""
+                return time.strftime("%b %d %H:%M:%S", time.localtime(table.timestamps[row]))
+            if column == 1:
+                return os.path.basename(table.source_names[table.sources[row]])
+            if column == 2:
+                return table.host_names[table.hosts[row]]
+            if column == 3:
+                return table.program_names[table.programs[row]]
+            if column == 4:
+                pid = table.pids[row]
+                return str(pid) if pid >= 0 else ""
+            return table.message(row)
+        style = table.styles[row]
+        if role == Qt.ForegroundRole and style >= STYLE_SEVERITY:
+            return self.severity_brushes[style - STYLE_SEVERITY]
+        if role == Qt.FontRole and style == STYLE_HEADER:
+            return self.header_font
+        return None
+
+    def line(self, row):
+        return self.table.lines[self.record_row(row)]
+
+    def _accepts(self, record_id):
+        if self.filter is None:
+            return True
+        column, index = self.filter
+        return column[record_id - self.table.base_id] == index
+
+    def _sort_key(self, record_id):
+        table = self.table
+        row = record_id - table.base_id
+        column = self.sort_column
+        # The id keeps the rows with the same value in the order they came in
+        if column == 0:
+            return table.timestamps[row], record_id
+        if column == 1:
+            return table.source_names[table.sources[row]], record_id
+        if column == 2:
+            return table.host_names[table.hosts[row]], record_id
+        if column == 3:
+            return table.program_names[table.programs[row]], record_id
+        if column == 4:
+            return table.pids[row], record_id
+        return table.message(row), record_id
+
+    def _rebuild(self):
+        self.beginResetModel()
+        keyed = sorted(
+            (self._sort_key(record_id), record_id)
+            for record_id in range(self.table.first_id, self.table.end_id)
+            if self._accepts(record_id)
+        )
+        self.sort_keys = [key for key, record_id in keyed]
+        self.visible_ids = [record_id for key, record_id in keyed]
+        self.visible_start = 0
+        self.endResetModel()
+
+    def set_filter(self, column_name=None, index=None):
+        """
+        Only show the records whose column_name ("sources" or "programs") is the name at index
+        """
+        self.filter = None if column_name is None else (getattr(self.table, column_name), index)
+        self._rebuild()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        self._rebuild()
+
+    @staticmethod
+    def _runs(positions):
+        """
+        (position, count) of each run of consecutive positions, positions being sorted
+        """
+        runs = []
+        for position in positions:
+            if runs and runs[-1][0] + runs[-1][1] == position:
+                runs[-1][1] += 1
+            else:
+                runs.append([position, 1])
+        return runs
+
+    def _view_row(self, position, count):
+        """
+        First row of the model that shows the count records from position of visible_ids
+        """
+        row = position - self.visible_start
+        if self.sort_order == Qt.DescendingOrder:
+            row = self.rowCount() - row - count
+        return row
+
+    def _drop_oldest(self, count):
+        table = self.table
+        cutoff = table.first_id + count
+        dropped = [record_id for record_id in range(table.first_id, min(cutoff, table.end_id))
+                   if self._accepts(record_id)]
+        start = self.visible_start
+        if all(record_id < cutoff for record_id in self.visible_ids[start:start + len(dropped)]):
+            # The oldest records come first, as when sorted by time
+            runs = [[start, len(dropped)]] if dropped else []
+        else:
+            runs = self._runs(sorted(
+                bisect.bisect_left(self.sort_keys, self._sort_key(record_id), start) for record_id in dropped
+            ))
+        # From the last run to the first, so that the positions of the other ones stay the same
+        for position, run_count in reversed(runs):
+            row = self._view_row(position, run_count)
+            self.beginRemoveRows(QModelIndex(), row, row + run_count - 1)
+            if position == self.visible_start:
+                self.visible_start += run_count
+            else:
+                del self.visible_ids[position:position + run_count]
+                del self.sort_keys[position:position + run_count]
+            self.endRemoveRows()
+        if self.visible_start and self.visible_start >= len(self.visible_ids) // 4:
+            del self.visible_ids[:self.visible_start]
+            del self.sort_keys[:self.visible_start]
+            self.visible_start = 0
+        table.drop_oldest(count)
+
+    def append_lines(self, records):
+        """
+        Append a batch of records, dropping the oldest ones past the capacity
+        """
+        table = self.table
+        records = records[-table.capacity:]
+        if not records:
+            return
+        overflow = len(table) + len(records) - table.capacity
+        if overflow > 0:
+            self._drop_oldest(overflow)
+        first_id = table.end_id
+        table.extend(records)
+        keyed = sorted(
+            (self._sort_key(record_id), record_id)
+            for record_id in range(first_id, table.end_id)
+            if self._accepts(record_id)
+        )
+        # Each record goes where its sort key is among the ones shown, the ones older than the last row shown,
+        # like the first lines of a file that starts to be followed, in between the other rows
+        positions = [bisect.bisect_left(self.sort_keys, key, self.visible_start) for key, record_id in keyed]
+        runs = []
+        for position, (key, record_id) in zip(positions, keyed):
+            if runs and runs[-1][0] == position:
+                runs[-1][1].append(key)
+                runs[-1][2].append(record_id)
+            else:
+                runs.append((position, [key], [record_id]))
+        for position, keys, record_ids in reversed(runs):
+            row = self._view_row(position, 0)
+            self.beginInsertRows(QModelIndex(), row, row + len(keys) - 1)
+            self.sort_keys[position:position] = keys
+            self.visible_ids[position:position] = record_ids
+            self.endInsertRows()
+
+    def append_marker(self, text):
+        timestamp = self.table.timestamps[-1] if len(self.table) else time.time()
+        self.append_lines([("", text, STYLE_HEADER, timestamp, False, "", "", -1, 0)])
+
 
 class MyConsole(QMainWindow):
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, max_lines=DEFAULT_MAX_LINES, severity_colors=()):
         super().__init__(parent=parent)
 
         self.setWindowTitle("Logs")
@@ -38,52 +517,111 @@ class MyConsole(QMainWindow):
         self.setMinimumWidth(1024)
         self.setMinimumHeight(600)
 
-        self.textEdit = QTextEdit()
+        self.model = LogModel(max_lines=max_lines, severity_colors=severity_colors, parent=self)
+        self.notifier = NotificationCoalescer(parent=self)
+        # Created on first use, it starts indexing all the logs
+        self.search_dialog = None
+
+        # One pane per file and per program, they filter the table instead of searching the text
+        self.sourcesTreeWidget = QTreeWidget()
+        self.sourcesTreeWidget.setHeaderHidden(True)
+        self.allSourcesItem = QTreeWidgetItem(["All Logs"])
+        self.filesItem = QTreeWidgetItem(["Files"])
+        self.programsItem = QTreeWidgetItem(["Programs"])
+        for item in (self.allSourcesItem, self.filesItem, self.programsItem):
+            self.sourcesTreeWidget.addTopLevelItem(item)
+        self.filesItem.setExpanded(True)
+        self.programsItem.setExpanded(True)
+        self.sourcesTreeWidget.setCurrentItem(self.allSourcesItem)
+        self.sourcesTreeWidget.currentItemChanged.connect(self._source_changed)
+        # Names of the table already in the panes
+        self.shown_sources = 0
+        self.shown_programs = 0
+
+        self.tableView = QTableView()
+        # All rows have the same height, the view does not need to measure every line
+        self.tableView.verticalHeader().hide()
+        self.tableView.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tableView.setShowGrid(False)
+        self.tableView.setWordWrap(False)
+        self.tableView.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tableView.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.tableView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tableView.setModel(self.model)
+        self.tableView.horizontalHeader().setStretchLastSection(True)
+        self.tableView.horizontalHeader().setSortIndicator(self.model.sort_column, self.model.sort_order)
+        self.tableView.setSortingEnabled(True)
 
         font = self.font()
         font.setPointSize(9)
         # font.setFamily("monospace")
-        self.textEdit.setFont(font)
-
-        self.textEdit.setReadOnly(True)
+        self.tableView.setFont(font)
+        self.model.header_font.setPointSize(9)
+        self.tableView.verticalHeader().setDefaultSectionSize(self.tableView.fontMetrics().height() + 4)
+        for column, width in enumerate((110, 100, 90, 90, 50)):
+            self.tableView.setColumnWidth(column, width)
 
-        self._cursor_output = self.textEdit.textCursor()
+        splitter = QSplitter()
+        splitter.addWidget(self.sourcesTreeWidget)
+        splitter.addWidget(self.tableView)
+        splitter.setStretchFactor(1, 1)
+        splitter.setSizes([180, 844])
+        self.setCentralWidget(splitter)
 
-        self.setCentralWidget(self.textEdit)
+    @pyqtSlot(list)
+    def append_output(self, lines):
+        # Follow the new lines only if the user did not scroll up to read older ones
+        scroll_bar = self.tableView.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+        self.model.append_lines(lines)
+        self._add_sources()
+        if at_bottom and self.model.sort_order == Qt.AscendingOrder:
+            self.scroll_to_last_line()
 
-    @pyqtSlot(str)
-    def append_output(self, text):
-        lines = text.split("\n")
+    @pyqtSlot(list)
+    def notify(self, lines):
         for line in lines:
-            if line == "":
-                continue
-            if line.startswith("==>"):
-                line = "<br><b>" + line + "</b>"
-            red_words = ["error", "fail", "kill", "slow"]
-            red = False
-            for red_word in red_words:
-                if red_word in line.lower():
-                    red = True
-            if red == True:
-                self._cursor_output.insertHtml("<span style='color:red'>" + line + "</span><br>")
-                # Also send a notification on red lines
-                try:
-                    p = QProcess()
-                    p.setProgram("notify-send")
-                    p.setArguments([line])
-                    p.startDetached()
-                except:
-                    continue
-            else:
-                self._cursor_output.insertHtml(line + "<br>")
-        self.scroll_to_last_line()
+            self.notifier.add(line)
+
+    @pyqtSlot(int)
+    def append_dropped_marker(self, count):
+        self.model.append_marker(f"--- {count} lines dropped, too many lines per second ---")
 
     def scroll_to_last_line(self):
-        cursor = self.textEdit.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        cursor.movePosition(QTextCursor.Up if cursor.atBlockStart() else
-                            QTextCursor.StartOfLine)
-        self.textEdit.setTextCursor(cursor)
+        self.tableView.scrollToBottom()
+
+    def copy_selection(self):
+        rows = sorted(index.row() for index in self.tableView.selectionModel().selectedRows())
+        QApplication.clipboard().setText("\n".join(self.model.line(row) for row in rows))
+
+    def _add_sources(self):
+        table = self.model.table
+        for parent, column_name, names, shown in (
+                (self.filesItem, "sources", table.source_names, self.shown_sources),
+                (self.programsItem, "programs", table.program_names, self.shown_programs),
+        ):
+            for index in range(shown, len(names)):
+                # Lines without a file or a program, like the dropped lines markers
+                if not names[index]:
+                    continue
+                item = QTreeWidgetItem([os.path.basename(names[index])])
+                item.setToolTip(0, names[index])
+                item.setData(0, Qt.UserRole, (column_name, index))
+                parent.addChild(item)
+            parent.sortChildren(0, Qt.AscendingOrder)
+        self.shown_sources = len(table.source_names)
+        self.shown_programs = len(table.program_names)
+
+    def _source_changed(self, item, previous):
+        source = item.data(0, Qt.UserRole) if item is not None else None
+        if source is None:
+            if item is not self.allSourcesItem:
+                return
+            self.model.set_filter()
+        else:
+            self.model.set_filter(*source)
+        if self.model.sort_order == Qt.AscendingOrder:
+            self.scroll_to_last_line()
 
     def _showMenu(self):
         exitAct = QAction('&Quit', self)
@@ -93,12 +631,35 @@ class MyConsole(QMainWindow):
         menubar = self.menuBar()
         fileMenu = menubar.addMenu('&File')
         fileMenu.addAction(exitAct)
+        copyAct = QAction('&Copy', self)
+        copyAct.setShortcut(QKeySequence.Copy)
+        copyAct.setStatusTip('Copy the selected lines')
+        copyAct.triggered.connect(self.copy_selection)
+        findAct = QAction('&Find...', self)
+        findAct.setShortcut(QKeySequence.Find)
+        findAct.setStatusTip('Search all the logs, including the rotated ones')
+        findAct.triggered.connect(self._showSearchDialog)
+        editMenu = menubar.addMenu('&Edit')
+        editMenu.addAction(copyAct)
+        editMenu.addAction(findAct)
         aboutAct = QAction('&About', self)
         aboutAct.setStatusTip('About this application')
         aboutAct.triggered.connect(self._showAbout)
         helpMenu = menubar.addMenu('&Help')
         helpMenu.addAction(aboutAct)
 
+    def _showSearchDialog(self):
+        if self.search_dialog is None:
+            self.search_dialog = SearchDialog(self)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+        self.search_dialog.activateWindow()
+
+    def closeEvent(self, event):
+        if self.search_dialog is not None:
+            self.search_dialog.stop()
+        super().closeEvent(event)
+
     def _showAbout(self):
         print("showDialog")
         msg = QMessageBox()
@@ -116,22 +677,45 @@ class MyConsole(QMainWindow):
             "A simple utility to view log files<br>in <code>/var/log</code><br><br><a href='https://github.com/helloSystem/Utilities'>https://github.com/helloSystem/Utilities</a>")
         msg.exec()
 
-# Simple singleton:
-# Ensure that only one instance of this application is running by trying to kill the other ones
-p = QProcess()
-p.setProgram("pkill")
-p.setArguments(["-f", os.path.abspath(__file__)])
-cmd = p.program() + " " + " ".join(p.arguments())
-print(cmd)
-p.start()
-p.waitForFinished()
-    
-app = QApplication(sys.argv)
-
-reader = ProcessOutputReader()
-console = MyConsole()
-reader.produce_output.connect(console.append_output)
-reader.start('sh', ['-c', "tail -n 1000 -f /var/log/*.log /var/log/messages"])
-
-console.show()
-app.exec_()
+if __name__ == "__main__":
+    # Simple singleton:
+    # Ensure that only one instance of this application is running by trying to kill the other ones
+    p = QProcess()
+    p.setProgram("pkill")
+    p.setArguments(["-f", os.path.abspath(__file__)])
+    cmd = p.program() + " " + " ".join(p.arguments())
+    print(cmd)
+    p.start()
+    p.waitForFinished()
+
+    parser = argparse.ArgumentParser(description="View log files in /var/log")
+    parser.add_argument("--max-lines", type=int, default=DEFAULT_MAX_LINES,
+                        help="number of lines kept in memory, older ones are dropped")
+    parser.add_argument("--max-refresh-rate", type=int, default=DEFAULT_MAX_REFRESH_RATE,
+                        help="maximum number of view updates per second")
+    parser.add_argument("-n", "--lines", type=int, default=DEFAULT_FOLLOW_LINES,
+                        help="number of lines shown from the end of each log file at startup")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+
+    classifier = LineClassifier()
+
+    # Reading, cutting and classifying the logs happen in this thread, the GUI thread only appends the lines
+    log_thread = QThread()
+    follower = LogFollower(lines=max(0, args.lines))
+    follower.moveToThread(log_thread)
+    ingestor = LineIngestor(classifier, max_refresh_rate=max(1, args.max_refresh_rate))
+    ingestor.moveToThread(log_thread)
+    console = MyConsole(max_lines=max(1, args.max_lines), severity_colors=classifier.colors)
+    follower.produce_output.connect(ingestor.feed)
+    ingestor.lines_dropped.connect(console.append_dropped_marker)
+    ingestor.lines_ready.connect(console.append_output)
+    ingestor.notify_lines.connect(console.notify)
+    log_thread.started.connect(follower.start)
+
+    console.show()
+    log_thread.start()
+    app.exec_()
+    log_thread.quit()
+    log_thread.wait()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import re
+import time
+from array import array
+
+MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+}
+# What follows the timestamp: "host program[pid]: message", program and pid are optional
+# like in "host last message repeated 3 times"
+SYSLOG_TAIL = r" (\S+)(?: ([^\s\[:]+)(?:\[(\d+)\])?:)? ?"
+# "Oct 19 17:58:41 host program[pid]: message", the BSD syslog format
+BSD_SYSLOG_REGEX = re.compile(r"([A-Z][a-z]{2}) +(\d{1,2}) (\d\d):(\d\d):(\d\d)" + SYSLOG_TAIL)
+# "2026-10-19T17:58:41.123+02:00 host program[pid]: message", the RFC 5424 timestamp
+ISO_SYSLOG_REGEX = re.compile(r"(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)\S*" + SYSLOG_TAIL)
+
+
+class SyslogParser(object):
+    """
+    Cut syslog lines into (timestamp, host, program, pid, offset of the message)
+    """
+
+    def __init__(self):
+        # (year, month, day, hour, minute): seconds since the epoch, mktime is the slow part
+        self._minutes = {}
+
+    def _timestamp(self, year, month, day, hour, minute, second):
+        key = year, month, day, hour, minute
+        start = self._minutes.get(key)
+        if start is None:
+            if len(self._minutes) > 10000:
+                self._minutes.clear()
+            try:
+                start = time.mktime((year, month, day, hour, minute, 0, 0, 0, -1))
+            except (OverflowError, ValueError):
+                return None
+            self._minutes[key] = start
+        return start + second
+
+    def parse(self, line):
+        """
+        None if line does not start like a syslog line
+        """
+        match = BSD_SYSLOG_REGEX.match(line)
+        if match:
+            month_name, day, hour, minute, second, host, program, pid = match.groups()
+            month = MONTHS.get(month_name)
+            if month is None:
+                return None
+            # Syslog timestamps have no year, a month after the current one was last year
+            now = time.localtime()
+            year = now.tm_year if month <= now.tm_mon else now.tm_year - 1
+        else:
+            match = ISO_SYSLOG_REGEX.match(line)
+            if not match:
+                return None
+            year, month, day, hour, minute, second, host, program, pid = match.groups()
+            year, month = int(year), int(month)
+        timestamp = self._timestamp(year, month, int(day), int(hour), int(minute), int(second))
+        if timestamp is None:
+            return None
+        return timestamp, host, program or "", int(pid) if pid else -1, match.end()
+
+
+class LogTable(object):
+    """
+    The last capacity log records, one array per field so that a filter or a sort only walks
+    the fields it needs. Strings that repeat, like files, hosts and programs, are stored once.
+    Rows have ids that do not change when the oldest rows are dropped. The row with id record_id
+    is at index record_id - base_id of each array.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Id of the oldest row kept
+        self.first_id = 0
+        # Id of the row at index 0, the dropped rows before first_id are only deleted from the arrays
+        # once there are enough of them, so that dropping a few rows does not move all the others
+        self.base_id = 0
+        self.lines = []
+        self.timestamps = array("d")
+        # The line has a timestamp of its own, the other ones get the one of the line before
+        self.parsed = array("B")
+        self.sources = array("I")
+        self.hosts = array("I")
+        self.programs = array("I")
+        self.pids = array("i")
+        self.message_starts = array("I")
+        self.styles = array("B")
+        # Names, and the index of each name, for the fields that repeat
+        self.source_names = []
+        self.host_names = []
+        self.program_names = []
+        self._source_indexes = {}
+        self._host_indexes = {}
+        self._program_indexes = {}
+
+    def __len__(self):
+        return self.end_id - self.first_id
+
+    @property
+    def end_id(self):
+        return self.base_id + len(self.lines)
+
+    @staticmethod
+    def _intern(names, indexes, name):
+        index = indexes.get(name)
+        if index is None:
+            index = len(names)
+            names.append(name)
+            indexes[name] = index
+        return index
+
+    def extend(self, records):
+        """
+        Append (source, line, style, timestamp, parsed, host, program, pid, message start) records
+        """
+        for source, line, style, timestamp, parsed, host, program, pid, message_start in records:
+            self.lines.append(line)
+            self.timestamps.append(timestamp)
+            self.parsed.append(parsed)
+            self.sources.append(self._intern(self.source_names, self._source_indexes, source))
+            self.hosts.append(self._intern(self.host_names, self._host_indexes, host))
+            self.programs.append(self._intern(self.program_names, self._program_indexes, program))
+            self.pids.append(pid)
+            self.message_starts.append(message_start)
+            self.styles.append(style)
+
+    def drop_oldest(self, count):
+        self.first_id += min(count, len(self))
+        dropped = self.first_id - self.base_id
+        if dropped < len(self.lines) // 4:
+            return
+        for column in (
+                self.lines, self.timestamps, self.parsed, self.sources, self.hosts, self.programs,
+                self.pids, self.message_starts, self.styles,
+        ):
+            del column[:dropped]
+        self.base_id = self.first_id
+
+    def message(self, row):
+        return self.lines[row][self.message_starts[row]:]
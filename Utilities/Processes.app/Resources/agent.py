@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from PyQt5.QtCore import pyqtSignal, QObject
+from PyQt5.QtNetwork import QAbstractSocket, QTcpSocket
+
+from snapshot import get_system_snapshot, get_processes_snapshot
+from worker_psutil import PSUtilsWorker
+
+AGENT_DEFAULT_PORT = 7717
+
+# A frame is a codec byte, the payload length, then the payload
+FRAME_HEADER = struct.Struct("!cI")
+FRAME_MAX_SIZE = 64 * 1024 * 1024
+CODEC_MSGPACK = b"M"
+CODEC_JSON = b"J"
+
+
+def encode_frame(message):
+    if msgpack is not None:
+        codec = CODEC_MSGPACK
+        payload = msgpack.packb(message, use_bin_type=True)
+    else:
+        codec = CODEC_JSON
+        payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(codec, len(payload)) + payload
+
+
+class FrameDecoder(object):
+    """
+    Accumulate bytes as they arrive from the socket and cut them into messages.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer.extend(data)
+        messages = []
+        while len(self.buffer) >= FRAME_HEADER.size:
+            codec, length = FRAME_HEADER.unpack_from(self.buffer)
+            if length > FRAME_MAX_SIZE:
+                raise ValueError(f"Frame of {length} bytes is too large")
+            if len(self.buffer) < FRAME_HEADER.size + length:
+                break
+            payload = bytes(self.buffer[FRAME_HEADER.size:FRAME_HEADER.size + length])
+            del self.buffer[:FRAME_HEADER.size + length]
+            if codec == CODEC_MSGPACK:
+                if msgpack is None:
+                    raise ValueError("The agent speaks msgpack, but the msgpack module is not installed")
+                messages.append(msgpack.unpackb(payload, raw=False, strict_map_key=False))
+            elif codec == CODEC_JSON:
+                messages.append(json.loads(payload.decode("utf-8")))
+            else:
+                raise ValueError(f"Unknown frame codec {codec!r}")
+        return messages
+
+
+def processes_delta(previous, current):
+    """
+    Compare two {pid: row} dicts and return (changes, removed pids).
+    New processes come as whole rows, the others only with their pid and the fields that changed.
+    """
+    changed = []
+    for pid, row in current.items():
+        old = previous.get(pid)
+        if old is None:
+            changed.append(row)
+        elif old != row:
+            fields = {key: value for key, value in row.items() if old.get(key) != value}
+            fields["pid"] = pid
+            changed.append(fields)
+    removed = [pid for pid in previous if pid not in current]
+    return changed, removed
+
+
+class AgentSampler(object):
+    """
+    Take one snapshot per interval, whatever the number of connected viewers.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.hostname = socket.gethostname()
+        self.generation = 0
+        self.system = None
+        self.processes = {}
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def run(self):
+        while self.running:
+            system = get_system_snapshot()
+            processes = {row["pid"]: row for row in get_processes_snapshot()}
+            with self.condition:
+                self.system = system
+                self.processes = processes
+                self.generation += 1
+                self.condition.notify_all()
+            time.sleep(self.interval)
+
+    def wait_for(self, generation):
+        """
+        Block until a snapshot newer than generation is available, return (generation, system, processes)
+        """
+        with self.condition:
+            while self.running and self.generation <= generation:
+                self.condition.wait()
+            return self.generation, self.system, self.processes
+
+
+class AgentRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sampler = self.server.sampler
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        generation = 0
+        sent = {}
+        while sampler.running:
+            generation, system, processes = sampler.wait_for(generation)
+            if not sampler.running:
+                break
+            if sent:
+                changed, removed = processes_delta(sent, processes)
+                message = {"kind": "delta", "processes": changed, "removed": removed}
+            else:
+                message = {"kind": "full", "processes": list(processes.values()), "removed": []}
+            message["hostname"] = sampler.hostname
+            message["interval"] = sampler.interval
+            message["system"] = system
+            try:
+                self.request.sendall(encode_frame(message))
+            except OSError:
+                break
+            sent = processes
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, interval=1.0):
+        super().__init__(address, AgentRequestHandler)
+        self.sampler = AgentSampler(interval=interval)
+
+    def serve_forever(self, poll_interval=0.5):
+        self.sampler.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.sampler.stop()
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    """
+    'host:port', 'host' or ':port' to a (host, port) tuple
+    """
+    host, separator, port = text.rpartition(":")
+    if not separator:
+        host, port = text, ""
+    return host or default_host, int(port) if port else AGENT_DEFAULT_PORT
+
+
+def run_agent(address, interval=1.0):
+    server = AgentServer(parse_address(address), interval=interval)
+    print(f"Processes agent listening on {server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class AgentClient(QObject):
+    """
+    Keep a live copy of a remote agent snapshot, rebuilt from the deltas.
+    """
+    updated = pyqtSignal()
+    connection_changed = pyqtSignal(bool)
+    error = pyqtSignal(str)
+
+    def __init__(self, host, port=AGENT_DEFAULT_PORT, parent=None):
+        super().__init__(parent)
+        self.host = host
+        self.port = port
+        self.hostname = host
+        self.system = None
+        self.processes = {}
+        self.decoder = FrameDecoder()
+
+        self.socket = QTcpSocket(self)
+        self.socket.readyRead.connect(self._ready_read)
+        self.socket.connected.connect(lambda: self.connection_changed.emit(True))
+        self.socket.disconnected.connect(self._disconnected)
+        self.socket.error.connect(self._error)
+
+    @property
+    def name(self):
+        return f"{self.host}:{self.port}"
+
+    def is_connected(self):
+        return self.socket.state() == QAbstractSocket.ConnectedState
+
+    def open(self):
+        self.socket.connectToHost(self.host, self.port)
+
+    def close(self):
+        self.socket.abort()
+
+    def get_processes_snapshot(self):
+        return list(self.processes.values())
+
+    def _ready_read(self):
+        try:
+            messages = self.decoder.feed(bytes(self.socket.readAll()))
+        except ValueError as err:
+            self.error.emit(f"{self.name}: {err}")
+            self.socket.abort()
+            return
+        for message in messages:
+            if message["kind"] == "full":
+                self.processes = {}
+            for pid in message["removed"]:
+                self.processes.pop(pid, None)
+            for row in message["processes"]:
+                # Deltas only carry the fields that changed
+                old = self.processes.get(row["pid"])
+                self.processes[row["pid"]] = dict(old, **row) if old is not None else row
+            self.system = message["system"]
+            self.hostname = message["hostname"]
+        if messages:
+            self.updated.emit()
+
+    def _disconnected(self):
+        self.decoder = FrameDecoder()
+        self.system = None
+        self.processes = {}
+        self.connection_changed.emit(False)
+
+    def _error(self, socket_error):
+        self.error.emit(f"{self.name}: {self.socket.errorString()}")
+
+
+class AgentPSUtilsWorker(PSUtilsWorker):
+    """
+    Same signals as PSUtilsWorker, fed by the last snapshot received from an agent.
+    """
+
+    def __init__(self, client):
+        super().__init__()
+        self.system = client.system
+
+    def refresh(self):
+        if self.system:
+            self.emit_snapshot(self.system)
+        self.finished.emit()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+"""
+Hot path benchmark for Processes.app, fed with synthetic snapshots instead of a live system
+
+For every table size it measures, per tick:
+  - refresh_treeview_model in flat, hierarchical, searched and filtered views
+  - treeview_get_row alone
+  - PSUtilsWorker.emit_snapshot into the tab slots
+and reports latency, the memory allocated by one tick and the peak during it, then the peak RSS
+of the whole run. tracemalloc only sees Python allocations, QStandardItem are counted in the RSS.
+
+Run it headless with:
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/process_table.py --sizes 1000,10000 --ticks 5
+"""
+
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+USERNAMES = ["root", "operator", "www", "user", "_pflogd", "messagebus"]
+STATUSES = ["running", "sleeping", "idle", "waiting", "zombie", "stopped"]
+APPLICATION_NAMES = [
+    "Xorg", "Filer", "Menu", "Dock", "falkon", "python3.9", "sh", "sshd",
+    "cron", "syslogd", "devd", "zfskern", "kernel", "moused", "picom",
+]
+
+
+def synthetic_process(rng, pid, ppid, now):
+    uid = rng.choice([0, 0, 0, 25, 80, 1001])
+    bundle = rng.random() < 0.1
+    application_name = rng.choice(APPLICATION_NAMES)
+    return {
+        "treeview_id": pid,
+        "treeview_parent_id": ppid,
+        "pid": pid,
+        "application_name": application_name,
+        "username": USERNAMES[[0, 25, 80, 1001].index(uid) + 1] if uid else "root",
+        "cpu_percent": round(rng.random() * 100, 1) if rng.random() < 0.2 else 0.0,
+        "num_threads": rng.randint(1, 64),
+        "rss": rng.randint(1 << 20, 1 << 30),
+        "vms": rng.randint(1 << 24, 1 << 34),
+        "environ": {"LAUNCHED_BUNDLE": f"/Applications/{application_name}.app"} if bundle else None,
+        "status": rng.choice(STATUSES),
+        "uid": uid,
+        "create_time": now - rng.random() * 86400 * 3,
+    }
+
+
+def synthetic_processes(count, depth, seed=0):
+    """
+    count processes under pid 1, each one a child of a random process at most depth levels deep.
+    The list is shuffled, children often come before their parent, like process_iter() after pid reuse.
+    """
+    rng = random.Random(seed)
+    now = time.time()
+    processes = [synthetic_process(rng, 1, 0, now)]
+    levels = {1: 0}
+    for pid in range(2, count + 1):
+        ppid = rng.choice(processes)["pid"]
+        while levels[ppid] >= depth:
+            ppid = rng.choice(processes)["pid"]
+        levels[pid] = levels[ppid] + 1
+        processes.append(synthetic_process(rng, pid, ppid, now))
+    rng.shuffle(processes)
+    return processes
+
+
+def churn(processes, fraction, seed):
+    """
+    Next tick: fraction of the processes exit, as many new ones start, and the cpu of the others moves
+    """
+    rng = random.Random(seed)
+    now = time.time()
+    survivors = [dict(process) for process in processes if rng.random() >= fraction]
+    next_pid = max(process["pid"] for process in processes) + 1
+    for pid in range(next_pid, next_pid + len(processes) - len(survivors)):
+        survivors.append(synthetic_process(rng, pid, rng.choice(survivors)["pid"], now))
+    for process in survivors:
+        if rng.random() < 0.3:
+            process["cpu_percent"] = round(rng.random() * 100, 1)
+            process["rss"] += rng.randint(-4096, 4096) * 1024
+    return survivors
+
+
+def synthetic_system_snapshot(seed):
+    rng = random.Random(seed)
+    return {
+        "mounted_disk_partitions": [
+            {
+                "device": f"/dev/ada{i}p2",
+                "total": 500 << 30,
+                "used": rng.randint(1 << 30, 400 << 30),
+                "free": rng.randint(1 << 30, 100 << 30),
+                "percent": rng.random() * 100,
+                "fstype": "zfs",
+                "mountpoint": "/" if i == 0 else f"/media/disk{i}",
+            }
+            for i in range(4)
+        ],
+        "cpu": {
+            "user": rng.random() * 50,
+            "system": rng.random() * 20,
+            "nice": rng.random() * 5,
+            "irq": rng.random() * 2,
+            "idle": rng.random() * 30,
+            "cumulative_threads": rng.randint(500, 5000),
+            "process_number": rng.randint(100, 1000),
+        },
+        "memory": {
+            "total": 16 << 30,
+            "available": rng.randint(1 << 30, 8 << 30),
+            "percent": rng.random() * 100,
+            "used": rng.randint(1 << 30, 8 << 30),
+            "free": rng.randint(1 << 30, 8 << 30),
+            "active": rng.randint(1 << 30, 8 << 30),
+            "inactive": rng.randint(1 << 30, 8 << 30),
+            "wired": rng.randint(1 << 30, 8 << 30),
+        },
+        "disk_activity": {
+            "read_count": seed * 1000,
+            "write_count": seed * 500,
+            "read_bytes": seed * (64 << 20),
+            "write_bytes": seed * (32 << 20),
+        },
+        "network": {
+            "packets_recv": seed * 10000,
+            "packets_sent": seed * 8000,
+            "bytes_recv": seed * (10 << 20),
+            "bytes_sent": seed * (2 << 20),
+        },
+    }
+
+
+def measure(ticks, run):
+    """
+    run(tick) once per tick for latency, then once more under tracemalloc for allocations
+    """
+    latencies = []
+    for tick in range(ticks):
+        start = time.perf_counter()
+        run(tick)
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    run(ticks)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, after - before, peak - before
+
+
+def report(name, latencies, allocated, peak):
+    print(
+        f"  {name:<28} median {statistics.median(latencies) * 1000:9.1f} ms"
+        f"  max {max(latencies) * 1000:9.1f} ms"
+        f"  allocated {allocated / 1024:9.0f} KiB  peak {peak / 1024:9.0f} KiB"
+    )
+
+
+def idle_window(app):
+    from processes import Window
+
+    win = Window()
+    # The first local snapshot must not land in the middle of a measure
+    while win.processes_thread is not None:
+        app.processEvents()
+    win.timer.stop()
+    return win
+
+
+def benchmark_size(app, win, size, depth, ticks, churn_fraction):
+    from worker_psutil import PSUtilsWorker
+
+    print(f"{size} processes, depth {depth}, {int(churn_fraction * 100)}% churn per tick")
+    snapshots = [synthetic_processes(size, depth, seed=size)]
+    for tick in range(ticks):
+        snapshots.append(churn(snapshots[-1], churn_fraction, seed=tick))
+
+    def views(filter_index, search):
+        win.searchLineEdit.blockSignals(True)
+        win.filterComboBox.blockSignals(True)
+        win.searchLineEdit.setText(search)
+        win.filterComboBox.setCurrentIndex(filter_index)
+        win.searchLineEdit.blockSignals(False)
+        win.filterComboBox.blockSignals(False)
+        return lambda tick: win.set_processes(snapshots[tick])
+
+    report("flat", *measure(ticks, views(0, "")))
+    report("hierarchical", *measure(ticks, views(1, "")))
+    report("search 'fal'", *measure(ticks, views(0, "fal")))
+    report("filter My Processes", *measure(ticks, views(2, "")))
+    views(0, "")
+
+    def rows(tick):
+        for value in snapshots[tick]:
+            win.treeview_get_row(
+                pid=value["pid"],
+                application_name=value["application_name"],
+                username=value["username"],
+                cpu_percent=value["cpu_percent"],
+                num_threads=value["num_threads"],
+                rss=value["rss"],
+                vms=value["vms"],
+            )
+
+    report("treeview_get_row", *measure(ticks, rows))
+
+    worker = PSUtilsWorker()
+    win.connectPSUtilsWorker(worker)
+    report("PSUtilsWorker.emit_snapshot", *measure(ticks, lambda tick: worker.emit_snapshot(
+        synthetic_system_snapshot(tick + 1)
+    )))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processes.app synthetic process table benchmark")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="comma separated process counts")
+    parser.add_argument("--depth", type=int, default=12, help="deepest level of the process hierarchy")
+    parser.add_argument("--ticks", type=int, default=3)
+    parser.add_argument("--churn", type=float, default=0.2, help="fraction of processes replaced per tick")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    win = idle_window(app)
+    win.show()
+
+    for size in [int(size) for size in args.sizes.split(",")]:
+        benchmark_size(app, win, size, args.depth, args.ticks, args.churn)
+
+    # ru_maxrss is in KiB on Linux and FreeBSD
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+    win.close()
+
+
+if __name__ == "__main__":
+    main()
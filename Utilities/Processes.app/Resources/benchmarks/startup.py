@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Startup benchmark for Processes.app
+
+time-to-first-frame: from Window() until the process table is painted for the first time
+time-to-populated-table: from Window() until the first snapshot of processes is in the table
+
+Run it headless with:
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/startup.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+
+
+class FirstPaintFilter(QObject):
+    def __init__(self, start):
+        super().__init__()
+        self.start = start
+        self.first_frame = None
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.first_frame is None:
+            self.first_frame = time.perf_counter() - self.start
+        return False
+
+
+def is_busy(win):
+    # The window lets go of each worker thread once it has finished
+    return any(thread is not None for thread in (win.psutils_thread, win.icons_cache_thread, win.processes_thread))
+
+
+def measure_once(app, timeout=30.0):
+    from processes import Window
+
+    start = time.perf_counter()
+    win = Window()
+    paint_filter = FirstPaintFilter(start)
+    win.process_tree.viewport().installEventFilter(paint_filter)
+    win.show()
+    constructed = time.perf_counter() - start
+
+    populated = None
+    while populated is None and time.perf_counter() - start < timeout:
+        app.processEvents()
+        if win.tree_view_model.rowCount():
+            populated = time.perf_counter() - start
+        else:
+            time.sleep(0.001)
+
+    # Let the last workers finish before the window goes away
+    deadline = time.perf_counter() + 2
+    while is_busy(win) and time.perf_counter() < deadline:
+        app.processEvents()
+    win.timer.stop()
+    win.close()
+    win.deleteLater()
+    app.processEvents()
+    return constructed, paint_filter.first_frame, populated
+
+
+def report(name, values):
+    values = [value for value in values if value is not None]
+    if not values:
+        print(f"{name:<26} n/a")
+        return
+    print(
+        f"{name:<26} median {statistics.median(values) * 1000:8.1f} ms"
+        f"   min {min(values) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processes.app startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+
+    import_start = time.perf_counter()
+    import processes  # noqa: F401
+    print(f"{'import':<26}        {(time.perf_counter() - import_start) * 1000:8.1f} ms")
+
+    results = [measure_once(app) for _ in range(args.runs)]
+    report("Window() returned", [result[0] for result in results])
+    report("time-to-first-frame", [result[1] for result in results])
+    report("time-to-populated-table", [result[2] for result in results])
+
+
+if __name__ == "__main__":
+    main()
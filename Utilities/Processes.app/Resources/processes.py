@@ -4,6 +4,7 @@ import sys
 import psutil
 import time
 import os
+import argparse
 from collections import deque
 
 # Qt import
@@ -21,6 +22,8 @@ from PyQt5.QtWidgets import (
     QComboBox,
     QShortcut,
     QMessageBox,
+    QAction,
+    QInputDialog,
 )
 
 # The Main Window
@@ -47,6 +50,8 @@ from dialog_cpu_history import CPUHistory
 from widget_chartpie import ChartPieItem
 from worker_psutil import PSUtilsWorker
 from worker_icons_cache import IconsCacheWorker
+from worker_processes import ProcessesWorker
+from agent import AgentClient, AgentPSUtilsWorker, parse_address, run_agent
 
 from utility import bytes2human
 
@@ -66,8 +71,10 @@ class Window(
         TabNetwork.__init__(self)
         TreeViewProcess.__init__(self)
 
-        # Worker
-        self.threads = []
+        # Worker threads, each kept until it has finished; dropping the last reference to a running QThread aborts
+        self.psutils_thread = None
+        self.icons_cache_thread = None
+        self.processes_thread = None
         self.threadpool = QThreadPool()
         self.__icons = {}
 
@@ -86,8 +93,14 @@ class Window(
         ]
         self.filter_process_action = None
         self.search_process_action = None
+        self.host_process_action = None
         self.searchLineEdit = None
         self.filterComboBox = None
+        self.hostComboBox = None
+
+        # Remote agents, the index in the list is the hostComboBox index minus one
+        self.agent_clients = []
+        self.ActionMenuFileConnectToAgent = None
 
         self.cpu_history_dialog = None
 
@@ -104,6 +117,8 @@ class Window(
 
         # TreeView
         self.tree_view_model = None
+        self.processes = []
+        self.process_tree_columns_resized = False
 
         # Multi windows inspection and sample capability
         self.inspect_process_dialogs = {}
@@ -121,9 +136,8 @@ class Window(
 
         self.setupInitialState()
 
+        # The first snapshot is loaded in background, meanwhile the window shows an empty table
         self.refresh()
-        for header_pos in range(len(self.process_tree.header())):
-            self.process_tree.resizeColumnToContents(header_pos)
 
     def focusOutEvent(self, event):
         self.showNormal()
@@ -139,10 +153,6 @@ class Window(
         self.ActionToolBarInspectProcess.setIcon(QIcon(os.path.join(os.path.dirname(__file__), "Inspect.png")))
         self.ActionToolBarSampleProcess.setIcon(QIcon(os.path.join(os.path.dirname(__file__), "SampleProcess.png")))
 
-        # CPU History
-        self.cpu_history_dialog = CPUHistory()
-        self.cpu_history_dialog.hide()
-
         # Configure Chart Data
         # System Memory
         self.chart_pie_item_memory_free = ChartPieItem()
@@ -226,6 +236,7 @@ class Window(
             self.system_memory_slab_value.hide()
 
         self.tree_view_model = QStandardItemModel()
+        self.set_treeview_headers()
         self.process_tree.setModel(self.tree_view_model)
         self.process_tree.sortByColumn(3, Qt.DescendingOrder)
 
@@ -270,6 +281,28 @@ class Window(
         menu_filter_by_group.addAction(self.ActionMenuViewApplicationInLast12Hours)
 
     def setupCustomUiToolBar(self):
+        hostLabel = QLabel("Host")
+        hostLabel.setAlignment(Qt.AlignCenter)
+
+        self.hostComboBox = QComboBox()
+        self.hostComboBox.addItem("This Computer")
+
+        hostVBoxLayout = QVBoxLayout()
+        hostVBoxLayout.addWidget(self.hostComboBox)
+        hostVBoxLayout.addWidget(hostLabel)
+
+        hostWidget = QWidget()
+        hostWidget.setLayout(hostVBoxLayout)
+
+        self.host_process_action = QWidgetAction(self)
+        self.host_process_action.setDefaultWidget(hostWidget)
+        # Only visible once an agent has been added
+        self.host_process_action.setVisible(False)
+
+        self.ActionMenuFileConnectToAgent = QAction("Connect to Agent...", self)
+        self.menuFile.insertAction(self.actionQuit, self.ActionMenuFileConnectToAgent)
+        self.menuFile.insertSeparator(self.actionQuit)
+
         showLabel = QLabel("Show")
         showLabel.setAlignment(Qt.AlignCenter)
 
@@ -305,6 +338,7 @@ class Window(
         self.search_process_action = QWidgetAction(self)
         self.search_process_action.setDefaultWidget(searchWidget)
 
+        self.toolBar.addAction(self.host_process_action)
         self.toolBar.addAction(self.filter_process_action)
         self.toolBar.addAction(self.search_process_action)
 
@@ -341,6 +375,10 @@ class Window(
         self.ActionToolBarQuitProcess.triggered.connect(self._showKillDialog)
         self.ActionMenuHelpAbout.triggered.connect(self._showAboutDialog)
 
+        # Remote agents
+        self.ActionMenuFileConnectToAgent.triggered.connect(self._showConnectToAgentDialog)
+        self.hostComboBox.currentIndexChanged.connect(self._host_changed)
+
         # CPU History
         self.ActionMenuWindowCPUHistory.triggered.connect(self._showCPUHistoryDialog)
 
@@ -381,10 +419,21 @@ class Window(
 
     def createPSUtilsThread(self):
         thread = QThread()
-        worker = PSUtilsWorker()
+        if self.agent_client is None:
+            worker = PSUtilsWorker()
+        else:
+            worker = AgentPSUtilsWorker(self.agent_client)
         worker.moveToThread(thread)
         thread.started.connect(lambda: worker.refresh())
+        self.connectPSUtilsWorker(worker)
+
+        worker.finished.connect(thread.quit)
+        worker.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
 
+        return thread
+
+    def connectPSUtilsWorker(self, worker):
         # CPU
         worker.updated_cpu_user.connect(self.set_user)
         worker.updated_cpu_system.connect(self.set_system)
@@ -422,6 +471,15 @@ class Window(
         worker.updated_network_data_received.connect(self.refresh_data_received)
         worker.updated_network_data_sent.connect(self.refresh_data_sent)
 
+    def createProcessesThread(self):
+        thread = QThread()
+        worker = ProcessesWorker()
+        worker.moveToThread(thread)
+        thread.started.connect(lambda: worker.refresh())
+
+        # Processes
+        worker.updated_processes.connect(self._set_local_processes)
+
         worker.finished.connect(thread.quit)
         worker.finished.connect(worker.deleteLater)
         thread.finished.connect(thread.deleteLater)
@@ -443,51 +501,56 @@ class Window(
 
         return thread
 
+    @property
+    def agent_client(self):
+        # None when the selected host is this computer
+        if self.hostComboBox.currentIndex() > 0:
+            return self.agent_clients[self.hostComboBox.currentIndex() - 1]
+        return None
+
     def refresh(self):
+        # A slow worker is not stacked with the next one
+        self.start_thread("psutils_thread", self.createPSUtilsThread)
+        self.start_thread("icons_cache_thread", self.createIconsCacheThread)
+        if self.agent_client is not None:
+            self.set_processes(self.agent_client.get_processes_snapshot())
+        else:
+            self.start_thread("processes_thread", self.createProcessesThread)
+
+    def start_thread(self, name, create):
+        """
+        Start the thread that create() makes and keep it in the attribute name until it has finished,
+        unless the one started before is still running
+        """
+        if getattr(self, name) is not None:
+            return
+        thread = create()
+        setattr(self, name, thread)
+        thread.finished.connect(lambda: setattr(self, name, None))
+        thread.start()
+
+    def _set_local_processes(self, processes):
+        # The user may have switched to a remote host while the snapshot was taken
+        if self.agent_client is None:
+            self.set_processes(processes)
+
+    def set_processes(self, processes):
+        self.processes = processes
         self.refresh_treeview_model()
 
-        self.threads.clear()
-        self.threads = [
-            self.createPSUtilsThread(),
-            self.createIconsCacheThread(),
-        ]
-        for thread in self.threads:
-            thread.start()
+        if not self.process_tree_columns_resized and self.tree_view_model.rowCount():
+            self.process_tree_columns_resized = True
+            for header_pos in range(len(self.process_tree.header())):
+                self.process_tree.resizeColumnToContents(header_pos)
 
     def refresh_treeview_model(self):
         self.tree_view_model = QStandardItemModel()
-        data = []
-        for p in psutil.process_iter():
-            with p.oneshot():
-                try:
-                    environ = p.environ()
-                except (
-                        psutil.AccessDenied,
-                        psutil.ZombieProcess,
-                        psutil.NoSuchProcess,
-                ):
-                    environ = None
-                if environ and "LAUNCHED_BUNDLE" in environ:
-                    application_name = os.path.basename(environ["LAUNCHED_BUNDLE"]).rsplit(".", 1)[0]
-                else:
-                    application_name = p.name()
-                data.append({
-                    'treeview_id': p.pid,
-                    'treeview_parent_id': p.ppid(),
-                    "pid": p.pid,
-                    "application_name": application_name,
-                    'username': p.username(),
-                    'cpu_percent': p.cpu_percent(),
-                    'num_threads': p.num_threads(),
-                    'rss': p.memory_info().rss,
-                    'vms': p.memory_info().vms,
-                    'environ': environ,
-                    'status': p.status(),
-                    "uids": p.uids(),
-                    "create_time": p.create_time(),
-                })
+        data = self.processes
 
         seen = {}  # List of  QStandardItem
+        # Children of pid 0, like init, are shown at the root. A parent can exit between two ticks,
+        # its children are then shown at the root too
+        pids = {value['pid'] for value in data}
         values = deque(data)
         if self.filterComboBox.currentIndex() == 1:
             is_hierarchical_view = True
@@ -500,7 +563,8 @@ class Window(
             if is_hierarchical_view:
                 # self.tree_view_model.setRowCount(0)
 
-                if value['treeview_parent_id'] == 0 or value['treeview_parent_id'] is None:
+                if value['treeview_parent_id'] in (0, None) or value['treeview_parent_id'] not in pids \
+                        or value['treeview_parent_id'] == value['pid']:
                     parent = self.tree_view_model.invisibleRootItem()
                 else:
                     if value['treeview_parent_id'] not in seen:
@@ -546,7 +610,7 @@ class Window(
                     pid=value['pid'],
                     application_name=value['application_name'],
                     username=value['username'],
-                    uids=value['uids'],
+                    uid=value['uid'],
                     environ=value['environ'],
                     create_time=value['create_time'],
                     status=value['status'],
@@ -612,27 +676,21 @@ class Window(
     def set_treeview_headers(self):
         # Headers
         # PID is imposed because it is use for selection tracking
-        pos = 0
-        self.tree_view_model.setHeaderData(pos, Qt.Horizontal, self.ActionViewColumnProcessID.text())
-        pos += 1
+        headers = [self.ActionViewColumnProcessID.text()]
         if self.ActionViewColumnProcessName.isChecked():
-            self.tree_view_model.setHeaderData(pos, Qt.Horizontal, self.ActionViewColumnProcessName.text())
-            pos += 1
+            headers.append(self.ActionViewColumnProcessName.text())
         if self.ActionViewColumnUser.isChecked():
-            self.tree_view_model.setHeaderData(pos, Qt.Horizontal, self.ActionViewColumnUser.text())
-            pos += 1
+            headers.append(self.ActionViewColumnUser.text())
         if self.ActionViewColumnPercentCPU.isChecked():
-            self.tree_view_model.setHeaderData(pos, Qt.Horizontal, self.ActionViewColumnPercentCPU.text())
-            pos += 1
+            headers.append(self.ActionViewColumnPercentCPU.text())
         if self.ActionViewColumnNumThreads.isChecked():
-            self.tree_view_model.setHeaderData(pos, Qt.Horizontal, self.ActionViewColumnNumThreads.text())
-            pos += 1
+            headers.append(self.ActionViewColumnNumThreads.text())
         if self.ActionViewColumnRealMemory.isChecked():
-            self.tree_view_model.setHeaderData(pos, Qt.Horizontal, self.ActionViewColumnRealMemory.text())
-            pos += 1
+            headers.append(self.ActionViewColumnRealMemory.text())
         if self.ActionViewColumnVirtualMemory.isChecked():
-            self.tree_view_model.setHeaderData(pos, Qt.Horizontal, self.ActionViewColumnVirtualMemory.text())
-            pos += 1
+            headers.append(self.ActionViewColumnVirtualMemory.text())
+        # Also give the columns to an empty model, the placeholder table shows its header before the first snapshot
+        self.tree_view_model.setHorizontalHeaderLabels(headers)
 
     def apply_search_line_filter(self, application_name, row):
         # Filter Line
@@ -644,7 +702,7 @@ class Window(
             filtered_row = row
         return filtered_row
 
-    def apply_combobox_filter(self, filtered_row, pid, application_name, username, uids, environ, create_time, status):
+    def apply_combobox_filter(self, filtered_row, pid, application_name, username, uid, environ, create_time, status):
 
         # Filter by ComboBox index
         #             0: 'All Processes',
@@ -665,7 +723,7 @@ class Window(
             else:
                 filtered_row = None
         elif self.filterComboBox.currentIndex() == 3:
-            if uids.real < 1000:  # Not totally exact but the result is the same
+            if uid < 1000:  # Not totally exact but the result is the same
                 filtered_row = self.filter_by_line(filtered_row, application_name)
             else:
                 filtered_row = None
@@ -703,8 +761,9 @@ class Window(
         return filtered_row
 
     def closeEvent(self, evnt):
-        self.cpu_history_dialog.have_to_close = True
-        self.cpu_history_dialog.close()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.have_to_close = True
+            self.cpu_history_dialog.close()
 
         for pid, inspection_dialog in self.inspect_process_dialogs.items():
             inspection_dialog.close()
@@ -762,7 +821,17 @@ class Window(
             self.KillDialog.show()
 
     def _showCPUHistoryDialog(self):
-        if self.cpu_history_dialog.isVisible():
+        if self.cpu_history_dialog is None:
+            # About a hundred bars, built only when the user asks for the window
+            self.cpu_history_dialog = CPUHistory()
+            self.refresh_color_system()
+            self.refresh_color_user()
+            self.refresh_color_idle()
+            self.refresh_color_nice()
+            self.refresh_color_irq()
+            self.cpu_history_dialog.show()
+            self.cpu_history_dialog.cpu_history_graph.copy_history(self.cpu_widget_graph)
+        elif self.cpu_history_dialog.isVisible():
             self.cpu_history_dialog.hide()
         else:
             self.cpu_history_dialog.show()
@@ -795,6 +864,42 @@ class Window(
         )
         msg.exec()
 
+    def _showConnectToAgentDialog(self):
+        text, ok = QInputDialog.getText(
+            self, "Connect to Agent", "Address of the Processes agent (host or host:port):"
+        )
+        if ok and text.strip():
+            self.add_agent(text.strip())
+
+    def add_agent(self, address):
+        host, port = parse_address(address)
+        client = AgentClient(host, port, self)
+        client.error.connect(lambda message: self.statusBar().showMessage(message, 5000))
+        client.connection_changed.connect(lambda connected: self._agent_connection_changed(client, connected))
+        self.agent_clients.append(client)
+        self.hostComboBox.addItem(client.name)
+        self.host_process_action.setVisible(True)
+        client.open()
+        return client
+
+    def _agent_connection_changed(self, client, connected):
+        index = self.agent_clients.index(client) + 1
+        if connected:
+            self.hostComboBox.setItemText(index, client.name)
+        else:
+            self.hostComboBox.setItemText(index, f"{client.name} (disconnected)")
+
+    def _host_changed(self):
+        # Actions are bound to local psutil.Process, they have no meaning for a remote host
+        self.selectClear()
+        self.local_host = self.agent_client is None
+        if self.agent_client is not None and not self.agent_client.is_connected():
+            self.agent_client.open()
+        self.cpu_widget_graph.clear_history()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.clear_history()
+        self.refresh()
+
     def _escape_pressed(self):
         if self.process_tree.hasFocus():
             self.selectClear()
@@ -887,11 +992,32 @@ class Window(
 
     def _clear_cpu_history(self):
         self.cpu_widget_graph.clear_history()
-        self.cpu_history_dialog.cpu_history_graph.clear_history()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.clear_history()
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Activity monitor")
+    parser.add_argument(
+        "--agent",
+        metavar="ADDRESS",
+        nargs="?",
+        const="127.0.0.1",
+        help="serve snapshots to remote Processes windows instead of opening a window ([host][:port])",
+    )
+    parser.add_argument("--agent-interval", type=float, default=1.0, help="seconds between agent snapshots")
+    parser.add_argument(
+        "--connect", metavar="ADDRESS", action="append", default=[], help="attach to a remote agent (host[:port])"
+    )
+    args, qt_args = parser.parse_known_args()
+
+    if args.agent:
+        run_agent(args.agent, interval=args.agent_interval)
+        sys.exit(0)
+
+    app = QApplication(sys.argv[:1] + qt_args)
     win = Window()
+    for address in args.connect:
+        win.add_agent(address)
     win.show()
     sys.exit(app.exec())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import os
+
+import psutil
+
+
+def get_system_snapshot():
+    """
+    Collect everything PSUtilsWorker emits, as a plain dict of builtin types.
+    The dict can be emitted locally or serialized for a remote viewer.
+    """
+    # Disk Usage
+    mounted_disk_partitions = []
+    for part in psutil.disk_partitions(all=False):
+        if os.name == "nt":
+            if "cdrom" in part.opts or part.fstype == "":
+                # skip cd-rom drives with no disk in it; they may raise
+                # ENOENT, pop-up a Windows GUI error for a non-ready
+                # partition or just hang.
+                continue
+        usage = psutil.disk_usage(part.mountpoint)
+        if usage.total > 4096:
+            mounted_disk_partitions.append(
+                {
+                    "device": part.device,
+                    "total": usage.total,
+                    "used": usage.used,
+                    "free": usage.free,
+                    "percent": usage.percent,
+                    "fstype": part.fstype,
+                    "mountpoint": part.mountpoint,
+                }
+            )
+
+    # CPU
+    cpu_times_percent = psutil.cpu_times_percent()
+    cumulative_threads = 0
+    process_number = 0
+    for proc in psutil.process_iter():
+        try:
+            cumulative_threads += proc.num_threads()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        process_number += 1
+
+    # System Memory, only the fields the OS provides
+    virtual_memory = psutil.virtual_memory()
+    memory = {}
+    for field in (
+        "total",
+        "available",
+        "percent",
+        "used",
+        "free",
+        "active",
+        "inactive",
+        "buffers",
+        "cached",
+        "shared",
+        "slab",
+        "wired",
+    ):
+        if hasattr(virtual_memory, field):
+            memory[field] = getattr(virtual_memory, field)
+
+    activity = psutil.disk_io_counters()
+    net_io_counters = psutil.net_io_counters()
+
+    return {
+        "mounted_disk_partitions": mounted_disk_partitions,
+        "cpu": {
+            "user": cpu_times_percent.user,
+            "system": cpu_times_percent.system,
+            "nice": cpu_times_percent.nice,
+            "irq": getattr(cpu_times_percent, "irq", 0.0),
+            "idle": cpu_times_percent.idle,
+            "cumulative_threads": cumulative_threads,
+            "process_number": process_number,
+        },
+        "memory": memory,
+        "disk_activity": {
+            "read_count": activity.read_count if activity else 0,
+            "write_count": activity.write_count if activity else 0,
+            "read_bytes": activity.read_bytes if activity else 0,
+            "write_bytes": activity.write_bytes if activity else 0,
+        },
+        "network": {
+            "packets_recv": net_io_counters.packets_recv,
+            "packets_sent": net_io_counters.packets_sent,
+            "bytes_recv": net_io_counters.bytes_recv,
+            "bytes_sent": net_io_counters.bytes_sent,
+        },
+    }
+
+
+def get_processes_snapshot():
+    """
+    One row per process with every field the process tree and its filters use.
+    Rows only contain builtin types, then they can travel over the agent socket.
+    """
+    data = []
+    for p in psutil.process_iter():
+        try:
+            with p.oneshot():
+                try:
+                    environ = p.environ()
+                except (
+                        psutil.AccessDenied,
+                        psutil.ZombieProcess,
+                        psutil.NoSuchProcess,
+                ):
+                    environ = None
+                if environ and "LAUNCHED_BUNDLE" in environ:
+                    application_name = os.path.basename(environ["LAUNCHED_BUNDLE"]).rsplit(".", 1)[0]
+                    # Filters only look at LAUNCHED_BUNDLE, no need to keep the whole environment
+                    environ = {"LAUNCHED_BUNDLE": environ["LAUNCHED_BUNDLE"]}
+                else:
+                    application_name = p.name()
+                    environ = None
+                memory_info = p.memory_info()
+                data.append({
+                    'treeview_id': p.pid,
+                    'treeview_parent_id': p.ppid(),
+                    "pid": p.pid,
+                    "application_name": application_name,
+                    'username': p.username(),
+                    'cpu_percent': p.cpu_percent(),
+                    'num_threads': p.num_threads(),
+                    'rss': memory_info.rss,
+                    'vms': memory_info.vms,
+                    'environ': environ,
+                    'status': p.status(),
+                    "uid": p.uids().real,
+                    "create_time": p.create_time(),
+                })
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            # The process is gone during the iteration
+            pass
+    return data
@@ -35,6 +35,7 @@ class TabCpu(CPUTimesPercent):
     color_picker_nice_value: ColorButton
     color_picker_irq_value: ColorButton
 
+    # Created on first display, see Window._showCPUHistoryDialog
     cpu_history_dialog: CPUHistory
 
     def __init__(self, *args, **kwargs):
@@ -50,28 +51,33 @@ class TabCpu(CPUTimesPercent):
     def refresh_user(self):
         self.label_user_value.setText(f"{self.user}")
         self.cpu_widget_graph.user = self.user
-        self.cpu_history_dialog.cpu_history_graph.user = self.user
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.user = self.user
 
     def refresh_system(self):
         self.label_system_value.setText(f"{self.system}")
         self.cpu_widget_graph.system = self.system
-        self.cpu_history_dialog.cpu_history_graph.system = self.system
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.system = self.system
 
     def refresh_idle(self):
         self.label_idle_value.setText(f"{self.idle}")
         # idle color is just the background color, then it is bind to refresh
         self.cpu_widget_graph.slice()
-        self.cpu_history_dialog.cpu_history_graph.slice()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.slice()
 
     def refresh_nice(self):
         self.label_nice_value.setText(f"{self.nice}")
         self.cpu_widget_graph.nice = self.nice
-        self.cpu_history_dialog.cpu_history_graph.nice = self.nice
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.nice = self.nice
 
     def refresh_irq(self):
         self.label_irq_value.setText(f"{self.irq}")
         self.cpu_widget_graph.irq = self.irq
-        self.cpu_history_dialog.cpu_history_graph.irq = self.irq
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.irq = self.irq
 
     def refresh_process_number(self, process_number: int):
         if self.label_processes_value.isVisible() and self.label_processes_value.text() != f"{process_number}":
@@ -85,28 +91,33 @@ class TabCpu(CPUTimesPercent):
         self.label_system_value.setStyleSheet("color: %s;" % self.color_picker_system_value.color())
         self.label_system_unit.setStyleSheet("color: %s;" % self.color_picker_system_value.color())
         self.cpu_widget_graph.color_system = self.color_picker_system_value.color()
-        self.cpu_history_dialog.cpu_history_graph.color_system = self.color_picker_system_value.color()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.color_system = self.color_picker_system_value.color()
 
     def refresh_color_user(self):
         self.label_user_value.setStyleSheet("color: %s;" % self.color_picker_user_value.color())
         self.label_user_unit.setStyleSheet("color: %s;" % self.color_picker_user_value.color())
         self.cpu_widget_graph.color_user = self.color_picker_user_value.color()
-        self.cpu_history_dialog.cpu_history_graph.color_user = self.color_picker_user_value.color()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.color_user = self.color_picker_user_value.color()
 
     def refresh_color_idle(self):
         self.label_idle_value.setStyleSheet("color: %s;" % self.color_picker_idle_value.color())
         self.label_idle_unit.setStyleSheet("color: %s;" % self.color_picker_idle_value.color())
         self.cpu_widget_graph.color_idle = self.color_picker_idle_value.color()
-        self.cpu_history_dialog.cpu_history_graph.color_idle = self.color_picker_idle_value.color()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.color_idle = self.color_picker_idle_value.color()
 
     def refresh_color_nice(self):
         self.label_nice_value.setStyleSheet("color: %s;" % self.color_picker_nice_value.color())
         self.label_nice_unit.setStyleSheet("color: %s;" % self.color_picker_nice_value.color())
         self.cpu_widget_graph.color_nice = self.color_picker_nice_value.color()
-        self.cpu_history_dialog.cpu_history_graph.color_nice = self.color_picker_nice_value.color()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.color_nice = self.color_picker_nice_value.color()
 
     def refresh_color_irq(self):
         self.label_irq_value.setStyleSheet("color: %s;" % self.color_picker_irq_value.color())
         self.label_irq_unit.setStyleSheet("color: %s;" % self.color_picker_irq_value.color())
         self.cpu_widget_graph.color_irq = self.color_picker_irq_value.color()
-        self.cpu_history_dialog.cpu_history_graph.color_irq = self.color_picker_irq_value.color()
+        if self.cpu_history_dialog is not None:
+            self.cpu_history_dialog.cpu_history_graph.color_irq = self.color_picker_irq_value.color()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import getpass
 import os
 import signal
 
@@ -31,7 +32,13 @@ class TreeViewProcess(object):
 
         self.tree_view_model = None
         self.selected_pid = -1
-        self.my_username = os.getlogin()
+        try:
+            self.my_username = os.getlogin()
+        except OSError:
+            # No controlling terminal, e.g. started from the launcher or headless
+            self.my_username = getpass.getuser()
+        # Kill, inspect and sample act on local processes only
+        self.local_host = True
 
     def filter_by_line(self, row, text):
         if self.searchLineEdit.text():
@@ -81,7 +88,10 @@ class TreeViewProcess(object):
     def onClicked(self):
         try:
             self.selected_pid = int(self.tree_view_model.itemData(self.process_tree.selectedIndexes()[0])[0])
-            if self.selected_pid:
+            if self.selected_pid and not self.local_host:
+                self.filterComboBox.model().item(8).setEnabled(True)
+                self.ActionMenuViewSelectedProcesses.setEnabled(True)
+            elif self.selected_pid:
                 self.ActionToolBarQuitProcess.setEnabled(True)
                 self.ActionToolBarInspectProcess.setEnabled(True)
                 self.ActionToolBarSampleProcess.setEnabled(True)
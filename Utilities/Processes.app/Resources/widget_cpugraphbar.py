@@ -251,6 +251,16 @@ class CPUGraphBar(QWidget, CPUTimesPercent):
             bar.color_irq = self.color_irq
         self.repaint()
 
+    def copy_history(self, other):
+        # Start from the history another graph already recorded
+        for bar_id, bar in self.bars.items():
+            if bar_id in other.bars:
+                bar.user = other.bars[bar_id].user
+                bar.system = other.bars[bar_id].system
+                bar.nice = other.bars[bar_id].nice
+                bar.irq = other.bars[bar_id].irq
+        self.repaint()
+
     def clear_history(self):
         for bar_id in range(len(self.bars), 0, -1):
             self.bars[bar_id].user = None
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+
+from PyQt5.QtCore import (
+    pyqtSignal,
+    QObject,
+)
+
+from snapshot import get_processes_snapshot
+
+
+class ProcessesWorker(QObject):
+    finished = pyqtSignal()
+    updated_processes = pyqtSignal(object)
+
+    def refresh(self):
+        self.updated_processes.emit(get_processes_snapshot())
+        self.finished.emit()
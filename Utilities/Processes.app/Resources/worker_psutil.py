@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
 
-import os
-
-import psutil
 from PyQt5.QtCore import (
     pyqtSignal,
     QObject,
 )
 
+from snapshot import get_system_snapshot
 from utility import bytes2human
 
 
@@ -57,94 +55,76 @@ class PSUtilsWorker(QObject):
 
     # noinspection PyUnresolvedReferences
     def refresh(self):
+        self.emit_snapshot(get_system_snapshot())
+        self.finished.emit()
+
+    # noinspection PyUnresolvedReferences
+    def emit_snapshot(self, snapshot):
         # Disk Usage
         data = {}
-        item_number = 0
-        for part in psutil.disk_partitions(all=False):
-            if os.name == "nt":
-                if "cdrom" in part.opts or part.fstype == "":
-                    # skip cd-rom drives with no disk in it; they may raise
-                    # ENOENT, pop-up a Windows GUI error for a non-ready
-                    # partition or just hang.
-                    continue
-            usage = psutil.disk_usage(part.mountpoint)
-            # filter
-            # print("%s: %s %s" % (part.device, usage.total, part.fstype))
-            if usage.total > 4096:
-                data[item_number] = {
-                    "device": part.device,
-                    "total": bytes2human(usage.total),
-                    "used": bytes2human(usage.used),
-                    "used_in_bytes": f"{'{:,}'.format(usage.used)} bytes",
-                    "used_raw": usage.used,
-                    "free": bytes2human(usage.free),
-                    "free_in_bytes": f"{'{:,}'.format(usage.free)} bytes",
-                    "free_raw": usage.free,
-                    "percent": int(usage.percent),
-                    "fstype": part.fstype,
-                    "mountpoint": part.mountpoint,
-                }
-                item_number += 1
+        for item_number, partition in enumerate(snapshot["mounted_disk_partitions"]):
+            data[item_number] = {
+                "device": partition["device"],
+                "total": bytes2human(partition["total"]),
+                "used": bytes2human(partition["used"]),
+                "used_in_bytes": f"{'{:,}'.format(partition['used'])} bytes",
+                "used_raw": partition["used"],
+                "free": bytes2human(partition["free"]),
+                "free_in_bytes": f"{'{:,}'.format(partition['free'])} bytes",
+                "free_raw": partition["free"],
+                "percent": int(partition["percent"]),
+                "fstype": partition["fstype"],
+                "mountpoint": partition["mountpoint"],
+            }
         self.updated_mounted_disk_partitions.emit(data)
 
         # CPU
-        cpu_times_percent = psutil.cpu_times_percent()
-        self.updated_cpu_user.emit(cpu_times_percent.user)
-        self.updated_cpu_system.emit(cpu_times_percent.system)
-        self.updated_cpu_nice.emit(cpu_times_percent.nice)
-        self.updated_cpu_irq.emit(cpu_times_percent.irq)
-        self.updated_cpu_idle.emit(cpu_times_percent.idle)
-
-        cumulative_threads = 0
-        for proc in psutil.process_iter():
-            try:
-                cumulative_threads += proc.num_threads()
-            except psutil.NoSuchProcess:
-                pass
-        self.updated_cpu_cumulative_threads.emit(cumulative_threads)
-        self.updated_cpu_process_number.emit(len(psutil.pids()))
+        cpu = snapshot["cpu"]
+        self.updated_cpu_user.emit(cpu["user"])
+        self.updated_cpu_system.emit(cpu["system"])
+        self.updated_cpu_nice.emit(cpu["nice"])
+        self.updated_cpu_irq.emit(cpu["irq"])
+        self.updated_cpu_idle.emit(cpu["idle"])
+        self.updated_cpu_cumulative_threads.emit(cpu["cumulative_threads"])
+        self.updated_cpu_process_number.emit(cpu["process_number"])
 
         # System Memory
-        virtual_memory = psutil.virtual_memory()
-        if hasattr(virtual_memory, "total"):
-            self.updated_system_memory_total.emit(virtual_memory.total)
-        if hasattr(virtual_memory, "available"):
-            self.updated_system_memory_available.emit(virtual_memory.available)
-        if hasattr(virtual_memory, "percent"):
-            self.updated_system_memory_percent.emit(virtual_memory.percent)
-        if hasattr(virtual_memory, "used"):
-            self.updated_system_memory_used.emit(virtual_memory.used)
-        if hasattr(virtual_memory, "free"):
-            self.updated_system_memory_free.emit(virtual_memory.free)
-        if hasattr(virtual_memory, "active"):
-            self.updated_system_memory_active.emit(virtual_memory.active)
-        if hasattr(virtual_memory, "inactive"):
-            self.updated_system_memory_inactive.emit(virtual_memory.inactive)
-        if hasattr(virtual_memory, "buffers"):
-            self.updated_system_memory_buffers.emit(virtual_memory.buffers)
-        if hasattr(virtual_memory, "cached"):
-            self.updated_system_memory_cached.emit(virtual_memory.cached)
-        if hasattr(virtual_memory, "shared"):
-            self.updated_system_memory_shared.emit(virtual_memory.shared)
-        if hasattr(virtual_memory, "slab"):
-            self.updated_system_memory_slab.emit(virtual_memory.slab)
-        if hasattr(virtual_memory, "wired"):
-            self.updated_system_memory_wired.emit(virtual_memory.wired)
+        memory = snapshot["memory"]
+        if "total" in memory:
+            self.updated_system_memory_total.emit(memory["total"])
+        if "available" in memory:
+            self.updated_system_memory_available.emit(memory["available"])
+        if "percent" in memory:
+            self.updated_system_memory_percent.emit(memory["percent"])
+        if "used" in memory:
+            self.updated_system_memory_used.emit(memory["used"])
+        if "free" in memory:
+            self.updated_system_memory_free.emit(memory["free"])
+        if "active" in memory:
+            self.updated_system_memory_active.emit(memory["active"])
+        if "inactive" in memory:
+            self.updated_system_memory_inactive.emit(memory["inactive"])
+        if "buffers" in memory:
+            self.updated_system_memory_buffers.emit(memory["buffers"])
+        if "cached" in memory:
+            self.updated_system_memory_cached.emit(memory["cached"])
+        if "shared" in memory:
+            self.updated_system_memory_shared.emit(memory["shared"])
+        if "slab" in memory:
+            self.updated_system_memory_slab.emit(memory["slab"])
+        if "wired" in memory:
+            self.updated_system_memory_wired.emit(memory["wired"])
 
         # Disk activity
-        activity = psutil.disk_io_counters()
-
-        self.updated_disk_activity_reads_in.emit(activity.read_count)
-        self.updated_disk_activity_writes_out.emit(activity.write_count)
-        self.updated_disk_activity_data_read.emit(activity.read_bytes)
-        self.updated_disk_activity_data_written.emit(activity.write_bytes)
+        activity = snapshot["disk_activity"]
+        self.updated_disk_activity_reads_in.emit(activity["read_count"])
+        self.updated_disk_activity_writes_out.emit(activity["write_count"])
+        self.updated_disk_activity_data_read.emit(activity["read_bytes"])
+        self.updated_disk_activity_data_written.emit(activity["write_bytes"])
 
         # Network
-        net_io_counters = psutil.net_io_counters()
-
-        self.updated_network_packets_in.emit(net_io_counters.packets_recv)
-        self.updated_network_packets_out.emit(net_io_counters.packets_sent)
-        self.updated_network_data_received.emit(net_io_counters.bytes_recv)
-        self.updated_network_data_sent.emit(net_io_counters.bytes_sent)
-
-        self.finished.emit()
+        network = snapshot["network"]
+        self.updated_network_packets_in.emit(network["packets_recv"])
+        self.updated_network_packets_out.emit(network["packets_sent"])
+        self.updated_network_data_received.emit(network["bytes_recv"])
+        self.updated_network_data_sent.emit(network["bytes_sent"])